@@ -0,0 +1,141 @@
+"""
+Agenda materializada de los médicos
+
+Cada cita pendiente o confirmada ocupa un bloque (médico, fecha, inicio,
+fin) en agenda_bloques. Las citas que se escriben con el ORM se sincronizan
+en el mismo flush, dentro de la misma transacción; las cargas masivas que
+escriben con SQL directo llaman a `sincronizar_citas()` o `reconstruir()`.
+La agenda del médico y los horarios disponibles son así lecturas por
+índice, sin recalcular duraciones a partir de Cita.
+"""
+from datetime import timedelta
+from itertools import chain
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.orm import Session
+
+from models import db, BloqueAgenda, Cita
+import catalogos
+import consultas
+import disponibilidad
+
+TAMANO_LOTE = 500
+MAX_DIAS = 7
+
+
+def _bloque(cita_id, medico_id, fecha_hora, tipo_consulta, duraciones):
+    inicio = fecha_hora.hour * 60 + fecha_hora.minute
+    return {
+        'cita_id': cita_id,
+        'medico_id': medico_id,
+        'fecha': fecha_hora.date(),
+        'inicio': inicio,
+        'fin': inicio + (duraciones.get(tipo_consulta) or disponibilidad.DURACION_PREDETERMINADA),
+    }
+
+
+def _reemplazar(conexion, cita_ids, bloques):
+    """Borra los bloques de esas citas e inserta los nuevos"""
+    for inicio in range(0, len(cita_ids), TAMANO_LOTE):
+        conexion.execute(delete(BloqueAgenda).where(
+            BloqueAgenda.cita_id.in_(cita_ids[inicio:inicio + TAMANO_LOTE])
+        ))
+    if bloques:
+        conexion.execute(insert(BloqueAgenda), bloques)
+
+
+def sincronizar_citas(cita_ids):
+    """Recalcula los bloques de las citas indicadas (tras UPDATE/INSERT masivos)"""
+    cita_ids = list(cita_ids)
+    duraciones = catalogos.duraciones_por_tipo()
+    bloques = []
+    for inicio in range(0, len(cita_ids), TAMANO_LOTE):
+        # El estado se filtra aquí: con `estado IN (...)` en el WHERE, SQLite
+        # puede preferir el índice por estado a la búsqueda por clave primaria
+        filas = db.session.query(
+            Cita.id, Cita.medico_id, Cita.fecha_hora, Cita.tipo_consulta, Cita.estado
+        ).filter(Cita.id.in_(cita_ids[inicio:inicio + TAMANO_LOTE]))
+        bloques.extend(
+            _bloque(cita_id, medico_id, fecha_hora, tipo_consulta, duraciones)
+            for cita_id, medico_id, fecha_hora, tipo_consulta, estado in filas
+            if estado in consultas.ESTADOS_ACTIVOS
+        )
+    _reemplazar(db.session.connection(), cita_ids, bloques)
+
+
+def quitar_citas(cita_ids):
+    """Libera los bloques de citas que pasaron a un estado no activo"""
+    _reemplazar(db.session.connection(), list(cita_ids), [])
+
+
+def reconstruir():
+    """Rehace la agenda completa a partir de las citas activas; devuelve los bloques creados"""
+    duraciones = catalogos.duraciones_por_tipo()
+    db.session.execute(delete(BloqueAgenda))
+    filas = db.session.query(Cita.id, Cita.medico_id, Cita.fecha_hora, Cita.tipo_consulta).filter(
+        Cita.estado.in_(consultas.ESTADOS_ACTIVOS)
+    ).execution_options(yield_per=TAMANO_LOTE)
+
+    total = 0
+    lote = []
+    for fila in filas:
+        lote.append(_bloque(*fila, duraciones))
+        if len(lote) == TAMANO_LOTE:
+            db.session.execute(insert(BloqueAgenda), lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        db.session.execute(insert(BloqueAgenda), lote)
+        total += len(lote)
+    db.session.commit()
+    disponibilidad.invalidar_todo()
+    return total
+
+
+@event.listens_for(Session, 'after_flush')
+def _sincronizar_flush(session, flush_context):
+    citas = [obj for obj in chain(session.new, session.dirty, session.deleted) if isinstance(obj, Cita)]
+    if not citas:
+        return
+
+    duraciones = catalogos.duraciones_por_tipo()
+    bloques = [
+        _bloque(cita.id, cita.medico_id, cita.fecha_hora, cita.tipo_consulta, duraciones)
+        for cita in citas
+        if cita not in session.deleted and cita.estado in consultas.ESTADOS_ACTIVOS
+    ]
+    _reemplazar(session.connection(), [cita.id for cita in citas], bloques)
+
+
+# ==================== CONSULTA ====================
+
+def _hora(minutos):
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+def agenda_medico(medico_id, desde, dias=1):
+    """Citas y horarios libres del médico para `dias` días desde `desde`"""
+    fechas = [desde + timedelta(days=i) for i in range(dias)]
+    citas = {fecha: [] for fecha in fechas}
+    ocupados = {fecha: [] for fecha in fechas}
+    filas = consultas.agenda_medico(medico_id, desde, desde + timedelta(days=dias))
+    for (fecha, inicio, fin, cita_id, tipo_consulta, estado, motivo,
+         paciente_id, nombres, apellidos) in filas:
+        ocupados[fecha].append((inicio, fin))
+        citas[fecha].append({
+            'cita_id': cita_id,
+            'inicio': _hora(inicio),
+            'fin': _hora(fin),
+            'tipo_consulta': tipo_consulta,
+            'estado': estado,
+            'motivo': motivo,
+            'paciente': {'id': paciente_id, 'nombre': f'{nombres} {apellidos}'},
+        })
+
+    return {
+        fecha.isoformat(): {
+            'citas': citas[fecha],
+            'libres': disponibilidad.horarios_libres(disponibilidad.DURACION_PREDETERMINADA, ocupados[fecha]),
+        }
+        for fecha in fechas
+    }
@@ -0,0 +1,225 @@
+"""
+Indicadores de toda la clínica a partir de resúmenes diarios
+
+resumen_citas_diario cuenta las citas por (día, médico, tipo, estado) y
+resumen_consultas_diario las consultas registradas en el historial por
+(día, médico, tipo). Se mantienen igual que la agenda materializada: las
+escrituras del ORM ajustan los contadores en el mismo flush, los cambios de
+estado en bloque de transiciones.py llaman a `mover_citas()` y las cargas
+masivas con SQL directo a `reconstruir()`. Los reportes suman unas pocas
+filas por día en lugar de recorrer citas e historiales.
+"""
+from collections import Counter, defaultdict
+from itertools import chain
+
+from sqlalchemy import delete, event, func, inspect, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import db, Cita, HistorialMedico, ResumenCitasDia, ResumenConsultasDia
+import catalogos
+import disponibilidad
+
+DIAS_PREDETERMINADOS = 30
+MINUTOS_POR_DIA = (disponibilidad.HORA_CIERRE - disponibilidad.HORA_APERTURA) * 60
+
+PERIODOS = {
+    'dia': lambda fecha: fecha.isoformat(),
+    'semana': lambda fecha: '{0}-W{1:02d}'.format(*fecha.isocalendar()),
+    'mes': lambda fecha: fecha.strftime('%Y-%m'),
+}
+
+_INSERTAR = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+ATRIBUTOS_CITA = ('fecha_hora', 'medico_id', 'tipo_consulta', 'estado')
+ATRIBUTOS_CONSULTA = ('fecha_consulta', 'medico_id', 'tipo_consulta')
+
+
+# Las filas sin fecha no entran en los resúmenes (reconstruir() tampoco las cuenta)
+
+def _clave_cita(fecha_hora, medico_id, tipo_consulta, estado):
+    if fecha_hora is None:
+        return None
+    return fecha_hora.date(), medico_id, tipo_consulta, estado or ''
+
+
+def _clave_consulta(fecha_consulta, medico_id, tipo_consulta):
+    if fecha_consulta is None:
+        return None
+    return fecha_consulta.date(), medico_id, tipo_consulta or ''
+
+
+def _sumar(conexion, modelo, deltas):
+    """Suma los deltas {clave: n} a los contadores del resumen (upsert)"""
+    tabla = modelo.__table__
+    claves = [columna.name for columna in tabla.primary_key]
+    filas = [dict(zip(claves, clave), total=delta) for clave, delta in deltas.items() if delta]
+    if not filas:
+        return
+    sentencia = _INSERTAR[conexion.dialect.name](tabla)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=claves, set_={'total': tabla.c.total + sentencia.excluded.total}
+    )
+    conexion.execute(sentencia, filas)
+
+
+def mover_citas(filas, origen, destino):
+    """Pasa de `origen` a `destino` las citas `filas` (con medico_id, fecha_hora y tipo_consulta)"""
+    movidas = Counter((fila.fecha_hora.date(), fila.medico_id, fila.tipo_consulta) for fila in filas)
+    deltas = {}
+    for clave, cantidad in movidas.items():
+        deltas[(*clave, origen)] = -cantidad
+        deltas[(*clave, destino)] = cantidad
+    _sumar(db.session.connection(), ResumenCitasDia, deltas)
+
+
+def reconstruir():
+    """Rehace ambos resúmenes a partir de citas e historiales; devuelve las filas creadas"""
+    total = 0
+    fecha_cita = func.date(Cita.fecha_hora)
+    estado = func.coalesce(Cita.estado, '')
+    fecha_consulta = func.date(HistorialMedico.fecha_consulta)
+    tipo_consulta = func.coalesce(HistorialMedico.tipo_consulta, '')
+    for modelo, columnas in (
+        (ResumenCitasDia, (fecha_cita, Cita.medico_id, Cita.tipo_consulta, estado)),
+        (ResumenConsultasDia, (fecha_consulta, HistorialMedico.medico_id, tipo_consulta)),
+    ):
+        db.session.execute(delete(modelo))
+        agrupado = select(*columnas, func.count()).where(columnas[0].is_not(None)).group_by(*columnas)
+        total += db.session.execute(insert(modelo).from_select(
+            [columna.name for columna in modelo.__table__.columns], agrupado
+        )).rowcount
+    db.session.commit()
+    return total
+
+
+# ==================== SINCRONIZACIÓN CON EL ORM ====================
+
+def _anteriores(obj, atributos):
+    """Valores de `atributos` antes de este flush"""
+    estado = inspect(obj)
+    valores = []
+    for atributo in atributos:
+        historia = estado.attrs[atributo].history
+        valores.append(historia.deleted[0] if historia.deleted else getattr(obj, atributo))
+    return valores
+
+
+def _historia_activa(modelo, atributos):
+    # Al cambiar una clave se carga el valor anterior aunque no se haya leído,
+    # para poder descontarlo del resumen
+    for atributo in atributos:
+        event.listen(getattr(modelo, atributo), 'set', lambda *args: None, active_history=True)
+
+
+_historia_activa(Cita, ATRIBUTOS_CITA)
+_historia_activa(HistorialMedico, ATRIBUTOS_CONSULTA)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sincronizar_flush(session, flush_context):
+    nuevos, eliminados = session.new, session.deleted
+    deltas = {ResumenCitasDia: Counter(), ResumenConsultasDia: Counter()}
+    for obj in chain(nuevos, session.dirty, eliminados):
+        if isinstance(obj, Cita):
+            modelo, atributos, clave = ResumenCitasDia, ATRIBUTOS_CITA, _clave_cita
+        elif isinstance(obj, HistorialMedico):
+            modelo, atributos, clave = ResumenConsultasDia, ATRIBUTOS_CONSULTA, _clave_consulta
+        else:
+            continue
+        # Un cambio que no toca la clave resta y suma en la misma fila
+        if obj not in nuevos:
+            deltas[modelo][clave(*_anteriores(obj, atributos))] -= 1
+        if obj not in eliminados:
+            deltas[modelo][clave(*(getattr(obj, atributo) for atributo in atributos))] += 1
+
+    for modelo, deltas_modelo in deltas.items():
+        deltas_modelo.pop(None, None)
+        _sumar(session.connection(), modelo, deltas_modelo)
+
+
+# ==================== INDICADORES ====================
+
+def _sumas(modelo, columnas, desde, hasta, medico_id):
+    query = db.session.query(*columnas, func.sum(modelo.total)).filter(
+        modelo.fecha >= desde, modelo.fecha <= hasta
+    )
+    if medico_id:
+        query = query.filter(modelo.medico_id == medico_id)
+    # Las filas que quedaron en cero tras mover citas no se informan
+    return query.group_by(*columnas).having(func.sum(modelo.total) != 0)
+
+
+def _tasas(por_estado, consultas):
+    citas = sum(por_estado.values())
+    # La inasistencia se mide sobre las citas que llegaron a su hora sin cancelarse
+    atendibles = por_estado['completada'] + por_estado['ausente']
+    return {
+        'citas': citas,
+        'por_estado': dict(por_estado),
+        'consultas_registradas': consultas,
+        'tasa_cancelacion': round(por_estado['cancelada'] / citas, 4) if citas else 0.0,
+        'tasa_inasistencia': round(por_estado['ausente'] / atendibles, 4) if atendibles else 0.0,
+    }
+
+
+def indicadores(desde, hasta, medico_id=None, periodo='mes'):
+    """
+    Volumen por tipo de consulta, utilización de los médicos, cancelaciones
+    e inasistencias entre `desde` y `hasta` (incluidos), con la serie de
+    citas por estado agrupada por `periodo` ('dia', 'semana' o 'mes').
+    """
+    duraciones = catalogos.duraciones_por_tipo()
+    totales = Counter()
+    por_tipo = defaultdict(Counter)
+    por_medico = defaultdict(Counter)
+    minutos = Counter()
+    for medico, tipo, estado, total in _sumas(
+        ResumenCitasDia, (ResumenCitasDia.medico_id, ResumenCitasDia.tipo_consulta, ResumenCitasDia.estado),
+        desde, hasta, medico_id
+    ):
+        totales[estado] += total
+        por_tipo[tipo][estado] += total
+        por_medico[medico][estado] += total
+        if estado != 'cancelada':
+            minutos[medico] += total * (duraciones.get(tipo) or disponibilidad.DURACION_PREDETERMINADA)
+
+    consultas_tipo = Counter()
+    consultas_medico = Counter()
+    for medico, tipo, total in _sumas(
+        ResumenConsultasDia, (ResumenConsultasDia.medico_id, ResumenConsultasDia.tipo_consulta),
+        desde, hasta, medico_id
+    ):
+        consultas_tipo[tipo] += total
+        consultas_medico[medico] += total
+
+    serie = defaultdict(Counter)
+    etiqueta = PERIODOS[periodo]
+    for fecha, estado, total in _sumas(
+        ResumenCitasDia, (ResumenCitasDia.fecha, ResumenCitasDia.estado), desde, hasta, medico_id
+    ):
+        serie[etiqueta(fecha)][estado] += total
+
+    disponibles = ((hasta - desde).days + 1) * MINUTOS_POR_DIA
+    medicos = []
+    for medico in sorted(por_medico.keys() | consultas_medico.keys()):
+        datos = catalogos.medico(medico)
+        medicos.append({
+            'medico_id': medico,
+            'nombre': datos.nombre_completo if datos else None,
+            **_tasas(por_medico[medico], consultas_medico[medico]),
+            'minutos_agendados': minutos[medico],
+            'minutos_disponibles': disponibles,
+            'utilizacion': round(minutos[medico] / disponibles, 4),
+        })
+
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'totales': _tasas(totales, sum(consultas_tipo.values())),
+        'por_tipo': [{'tipo_consulta': tipo, **_tasas(por_tipo[tipo], consultas_tipo[tipo])}
+                     for tipo in sorted(por_tipo.keys() | consultas_tipo.keys())],
+        'por_medico': medicos,
+        'serie': [{'periodo': clave, 'citas': sum(conteo.values()), 'por_estado': dict(conteo)}
+                  for clave, conteo in sorted(serie.items())],
+    }
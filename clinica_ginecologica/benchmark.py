@@ -0,0 +1,199 @@
+"""
+Benchmark de las rutas con el cliente de pruebas de Flask
+
+Inicia sesión como una paciente (por ejemplo, una generada con
+`datos_sinteticos`), recorre cada ruta de lectura varias veces y reporta
+p50/p99 de latencia y sentencias SQL por petición. Los resultados se
+guardan como JSON para comparar corridas entre commits. Las rutas que
+modifican datos (crear/cancelar citas, completar recordatorios) no se
+incluyen para que las corridas sean repetibles; el único POST es el del
+simulador, que después de la primera vez responde desde la caché.
+
+A la lista explícita se agregan las demás rutas GET sin parámetros de
+`app.url_map`, así una ruta nueva entra al benchmark sin tocar este archivo.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+import json
+import platform
+import subprocess
+import time
+
+from models import db, Cita, HistorialMedico, Paciente
+import consultas
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, round(p / 100 * len(valores) + 0.5) - 1))
+    return valores[indice]
+
+
+# Rutas que no se miden: cierran la sesión, exigen el token del personal o son internas
+ENDPOINTS_EXCLUIDOS = {'auth.logout', 'metricas', 'static'}
+BLUEPRINTS_EXCLUIDOS = {'personal'}
+
+# Combinación fija del simulador: se genera en el calentamiento y luego se sirve de la caché
+SIMULADOR = {'vph': {'activo': True, 'grado': 1}, 'candidiasis': {'activo': True, 'grado': 0}}
+
+
+def rutas(paciente_id):
+    """(nombre, url, requiere_sesion[, cuerpo JSON de un POST]) de cada ruta medida"""
+    cita = Cita.query.filter_by(paciente_id=paciente_id).order_by(Cita.id).first()
+    historial = HistorialMedico.query.filter_by(paciente_id=paciente_id).order_by(HistorialMedico.id).first()
+    medico_id = cita.medico_id if cita else 1
+    hoy = date.today().isoformat()
+    # Cursores de la segunda página: la paginación por clave no debe encarecerse al avanzar
+    _, cursor_citas = consultas.pagina_citas(paciente_id, 'todas', datetime.now(),
+                                             columnas=(Cita.id, Cita.fecha_hora))
+    _, cursor_historial = consultas.pagina_historial(paciente_id,
+                                                     columnas=(HistorialMedico.id, HistorialMedico.fecha_consulta))
+
+    lista = [
+        ('index', '/', False),
+        ('login', '/login', False),
+        ('simulador_patologias', '/simulador-patologias', False),
+        ('dashboard', '/dashboard', True),
+        ('mi_perfil', '/mi-perfil', True),
+        ('mis_citas_proximas', '/citas?filtro=proximas', True),
+        ('mis_citas_todas', '/citas?filtro=todas', True),
+        ('mis_citas_pasadas', '/citas?filtro=pasadas', True),
+        ('nueva_cita', '/citas/nueva', True),
+        ('historial_medico', '/historial', True),
+        ('buscar_historial', '/historial/buscar?q=quiste', True),
+        ('exportar_historial_ndjson', '/historial/exportar', True),
+        ('exportar_historial_csv', '/historial/exportar?formato=csv', True),
+        ('exportar_historial_html', '/historial/exportar?formato=html', True),
+        ('mis_recordatorios', '/recordatorios', True),
+        ('reportes', '/reportes', True),
+        ('api_horarios', f'/api/horarios-disponibles?medico_id={medico_id}&fecha={hoy}', True),
+        ('api_horarios_semana', f'/api/horarios-disponibles/semana?medico_id={medico_id}&desde={hoy}', True),
+        ('api_citas', '/api/citas', True),
+        ('api_citas_todas', '/api/citas?filtro=todas', True),
+        ('api_historial', '/api/historial', True),
+        ('api_buscar_historial', '/api/historial/buscar?q=quiste', True),
+        ('api_recordatorios', '/api/recordatorios', True),
+        ('api_v1_dashboard', '/api/v1/dashboard', True),
+        ('api_v1_catalogos', '/api/v1/catalogos', True),
+        ('api_v1_citas', '/api/v1/citas?filtro=todas', True),
+        ('api_v1_historial', '/api/v1/historial', True),
+        ('api_v1_recordatorios', '/api/v1/recordatorios', True),
+        ('api_v1_horarios', f'/api/v1/horarios-disponibles?medico_id={medico_id}&desde={hoy}&dias=7', True),
+        ('api_generar_imagen', '/api/generar-imagen-patologia', False, SIMULADOR),
+    ]
+    if cursor_citas:
+        lista.append(('api_citas_pagina_2', f'/api/citas?filtro=todas&cursor={cursor_citas}', True))
+        lista.append(('api_v1_citas_pagina_2', f'/api/v1/citas?filtro=todas&cursor={cursor_citas}', True))
+    if cursor_historial:
+        lista.append(('api_historial_pagina_2', f'/api/historial?cursor={cursor_historial}', True))
+        lista.append(('api_v1_historial_pagina_2', f'/api/v1/historial?cursor={cursor_historial}', True))
+    if cita:
+        lista.append(('ver_cita', f'/citas/{cita.id}', True))
+    if historial:
+        lista.append(('ver_historial', f'/historial/{historial.id}', True))
+    return lista
+
+
+def rutas_sin_parametros(app, medidas):
+    """Rutas GET sin parámetros de `app.url_map` que no están en `medidas`"""
+    urls = {entrada[1].split('?')[0] for entrada in medidas}
+    lista = []
+    for regla in sorted(app.url_map.iter_rules(), key=lambda regla: regla.rule):
+        blueprint = regla.endpoint.rpartition('.')[0]
+        if ('GET' not in regla.methods or regla.arguments or regla.rule in urls
+                or regla.endpoint in ENDPOINTS_EXCLUIDOS or blueprint in BLUEPRINTS_EXCLUIDOS):
+            continue
+        lista.append((regla.endpoint.replace('.', '_'), regla.rule, True))
+    return lista
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _medir(app, engine, lista_rutas, email, password, repeticiones, calentamiento):
+    anonimo = app.test_client()
+    autenticado = app.test_client()
+    respuesta = autenticado.post('/login', data={'email': email, 'password': password})
+    if respuesta.status_code != 302 or '/dashboard' not in respuesta.headers.get('Location', ''):
+        raise ValueError(f'No se pudo iniciar sesión como {email}.')
+
+    resultados = {}
+    for nombre, url, requiere_sesion, *cuerpo in lista_rutas:
+        cliente = autenticado if requiere_sesion else anonimo
+        pedir = cliente.post if cuerpo else cliente.get
+        opciones = {'json': cuerpo[0]} if cuerpo else {}
+        for _ in range(calentamiento):
+            pedir(url, **opciones).close()
+
+        tiempos = []
+        sentencias_por_peticion = []
+        for _ in range(repeticiones):
+            with consultas.contador_sentencias(engine) as sentencias:
+                inicio = time.perf_counter()
+                respuesta = pedir(url, **opciones)
+                respuesta.get_data()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            sentencias_por_peticion.append(len(sentencias))
+            estado = respuesta.status_code
+            respuesta.close()
+
+        tiempos.sort()
+        resultados[nombre] = {
+            'url': url,
+            'estado': estado,
+            'p50_ms': round(percentil(tiempos, 50), 3),
+            'p99_ms': round(percentil(tiempos, 99), 3),
+            'media_ms': round(sum(tiempos) / len(tiempos), 3),
+            'sentencias_por_peticion': max(sentencias_por_peticion),
+        }
+    return resultados
+
+
+def ejecutar(app, email, password, repeticiones=50, calentamiento=3):
+    """Mide cada ruta y devuelve el reporte como diccionario"""
+    paciente = Paciente.query.filter_by(email=email).first()
+    if paciente is None:
+        raise ValueError(f'No existe la paciente {email}.')
+
+    # Las peticiones se hacen en otro hilo: si reutilizaran el contexto de
+    # aplicación del comando, `g` (y con él la sesión de Flask-Login) se
+    # compartiría entre peticiones y el conteo de sentencias sería falso.
+    lista_rutas = rutas(paciente.id)
+    lista_rutas += rutas_sin_parametros(app, lista_rutas)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        resultados = executor.submit(_medir, app, db.engine, lista_rutas, email, password,
+                                     repeticiones, calentamiento).result()
+
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_actual(),
+        'python': platform.python_version(),
+        'base_de_datos': db.engine.url.render_as_string(hide_password=True),
+        'repeticiones': repeticiones,
+        'rutas': resultados,
+    }
+
+
+def guardar(reporte, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+
+
+def comparar(actual, anterior):
+    """Líneas con la variación de p50 y sentencias respecto de otra corrida"""
+    lineas = []
+    for nombre, datos in actual['rutas'].items():
+        previo = anterior.get('rutas', {}).get(nombre)
+        if previo is None:
+            continue
+        variacion = (datos['p50_ms'] - previo['p50_ms']) / max(previo['p50_ms'], 1e-9) * 100
+        lineas.append(f"{nombre}: p50 {previo['p50_ms']:.2f} → {datos['p50_ms']:.2f} ms ({variacion:+.0f}%), "
+                      f"SQL {previo['sentencias_por_peticion']} → {datos['sentencias_por_peticion']}")
+    return lineas
@@ -0,0 +1,206 @@
+"""
+Búsqueda de texto completo en el historial médico
+
+En SQLite, historiales_fts es una tabla FTS5 de contenido externo sobre
+historiales_medicos: guarda solo el índice y lee el texto de la tabla
+original. Los triggers la mantienen al día en toda escritura, también en
+los INSERT masivos de carga_masiva y datos_sinteticos.
+
+El paciente se indexa como una columna más, así que `paciente_id:7 AND ...`
+recorre solo las listas de sus historiales. La relevancia se calcula aquí,
+sobre las coincidencias del paciente: bm25() y los prefijos (`colpo*`)
+recorren la lista completa de cada término en toda la clínica y con un
+millón de historiales cuestan decenas de milisegundos por búsqueda.
+
+Las coincidencias se leen por bloques del más nuevo al más antiguo, con el
+id como cursor, hasta agotarlas: la relevancia se calcula sobre todas y no
+sobre un subconjunto arbitrario.
+
+Con otros motores se busca con ILIKE sobre los historiales del paciente.
+"""
+from datetime import datetime
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import or_, text
+
+from models import db, HistorialMedico
+import consultas
+
+TABLA = 'historiales_fts'
+# Campos indexados y su peso en la relevancia
+CAMPOS = {
+    'diagnostico': 10,
+    'sintomas': 4,
+    'tratamiento': 4,
+    'resultados_estudios': 3,
+    'observaciones': 2,
+}
+MAX_TERMINOS = 8
+BLOQUE_COINCIDENCIAS = 500
+# Cursor inicial: mayor que cualquier rowid de SQLite
+_ULTIMO_ID = 2 ** 63 - 1
+CONTEXTO = 60
+
+# Marcas de highlight(): caracteres de control que no aparecen en el texto clínico
+_INICIO, _FIN = '\x02', '\x03'
+_PALABRA = re.compile(r'\w+')
+
+_COLUMNAS = ', '.join(['paciente_id', *CAMPOS])
+_VIEJOS = ', '.join(f'old.{columna}' for columna in ['paciente_id', *CAMPOS])
+_NUEVOS = ', '.join(f'new.{columna}' for columna in ['paciente_id', *CAMPOS])
+
+ESQUEMA = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5(
+        {_COLUMNAS}, content='historiales_medicos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA}_ai AFTER INSERT ON historiales_medicos BEGIN
+        INSERT INTO {TABLA}(rowid, {_COLUMNAS}) VALUES (new.id, {_NUEVOS});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA}_ad AFTER DELETE ON historiales_medicos BEGIN
+        INSERT INTO {TABLA}({TABLA}, rowid, {_COLUMNAS}) VALUES ('delete', old.id, {_VIEJOS});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA}_au AFTER UPDATE OF {_COLUMNAS} ON historiales_medicos BEGIN
+        INSERT INTO {TABLA}({TABLA}, rowid, {_COLUMNAS}) VALUES ('delete', old.id, {_VIEJOS});
+        INSERT INTO {TABLA}(rowid, {_COLUMNAS}) VALUES (new.id, {_NUEVOS});
+    END""",
+)
+
+
+def _usa_fts():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def instalar():
+    """
+    Crea el índice y sus triggers si faltan y, si el índice es nuevo, lo
+    llena con los historiales existentes. Devuelve True si lo construyó.
+    """
+    if not _usa_fts():
+        return False
+    existe = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"), {'nombre': TABLA}
+    ).first() is not None
+    for sentencia in ESQUEMA:
+        db.session.execute(text(sentencia))
+    if not existe:
+        reconstruir()
+    db.session.commit()
+    return not existe
+
+
+def reconstruir():
+    """Rehace el índice desde historiales_medicos y compacta sus segmentos"""
+    db.session.execute(text(f"INSERT INTO {TABLA}({TABLA}) VALUES ('rebuild')"))
+    db.session.execute(text(f"INSERT INTO {TABLA}({TABLA}) VALUES ('optimize')"))
+
+
+def terminos(texto):
+    """Palabras de la búsqueda, sin repetir y como mucho MAX_TERMINOS"""
+    return list(dict.fromkeys(palabra.lower() for palabra in _PALABRA.findall(texto or '')))[:MAX_TERMINOS]
+
+
+def _consulta_fts(paciente_id, palabras):
+    # Cada palabra va entre comillas: el texto del usuario nunca se interpreta como sintaxis FTS5
+    frase = ' '.join(f'"{palabra}"' for palabra in palabras)
+    return f"paciente_id:{int(paciente_id)} AND {{{' '.join(CAMPOS)}}}:({frase})"
+
+
+def _por_bloques(leer_bloque):
+    """Recorre las coincidencias por bloques con el id de la última fila como cursor"""
+    cursor = None
+    while True:
+        filas = leer_bloque(cursor)
+        yield from filas
+        if len(filas) < BLOQUE_COINCIDENCIAS:
+            return
+        cursor = filas[-1][0]
+
+
+def _coincidencias_fts(paciente_id, palabras):
+    resaltados = ', '.join(
+        f"highlight({TABLA}, {indice}, char(2), char(3))" for indice in range(1, len(CAMPOS) + 1)
+    )
+    sentencia = text(
+        f"""SELECT h.id, h.fecha_consulta, h.tipo_consulta, h.medico_id, {resaltados}
+            FROM {TABLA} JOIN historiales_medicos h ON h.id = {TABLA}.rowid
+            WHERE {TABLA} MATCH :consulta AND {TABLA}.rowid < :cursor
+            ORDER BY {TABLA}.rowid DESC LIMIT :limite"""
+    ).columns(HistorialMedico.id, HistorialMedico.fecha_consulta,
+              HistorialMedico.tipo_consulta, HistorialMedico.medico_id)
+    consulta = _consulta_fts(paciente_id, palabras)
+
+    def leer_bloque(cursor):
+        # bm25() ordenaría por relevancia, pero recorre la lista de cada término en toda la clínica
+        return db.session.execute(sentencia, {
+            'consulta': consulta, 'cursor': _ULTIMO_ID if cursor is None else cursor,
+            'limite': BLOQUE_COINCIDENCIAS,
+        }).all()
+
+    for id_, fecha, tipo, medico_id, *textos in _por_bloques(leer_bloque):
+        yield id_, fecha, tipo, medico_id, dict(zip(CAMPOS, textos))
+
+
+def _coincidencias_like(paciente_id, palabras):
+    columnas = [getattr(HistorialMedico, campo) for campo in CAMPOS]
+    query = db.session.query(
+        HistorialMedico.id, HistorialMedico.fecha_consulta, HistorialMedico.tipo_consulta,
+        HistorialMedico.medico_id, *columnas
+    ).filter(
+        HistorialMedico.paciente_id == paciente_id,
+        *[or_(*[columna.ilike(f'%{palabra}%') for columna in columnas]) for palabra in palabras]
+    ).order_by(HistorialMedico.id.desc())
+
+    def leer_bloque(cursor):
+        bloque = query if cursor is None else query.filter(HistorialMedico.id < cursor)
+        return bloque.limit(BLOQUE_COINCIDENCIAS).all()
+
+    patron = re.compile('|'.join(re.escape(palabra) for palabra in palabras), re.IGNORECASE)
+    for id_, fecha, tipo, medico_id, *textos in _por_bloques(leer_bloque):
+        yield id_, fecha, tipo, medico_id, {
+            campo: patron.sub(lambda m: f'{_INICIO}{m.group()}{_FIN}', texto) if texto else texto
+            for campo, texto in zip(CAMPOS, textos)
+        }
+
+
+def _fragmento(resaltado):
+    """Recorta el texto alrededor de la primera coincidencia y la marca con <mark>"""
+    corte = max(resaltado.index(_INICIO) - CONTEXTO // 2, 0)
+    inicio = resaltado.rfind(' ', 0, corte) + 1 if corte else 0
+    recorte = resaltado[inicio:inicio + CONTEXTO + 2 * resaltado.count(_INICIO)]
+    if recorte.count(_INICIO) > recorte.count(_FIN):
+        recorte += _FIN
+    html = str(escape(recorte)).replace(_INICIO, '<mark>').replace(_FIN, '</mark>')
+    return Markup(('…' if inicio else '') + html + ('…' if inicio + len(recorte) < len(resaltado) else ''))
+
+
+def buscar(paciente_id, texto, pagina=1, por_pagina=consultas.POR_PAGINA):
+    """
+    Historiales del paciente que contienen todas las palabras de `texto`, de
+    mayor a menor relevancia (coincidencias ponderadas por campo) y, a igual
+    relevancia, del más reciente al más antiguo. Devuelve (resultados, hay_mas).
+    """
+    palabras = terminos(texto)
+    if not palabras:
+        return [], False
+
+    coincidencias = _coincidencias_fts if _usa_fts() else _coincidencias_like
+    resultados = []
+    for id_, fecha, tipo, medico_id, resaltados in coincidencias(paciente_id, palabras):
+        aciertos = {campo: valor.count(_INICIO) for campo, valor in resaltados.items()
+                    if valor and _INICIO in valor}
+        campo = max(aciertos, key=lambda c: (CAMPOS[c] * aciertos[c], CAMPOS[c]))
+        resultados.append({
+            'id': id_,
+            'fecha_consulta': fecha,
+            'tipo_consulta': tipo,
+            'medico_id': medico_id,
+            'relevancia': sum(CAMPOS[c] * n for c, n in aciertos.items()),
+            'campo': campo,
+            'fragmento': _fragmento(resaltados[campo]),
+        })
+
+    resultados.sort(key=lambda r: (r['relevancia'], r['fecha_consulta'] or datetime.min, r['id']),
+                    reverse=True)
+    inicio = (pagina - 1) * por_pagina
+    return resultados[inicio:inicio + por_pagina], len(resultados) > inicio + por_pagina
@@ -0,0 +1,44 @@
+"""
+Caché en memoria con expiración para el Sistema de Gestión de Pacientes Ginecológicos
+"""
+from collections import OrderedDict
+from threading import Lock
+import time
+
+
+class CacheTTL:
+    """Caché LRU segura entre hilos cuyas entradas expiran después de `ttl` segundos"""
+
+    def __init__(self, ttl, max_entradas=1024):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = Lock()
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado o None si no existe o ya expiró"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
@@ -0,0 +1,89 @@
+"""
+Caché HTTP de páginas públicas y archivos estáticos
+
+- `pagina_publica` guarda el HTML de una página para visitantes anónimos y
+  lo sirve con ETag, Last-Modified y Cache-Control, respondiendo 304 a las
+  peticiones condicionales.
+- Las URLs de `static` llevan una huella del contenido (?v=...), así que
+  pueden cachearse un año: cualquier cambio en el archivo cambia la URL.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
+import hashlib
+import os
+
+from flask import make_response, request, session
+from flask_login import current_user
+
+from cache import CacheTTL
+
+MAX_AGE_PAGINAS = 300
+MAX_AGE_ESTATICOS = 31536000
+
+_paginas = CacheTTL(ttl=3600, max_entradas=64)
+
+
+def pagina_publica(max_age=MAX_AGE_PAGINAS):
+    """
+    Decorador para vistas cuyo HTML es idéntico para todo visitante anónimo.
+    Las usuarias autenticadas o con mensajes flash pendientes reciben la
+    vista sin caché.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if current_user.is_authenticated or session.get('_flashes'):
+                return vista(*args, **kwargs)
+
+            entrada = _paginas.obtener(request.full_path)
+            if entrada is None:
+                cuerpo = vista(*args, **kwargs)
+                if not isinstance(cuerpo, str):
+                    return cuerpo
+                etag = hashlib.sha1(cuerpo.encode()).hexdigest()
+                entrada = (cuerpo, etag, datetime.now(timezone.utc).replace(microsecond=0))
+                _paginas.guardar(request.full_path, entrada)
+
+            cuerpo, etag, modificado = entrada
+            respuesta = make_response(cuerpo)
+            respuesta.set_etag(etag)
+            respuesta.last_modified = modificado
+            respuesta.cache_control.public = True
+            respuesta.cache_control.max_age = max_age
+            respuesta.vary.add('Cookie')
+            return respuesta.make_conditional(request)
+        return envoltura
+    return decorador
+
+
+def invalidar_paginas():
+    _paginas.limpiar()
+
+
+@lru_cache(maxsize=256)
+def _huella(ruta, modificado):
+    with open(ruta, 'rb') as archivo:
+        return hashlib.md5(archivo.read()).hexdigest()[:12]
+
+
+def configurar_estaticos(app):
+    """Agrega la huella a url_for('static', ...) y cachea por un año las URLs con huella"""
+
+    @app.url_defaults
+    def agregar_huella(endpoint, values):
+        if endpoint != 'static' or 'filename' not in values or 'v' in values:
+            return
+        ruta = os.path.join(app.static_folder, values['filename'])
+        try:
+            values['v'] = _huella(ruta, os.path.getmtime(ruta))
+        except OSError:
+            pass
+
+    @app.after_request
+    def cachear_estaticos(respuesta):
+        if request.endpoint == 'static' and 'v' in request.args and respuesta.status_code == 200:
+            respuesta.cache_control.no_cache = None
+            respuesta.cache_control.public = True
+            respuesta.cache_control.max_age = MAX_AGE_ESTATICOS
+            respuesta.cache_control.immutable = True
+        return respuesta
@@ -0,0 +1,275 @@
+"""
+Importación y exportación masiva de pacientes, citas e historiales
+
+Los archivos (CSV con encabezado o NDJSON) se leen por bloques: cada bloque
+se valida contra las columnas del modelo, se descartan duplicados y se
+inserta con un único INSERT de varias filas antes de confirmar. La
+exportación recorre la tabla con yield_per, sin cargarla entera en memoria.
+"""
+import csv
+from datetime import date, datetime
+import json
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Paciente, Cita, HistorialMedico
+import agenda
+import analitica
+import contrasenas
+import disponibilidad
+import estadisticas
+
+TAMANO_LOTE = 1000
+
+TABLAS = {
+    'pacientes': Paciente,
+    'citas': Cita,
+    'historiales': HistorialMedico,
+}
+
+# Columnas que nunca se exportan salvo pedido explícito
+COLUMNAS_SENSIBLES = {'password_hash'}
+
+VALORES_VERDADEROS = {'1', 'true', 't', 'si', 'sí', 's', 'yes', 'y'}
+
+
+class FilaInvalida(ValueError):
+    pass
+
+
+# ==================== LECTURA ====================
+
+def leer_filas(archivo, formato):
+    """
+    Itera (número, registro) del archivo: el número es la fila de datos en
+    CSV y la línea en NDJSON. Una línea que no es un objeto JSON se entrega
+    como FilaInvalida para informarla sin cortar la importación.
+    """
+    if formato == 'csv':
+        yield from enumerate(csv.DictReader(archivo), start=1)
+        return
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, FilaInvalida(f'JSON inválido: {e.msg} (columna {e.colno})')
+            continue
+        if not isinstance(fila, dict):
+            fila = FilaInvalida('se esperaba un objeto JSON')
+        yield numero, fila
+
+
+def en_lotes(filas, tamano):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# ==================== VALIDACIÓN ====================
+
+def _convertir(columna, valor):
+    if valor is None or valor == '':
+        return None
+    tipo = columna.type.python_type
+    if isinstance(valor, tipo) and tipo is not date:
+        return valor
+    if tipo is datetime:
+        return datetime.fromisoformat(str(valor))
+    if tipo is date:
+        return date.fromisoformat(str(valor)[:10])
+    if tipo is bool:
+        return str(valor).strip().lower() in VALORES_VERDADEROS
+    if tipo is str:
+        valor = str(valor)
+        if columna.type.length and len(valor) > columna.type.length:
+            raise FilaInvalida(f'{columna.name} supera {columna.type.length} caracteres')
+        return valor
+    return tipo(valor)
+
+
+def validar_fila(modelo, fila):
+    """Convierte la fila a los tipos del modelo y verifica las columnas obligatorias"""
+    registro = {}
+    for columna in modelo.__table__.columns:
+        if columna.primary_key or columna.name not in fila:
+            continue
+        try:
+            registro[columna.name] = _convertir(columna, fila[columna.name])
+        except (TypeError, ValueError) as e:
+            raise FilaInvalida(f'{columna.name}: {e}') from e
+
+    for columna in modelo.__table__.columns:
+        obligatoria = not columna.nullable and not columna.primary_key and columna.default is None
+        if obligatoria and registro.get(columna.name) is None:
+            raise FilaInvalida(f'falta {columna.name}')
+    return registro
+
+
+# ==================== IMPORTACIÓN ====================
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.leidas = 0
+        self.insertadas = 0
+        self.duplicadas = 0
+        self.errores = []
+
+    @property
+    def por_segundo(self):
+        return self.leidas / max(time.monotonic() - self.inicio, 1e-9)
+
+    def resumen(self):
+        return (f'leídas={self.leidas} insertadas={self.insertadas} duplicadas={self.duplicadas} '
+                f'inválidas={len(self.errores)} ({self.por_segundo:.0f} filas/s)')
+
+
+def _descartar_duplicados(pares, resultado, vistos):
+    """Descarta pacientes cuyo email o cédula ya existe en la BD o antes en el archivo"""
+    emails = {fila.get('email') for _, fila in pares}
+    cedulas = {fila.get('cedula') for _, fila in pares}
+    existentes = db.session.query(Paciente.email, Paciente.cedula).filter(
+        Paciente.email.in_(emails) | Paciente.cedula.in_(cedulas)
+    ).all()
+    vistos['email'].update(email for email, _ in existentes)
+    vistos['cedula'].update(cedula for _, cedula in existentes)
+
+    nuevos = []
+    for numero, fila in pares:
+        email, cedula = fila.get('email'), fila.get('cedula')
+        if not email or not cedula:
+            # La validación la rechazará por falta de datos obligatorios
+            nuevos.append((numero, fila))
+            continue
+        if email in vistos['email'] or cedula in vistos['cedula']:
+            resultado.duplicadas += 1
+            continue
+        vistos['email'].add(email)
+        vistos['cedula'].add(cedula)
+        nuevos.append((numero, fila))
+    return nuevos
+
+
+def _hashear_passwords(pares):
+    """Las contraseñas en texto plano (columna `password`) se hashean en paralelo"""
+    pendientes = [fila for _, fila in pares if fila.get('password')]
+    hashes = contrasenas.generar_hashes([fila['password'] for fila in pendientes])
+    for fila, password_hash in zip(pendientes, hashes):
+        fila['password_hash'] = password_hash
+
+
+def _resolver_pacientes(pares):
+    """Permite referenciar al paciente por `paciente_cedula` en lugar de `paciente_id`"""
+    cedulas = {fila['paciente_cedula'] for _, fila in pares if fila.get('paciente_cedula')}
+    if not cedulas:
+        return
+    ids = dict(db.session.query(Paciente.cedula, Paciente.id).filter(Paciente.cedula.in_(cedulas)))
+    for _, fila in pares:
+        if fila.get('paciente_cedula') and not fila.get('paciente_id'):
+            fila['paciente_id'] = ids.get(fila['paciente_cedula'])
+
+
+def _insertar(modelo, registros, resultado):
+    """Inserta el bloque de una vez; si algún registro choca con una restricción, fila por fila"""
+    # Un INSERT de varias filas toma las columnas del primer registro: se
+    # agrupan por conjunto de columnas para no perder campos ni defaults
+    grupos = {}
+    for _, registro in registros:
+        grupos.setdefault(frozenset(registro), []).append(registro)
+    try:
+        for grupo in grupos.values():
+            db.session.execute(insert(modelo.__table__), grupo)
+        db.session.commit()
+        resultado.insertadas += len(registros)
+        return
+    except IntegrityError:
+        db.session.rollback()
+
+    for numero, registro in registros:
+        try:
+            db.session.execute(insert(modelo.__table__), registro)
+            db.session.commit()
+            resultado.insertadas += 1
+        except IntegrityError as e:
+            db.session.rollback()
+            resultado.errores.append((numero, str(e.orig)))
+
+
+def importar(tabla, archivo, formato='csv', tamano=TAMANO_LOTE, al_terminar_lote=None):
+    """Importa el archivo por bloques de `tamano` filas y devuelve un ResultadoImportacion"""
+    modelo = TABLAS[tabla]
+    resultado = ResultadoImportacion()
+    vistos = {'email': set(), 'cedula': set()}
+
+    for pares in en_lotes(leer_filas(archivo, formato), tamano):
+        resultado.leidas += len(pares)
+        resultado.errores.extend((numero, str(fila)) for numero, fila in pares if isinstance(fila, FilaInvalida))
+        pares = [(numero, fila) for numero, fila in pares if not isinstance(fila, FilaInvalida)]
+        if modelo is Paciente:
+            pares = _descartar_duplicados(pares, resultado, vistos)
+            _hashear_passwords(pares)
+        else:
+            _resolver_pacientes(pares)
+
+        registros = []
+        for numero, fila in pares:
+            try:
+                registros.append((numero, validar_fila(modelo, fila)))
+            except FilaInvalida as e:
+                resultado.errores.append((numero, str(e)))
+
+        if registros:
+            _insertar(modelo, registros, resultado)
+        if al_terminar_lote:
+            al_terminar_lote(resultado)
+
+    # Los INSERT masivos no pasan por la sesión del ORM: se rehacen los datos derivados
+    if modelo is Cita:
+        agenda.reconstruir()
+    if modelo in (Cita, HistorialMedico):
+        analitica.reconstruir()
+    if modelo is not Paciente:
+        disponibilidad.invalidar_todo()
+        estadisticas.invalidar_todo()
+    return resultado
+
+
+# ==================== EXPORTACIÓN ====================
+
+def _serializar(valor):
+    return valor.isoformat() if isinstance(valor, (date, datetime)) else valor
+
+
+def exportar(tabla, salida, formato='csv', incluir_sensibles=False, tamano=TAMANO_LOTE):
+    """Escribe la tabla completa en `salida` leyendo de a `tamano` filas. Devuelve (filas, segundos)."""
+    modelo = TABLAS[tabla]
+    columnas = [c for c in modelo.__table__.columns
+                if incluir_sensibles or c.name not in COLUMNAS_SENSIBLES]
+    nombres = [c.name for c in columnas]
+    inicio = time.monotonic()
+
+    escritor = csv.writer(salida) if formato == 'csv' else None
+    if escritor:
+        escritor.writerow(nombres)
+
+    total = 0
+    resultado = db.session.execute(
+        select(*columnas).order_by(modelo.id).execution_options(yield_per=tamano)
+    )
+    for fila in resultado:
+        valores = [_serializar(valor) for valor in fila]
+        if escritor:
+            escritor.writerow(valores)
+        else:
+            salida.write(json.dumps(dict(zip(nombres, valores)), ensure_ascii=False) + '\n')
+        total += 1
+    return total, time.monotonic() - inicio
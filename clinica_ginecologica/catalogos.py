@@ -0,0 +1,86 @@
+"""
+Catálogos de médicos y tipos de consulta en memoria
+
+Cambian muy poco, así que se leen una vez y se reutilizan hasta que se
+confirma una escritura sobre Medico o TipoConsulta (o, como red de
+seguridad entre procesos, hasta que vence el TTL).
+"""
+from itertools import chain
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from cache import CacheTTL
+from models import Medico, TipoConsulta
+
+TTL_SEGUNDOS = 300
+
+_cache = CacheTTL(ttl=TTL_SEGUNDOS)
+
+
+def _cargar(clave, consulta):
+    elementos = _cache.obtener(clave)
+    if elementos is None:
+        elementos = consulta()
+        _cache.guardar(clave, elementos)
+    return elementos
+
+
+def medicos():
+    """Todos los médicos como objetos simples (no ligados a la sesión)"""
+    return _cargar('medicos', lambda: tuple(
+        SimpleNamespace(id=m.id, nombres=m.nombres, apellidos=m.apellidos,
+                        nombre_completo=m.nombre_completo, especialidad=m.especialidad,
+                        activo=m.activo)
+        for m in Medico.query.order_by(Medico.id)
+    ))
+
+
+def tipos_consulta():
+    """Todos los tipos de consulta como objetos simples (no ligados a la sesión)"""
+    return _cargar('tipos_consulta', lambda: tuple(
+        SimpleNamespace(id=t.id, nombre=t.nombre, descripcion=t.descripcion,
+                        duracion_minutos=t.duracion_minutos, activo=t.activo)
+        for t in TipoConsulta.query.order_by(TipoConsulta.id)
+    ))
+
+
+def medico(medico_id):
+    """El médico con ese id, o None"""
+    return _cargar('medicos_por_id', lambda: {m.id: m for m in medicos()}).get(medico_id)
+
+
+def medicos_activos():
+    return [medico for medico in medicos() if medico.activo]
+
+
+def tipos_consulta_activos():
+    return [tipo for tipo in tipos_consulta() if tipo.activo]
+
+
+def duraciones_por_tipo():
+    """Duración en minutos de cada tipo de consulta (activo o no), por nombre"""
+    return {tipo.nombre: tipo.duracion_minutos for tipo in tipos_consulta()}
+
+
+def invalidar():
+    _cache.limpiar()
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios_catalogo(session, flush_context):
+    if any(isinstance(obj, (Medico, TipoConsulta))
+           for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['catalogos_modificados'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_catalogos(session):
+    if session.info.pop('catalogos_modificados', False):
+        invalidar()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_cambios_catalogo(session):
+    session.info.pop('catalogos_modificados', None)
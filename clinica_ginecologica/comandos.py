@@ -0,0 +1,234 @@
+"""
+Comandos de línea de órdenes (flask <comando>)
+"""
+from datetime import datetime
+import csv
+import json
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, init_db
+import agenda
+import analitica
+import benchmark
+import carga_masiva
+import consultas
+import contrasenas
+import datos_sinteticos
+import despacho
+import obstetricia
+import transiciones
+
+
+@click.command('init-db')
+@with_appcontext
+def inicializar_bd():
+    """Crea las tablas que falten, carga los datos iniciales y rehace la agenda y los resúmenes diarios."""
+    init_db(current_app._get_current_object())
+    click.echo(f'{agenda.reconstruir()} bloques en la agenda de los médicos.', err=True)
+    click.echo(f'{analitica.reconstruir()} filas en los resúmenes diarios.', err=True)
+
+
+@click.command('verificar-indices')
+@with_appcontext
+@click.option('--paciente-id', default=1, show_default=True, help='Paciente usado para construir las consultas.')
+def verificar_indices(paciente_id):
+    """Verifica con EXPLAIN QUERY PLAN que las consultas de las rutas usan índices."""
+    fallidas = 0
+    for nombre, query in consultas.consultas_criticas(paciente_id, datetime.now()).items():
+        plan = consultas.plan_de_consulta(db.session, query)
+        recorridos = consultas.recorridos_completos(plan)
+        estado = 'ERROR' if recorridos else 'OK'
+        click.echo(f"[{estado}] {nombre}: {' | '.join(plan)}")
+        fallidas += bool(recorridos)
+    
+    if fallidas:
+        raise click.ClickException(f'{fallidas} consulta(s) recorren tablas completas.')
+    click.echo('Todas las consultas usan índices.')
+
+
+@click.command('despachar-recordatorios')
+@with_appcontext
+@click.option('--emisor', default='consola', show_default=True, type=click.Choice(list(despacho.EMISORES)),
+              help='Canal por el que se envían los recordatorios.')
+@click.option('--destino', default=None, help='Argumento del emisor (ruta del archivo para "archivo").')
+@click.option('--lote', default=despacho.TAMANO_LOTE, show_default=True, help='Recordatorios reclamados por lote.')
+@click.option('--hilos', default=despacho.HILOS, show_default=True, help='Envíos en paralelo.')
+@click.option('--intervalo', default=30, show_default=True, help='Segundos entre revisiones de la cola.')
+@click.option('--una-vez', is_flag=True, help='Vaciar la cola y terminar.')
+@click.option('--liberar', is_flag=True, help='Devolver a la cola los recordatorios que quedaron en "enviando".')
+@click.option('--max-antiguedad-horas', default=despacho.MAX_ANTIGUEDAD_HORAS, show_default=True,
+              help='Los recordatorios con más atraso no se envían (pasan a "caducado").')
+def despachar_recordatorios(emisor, destino, lote, hilos, intervalo, una_vez, liberar, max_antiguedad_horas):
+    """Worker que envía los recordatorios vencidos y los marca como enviados."""
+    if liberar:
+        click.echo(f'{despacho.liberar_reclamados()} recordatorio(s) devueltos a la cola.', err=True)
+    
+    metricas = despacho.ejecutar(
+        despacho.crear_emisor(emisor, destino), tamano=lote, hilos=hilos, intervalo=intervalo,
+        una_vez=una_vez, al_terminar_lote=lambda m: click.echo(m.resumen(), err=True),
+        max_antiguedad_horas=max_antiguedad_horas
+    )
+    click.echo(metricas.resumen(), err=True)
+
+
+@click.command('barrer-citas')
+@with_appcontext
+@click.option('--margen-horas', default=transiciones.MARGEN_HORAS, show_default=True,
+              help='Solo se completan las citas de hace más de estas horas.')
+@click.option('--lote', default=transiciones.TAMANO_LOTE, show_default=True, help='Citas por transacción.')
+@click.option('--pausa', default=0.0, show_default=True, help='Segundos de espera entre lotes.')
+@click.option('--intervalo', default=3600, show_default=True, help='Segundos entre barridos.')
+@click.option('--una-vez', is_flag=True, help='Hacer un solo barrido y terminar.')
+def barrer_citas(margen_horas, lote, pausa, intervalo, una_vez):
+    """Marca como completadas las citas pendientes o confirmadas que ya pasaron."""
+    while True:
+        resultado = transiciones.barrer_vencidas(
+            margen_horas=margen_horas, tamano=lote, pausa=pausa,
+            al_terminar_lote=lambda r: click.echo(r.resumen(), err=True)
+        )
+        click.echo(resultado.resumen(), err=True)
+        if una_vez:
+            return
+        time.sleep(intervalo)
+
+
+@click.command('controles-prenatales')
+@with_appcontext
+def controles_prenatales():
+    """Programa los recordatorios de Control Prenatal de todas las embarazadas."""
+    inicio = time.perf_counter()
+    pacientes, recordatorios = obstetricia.programar_recordatorios()
+    click.echo(f'{recordatorios} recordatorios programados para {pacientes} embarazadas '
+               f'en {time.perf_counter() - inicio:.1f} s', err=True)
+
+
+@click.command('controles-vencidos')
+@with_appcontext
+@click.argument('archivo', type=click.File('w', encoding='utf-8', lazy=False), default='-')
+def controles_vencidos(archivo):
+    """Reporte CSV de embarazadas con un control prenatal vencido, en una sola pasada."""
+    inicio = time.perf_counter()
+    escritor = None
+    total = 0
+    for fila in obstetricia.controles_vencidos(datetime.now().date()):
+        if escritor is None:
+            escritor = csv.DictWriter(archivo, fieldnames=list(fila))
+            escritor.writeheader()
+        escritor.writerow(fila)
+        total += 1
+    click.echo(f'{total} embarazadas con controles vencidos ({time.perf_counter() - inicio:.2f} s)', err=True)
+
+
+@click.command('medir-hash')
+@with_appcontext
+@click.option('--metodo', multiple=True, help='Métodos de Werkzeug a comparar (por defecto, el configurado).')
+@click.option('--repeticiones', default=20, show_default=True)
+def medir_hash(metodo, repeticiones):
+    """Mide el costo de cada método de hash e inicios de sesión por segundo por núcleo."""
+    for nombre in metodo or [contrasenas.metodo()]:
+        ms = contrasenas.medir(nombre, repeticiones)
+        click.echo(f'{nombre}: {ms:.1f} ms por hash, ~{1000 / ms:.0f} inicios de sesión/s por núcleo')
+
+
+@click.command('importar')
+@with_appcontext
+@click.argument('tabla', type=click.Choice(list(carga_masiva.TABLAS)))
+@click.argument('archivo', type=click.File('r', encoding='utf-8'))
+@click.option('--formato', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--lote', default=carga_masiva.TAMANO_LOTE, show_default=True, help='Filas por transacción.')
+def importar(tabla, archivo, formato, lote):
+    """Importa pacientes, citas o historiales desde CSV/NDJSON por bloques."""
+    resultado = carga_masiva.importar(
+        tabla, archivo, formato, lote, al_terminar_lote=lambda r: click.echo(r.resumen(), err=True)
+    )
+    for numero, error in resultado.errores[:20]:
+        click.echo(f'  fila {numero}: {error}', err=True)
+    click.echo(resultado.resumen(), err=True)
+
+
+@click.command('exportar')
+@with_appcontext
+@click.argument('tabla', type=click.Choice(list(carga_masiva.TABLAS)))
+@click.argument('archivo', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--formato', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--incluir-password-hash', is_flag=True, help='Exportar también los hashes de contraseña.')
+def exportar(tabla, archivo, formato, incluir_password_hash):
+    """Exporta una tabla completa a CSV/NDJSON sin cargarla en memoria."""
+    filas, segundos = carga_masiva.exportar(tabla, archivo, formato, incluir_password_hash)
+    click.echo(f'{filas} filas exportadas ({filas / max(segundos, 1e-9):.0f} filas/s)', err=True)
+
+
+@click.command('generar-datos')
+@with_appcontext
+@click.option('--pacientes', default=100, show_default=True)
+@click.option('--medicos', default=5, show_default=True)
+@click.option('--citas', default=20, show_default=True, help='Citas por paciente.')
+@click.option('--historiales', default=10, show_default=True, help='Historiales por paciente.')
+@click.option('--recordatorios', default=5, show_default=True, help='Recordatorios por paciente.')
+@click.option('--semilla', default=42, show_default=True)
+@click.option('--referencia', type=click.DateTime(['%Y-%m-%d']), default=None,
+              help='Fecha alrededor de la cual se reparten los datos (por defecto, hoy).')
+def generar_datos(pacientes, medicos, citas, historiales, recordatorios, semilla, referencia):
+    """Genera datos sintéticos deterministas para pruebas de carga."""
+    init_db(current_app._get_current_object())
+    inicio = time.perf_counter()
+    try:
+        totales = datos_sinteticos.generar(pacientes, medicos, citas, historiales, recordatorios, semilla,
+                                           referencia.date() if referencia else None)
+    except datos_sinteticos.DatosExistentes as e:
+        raise click.ClickException(str(e))
+    click.echo(', '.join(f'{n} {tabla}' for tabla, n in totales.items())
+               + f' en {time.perf_counter() - inicio:.1f} s', err=True)
+    click.echo(f'Acceso: {datos_sinteticos.email_paciente(semilla, 0)} / {datos_sinteticos.PASSWORD}', err=True)
+
+
+@click.command('benchmark')
+@with_appcontext
+@click.option('--email', default=datos_sinteticos.email_paciente(42, 0), show_default=True,
+              help='Paciente con la que se inicia sesión.')
+@click.option('--password', default=datos_sinteticos.PASSWORD, show_default=True)
+@click.option('--repeticiones', default=50, show_default=True, help='Peticiones medidas por ruta.')
+@click.option('--salida', type=click.Path(dir_okay=False), default=None, help='Guardar el reporte en JSON.')
+@click.option('--comparar', 'anterior', type=click.File('r', encoding='utf-8'), default=None,
+              help='Reporte JSON de una corrida anterior.')
+def ejecutar_benchmark(email, password, repeticiones, salida, anterior):
+    """Mide p50/p99 y sentencias SQL por petición de cada ruta de lectura."""
+    try:
+        reporte = benchmark.ejecutar(current_app._get_current_object(), email, password, repeticiones)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    
+    click.echo(f"{'ruta':<28}{'estado':>7}{'p50 ms':>10}{'p99 ms':>10}{'SQL':>6}")
+    for nombre, datos in reporte['rutas'].items():
+        click.echo(f"{nombre:<28}{datos['estado']:>7}{datos['p50_ms']:>10.2f}"
+                   f"{datos['p99_ms']:>10.2f}{datos['sentencias_por_peticion']:>6}")
+    if anterior:
+        for linea in benchmark.comparar(reporte, json.load(anterior)):
+            click.echo(linea)
+    if salida:
+        benchmark.guardar(reporte, salida)
+        click.echo(f'Reporte guardado en {salida}', err=True)
+
+
+COMANDOS = (
+    inicializar_bd,
+    verificar_indices,
+    despachar_recordatorios,
+    barrer_citas,
+    controles_prenatales,
+    controles_vencidos,
+    medir_hash,
+    importar,
+    exportar,
+    generar_datos,
+    ejecutar_benchmark,
+)
+
+
+def registrar(app):
+    for comando in COMANDOS:
+        app.cli.add_command(comando)
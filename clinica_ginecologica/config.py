@@ -0,0 +1,47 @@
+"""
+Configuración de la aplicación
+
+`desde_entorno()` arma la configuración a partir de variables de entorno;
+`create_app()` la aplica y encima aplica la configuración explícita que
+reciba (por ejemplo, PRUEBAS para instancias en memoria).
+"""
+import os
+
+import contrasenas
+import metricas
+import motor
+
+CLAVE_DESARROLLO = 'tu-clave-secreta-cambiar-en-produccion'
+
+# Instancia aislada en memoria, con un hash barato para que las pruebas sean rápidas
+PRUEBAS = {
+    'TESTING': True,
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'GENERADOR_IMAGENES_HILOS': 1,
+}
+
+
+def desde_entorno(entorno=None):
+    entorno = os.environ if entorno is None else entorno
+    return {
+        'SECRET_KEY': entorno.get('SECRET_KEY', CLAVE_DESARROLLO),
+        'SQLALCHEMY_DATABASE_URI': entorno.get('DATABASE_URL', motor.URI_PREDETERMINADA),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # Método y costo del hash de contraseñas; los hashes antiguos se regeneran al iniciar sesión
+        'PASSWORD_HASH_METHOD': entorno.get('PASSWORD_HASH_METHOD', contrasenas.METODO_PREDETERMINADO),
+        # Hilos dedicados a calcular hashes (por defecto, uno por núcleo)
+        'PASSWORD_HASH_WORKERS': int(entorno.get('PASSWORD_HASH_WORKERS', 0)) or None,
+        # Backend del simulador de patologías (ver generacion_imagenes.GENERADORES)
+        'GENERADOR_IMAGENES': entorno.get('GENERADOR_IMAGENES', 'stub'),
+        'GENERADOR_IMAGENES_HILOS': int(entorno.get('GENERADOR_IMAGENES_HILOS', 2)),
+        'IMAGENES_CACHE_DIR': entorno.get('IMAGENES_CACHE_DIR'),
+        # Segundos que se reutiliza el paciente autenticado sin consultar la BD (0 = desactivado)
+        'PRINCIPAL_CACHE_SEGUNDOS': int(entorno.get('PRINCIPAL_CACHE_SEGUNDOS', 0)),
+        # Token de la API del personal: agenda y cambios de estado en bloque (sin token, deshabilitada)
+        'PERSONAL_API_TOKEN': entorno.get('PERSONAL_API_TOKEN'),
+        # Sentencias SQL más lentas que este umbral se registran con su ruta
+        'SQL_LENTA_MS': float(entorno.get('SQL_LENTA_MS', metricas.SQL_LENTA_MS)),
+        # Token de /metrics; sin token solo se sirve a localhost (detrás de un proxy, configúrelo)
+        'METRICAS_TOKEN': entorno.get('METRICAS_TOKEN'),
+    }
@@ -0,0 +1,251 @@
+"""
+Consultas frecuentes del Sistema de Gestión de Pacientes Ginecológicos
+
+Cada función devuelve un Query sin ejecutar, de modo que las rutas y el
+comando `verificar-indices` comparten exactamente la misma consulta.
+"""
+import base64
+import binascii
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, or_, tuple_
+from sqlalchemy.orm import joinedload
+
+from models import db, BloqueAgenda, Cita, HistorialMedico, Paciente, Recordatorio
+
+ESTADOS_ACTIVOS = ['pendiente', 'confirmada']
+POR_PAGINA = 20
+
+
+# ==================== CITAS ====================
+
+def proximas_citas(paciente_id, ahora):
+    """Próximas citas pendientes o confirmadas (dashboard)"""
+    return Cita.query.options(joinedload(Cita.medico)).filter(
+        Cita.paciente_id == paciente_id,
+        Cita.fecha_hora >= ahora,
+        Cita.estado.in_(ESTADOS_ACTIVOS)
+    ).order_by(Cita.fecha_hora)
+
+
+def citas_paciente(paciente_id, filtro, ahora):
+    """Citas del paciente según el filtro: proximas, pasadas o todas"""
+    query = Cita.query.options(joinedload(Cita.medico)).filter(Cita.paciente_id == paciente_id)
+
+    if filtro == 'proximas':
+        return query.filter(Cita.fecha_hora >= ahora).order_by(Cita.fecha_hora, Cita.id)
+    if filtro == 'pasadas':
+        return query.filter(Cita.fecha_hora < ahora).order_by(Cita.fecha_hora.desc(), Cita.id.desc())
+    return query.order_by(Cita.fecha_hora.desc(), Cita.id.desc())
+
+
+def citas_activas_medico(medico_id, desde, hasta):
+    """Citas pendientes o confirmadas del médico en el rango [desde, hasta)"""
+    return Cita.query.filter(
+        Cita.medico_id == medico_id,
+        Cita.fecha_hora >= desde,
+        Cita.fecha_hora < hasta,
+        Cita.estado.in_(ESTADOS_ACTIVOS)
+    ).order_by(Cita.fecha_hora)
+
+
+def citas_vencidas(corte):
+    """Citas pendientes o confirmadas anteriores a `corte`, sin orden (barrido por lotes)"""
+    return Cita.query.filter(
+        Cita.estado.in_(ESTADOS_ACTIVOS),
+        Cita.fecha_hora < corte
+    )
+
+
+# ==================== AGENDA DEL MÉDICO ====================
+
+def bloques_medico(medico_id, desde, hasta):
+    """Intervalos ocupados del médico entre las fechas [desde, hasta)"""
+    return db.session.query(BloqueAgenda.fecha, BloqueAgenda.inicio, BloqueAgenda.fin).filter(
+        BloqueAgenda.medico_id == medico_id,
+        BloqueAgenda.fecha >= desde,
+        BloqueAgenda.fecha < hasta
+    ).order_by(BloqueAgenda.fecha, BloqueAgenda.inicio)
+
+
+def bloques_superpuestos(medico_id, fecha, inicio, fin):
+    """Bloques del médico ese día que se superponen con el intervalo [inicio, fin)"""
+    return BloqueAgenda.query.filter(
+        BloqueAgenda.medico_id == medico_id,
+        BloqueAgenda.fecha == fecha,
+        BloqueAgenda.inicio < fin,
+        BloqueAgenda.fin > inicio
+    )
+
+
+def agenda_medico(medico_id, desde, hasta):
+    """Citas activas del médico entre las fechas [desde, hasta), con la paciente"""
+    return db.session.query(
+        BloqueAgenda.fecha, BloqueAgenda.inicio, BloqueAgenda.fin, Cita.id, Cita.tipo_consulta,
+        Cita.estado, Cita.motivo, Paciente.id, Paciente.nombres, Paciente.apellidos
+    ).join(Cita, Cita.id == BloqueAgenda.cita_id).join(Paciente, Paciente.id == Cita.paciente_id).filter(
+        BloqueAgenda.medico_id == medico_id,
+        BloqueAgenda.fecha >= desde,
+        BloqueAgenda.fecha < hasta
+    ).order_by(BloqueAgenda.fecha, BloqueAgenda.inicio)
+
+
+# ==================== RECORDATORIOS ====================
+
+def recordatorios_activos(paciente_id, ahora):
+    """Recordatorios activos y futuros (dashboard)"""
+    return Recordatorio.query.filter(
+        Recordatorio.paciente_id == paciente_id,
+        Recordatorio.estado == 'activo',
+        Recordatorio.fecha_recordatorio >= ahora
+    ).order_by(Recordatorio.fecha_recordatorio)
+
+
+def recordatorios_paciente(paciente_id):
+    """Todos los recordatorios del paciente, del más reciente al más antiguo"""
+    return Recordatorio.query.filter(
+        Recordatorio.paciente_id == paciente_id
+    ).order_by(Recordatorio.fecha_recordatorio.desc(), Recordatorio.id.desc())
+
+
+def recordatorios_vencidos(ahora, desde=None):
+    """
+    Cola de recordatorios activos cuya fecha ya llegó (y es posterior a
+    `desde`), del más antiguo al más nuevo, sin los que esperan un reintento
+    """
+    query = Recordatorio.query.filter(
+        Recordatorio.estado == 'activo',
+        Recordatorio.fecha_recordatorio <= ahora,
+        or_(Recordatorio.proximo_intento.is_(None), Recordatorio.proximo_intento <= ahora)
+    )
+    if desde is not None:
+        query = query.filter(Recordatorio.fecha_recordatorio > desde)
+    return query.order_by(Recordatorio.fecha_recordatorio)
+
+
+# ==================== HISTORIAL MÉDICO ====================
+
+def historial_paciente(paciente_id):
+    """Consultas del historial del paciente, de la más reciente a la más antigua"""
+    return HistorialMedico.query.options(joinedload(HistorialMedico.medico)).filter(
+        HistorialMedico.paciente_id == paciente_id
+    ).order_by(HistorialMedico.fecha_consulta.desc(), HistorialMedico.id.desc())
+
+
+# ==================== PAGINACIÓN POR CURSOR ====================
+
+def codificar_cursor(fecha, id_):
+    """Cursor opaco con la posición (fecha, id) de la última fila entregada"""
+    return base64.urlsafe_b64encode(f'{fecha.isoformat()}|{id_}'.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha, id) o None si el cursor falta o no es válido"""
+    if not cursor:
+        return None
+    try:
+        fecha, id_ = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(fecha), int(id_)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def paginar(query, columna_fecha, columna_id, cursor=None, descendente=True, por_pagina=POR_PAGINA):
+    """
+    Aplica paginación por clave (fecha, id) sobre una consulta ya ordenada
+    por esas columnas. Devuelve (filas, siguiente_cursor).
+    """
+    posicion = decodificar_cursor(cursor)
+    if posicion:
+        clave = tuple_(columna_fecha, columna_id)
+        query = query.filter(clave < posicion if descendente else clave > posicion)
+
+    filas = query.limit(por_pagina + 1).all()
+    siguiente_cursor = None
+    if len(filas) > por_pagina:
+        filas = filas[:por_pagina]
+        ultima = filas[-1]
+        siguiente_cursor = codificar_cursor(getattr(ultima, columna_fecha.key), ultima.id)
+    return filas, siguiente_cursor
+
+
+def _columnas(query, columnas):
+    # Con `columnas` se devuelven filas con solo esas columnas en lugar de objetos del ORM
+    return query.with_entities(*columnas) if columnas else query
+
+
+def pagina_citas(paciente_id, filtro, ahora, cursor=None, columnas=None):
+    """Una página de citas del paciente y el cursor de la siguiente"""
+    return paginar(_columnas(citas_paciente(paciente_id, filtro, ahora), columnas), Cita.fecha_hora,
+                   Cita.id, cursor, descendente=filtro != 'proximas')
+
+
+def pagina_historial(paciente_id, cursor=None, columnas=None):
+    """Una página del historial del paciente y el cursor de la siguiente"""
+    return paginar(_columnas(historial_paciente(paciente_id), columnas), HistorialMedico.fecha_consulta,
+                   HistorialMedico.id, cursor)
+
+
+def pagina_recordatorios(paciente_id, cursor=None, columnas=None):
+    """Una página de recordatorios del paciente y el cursor de la siguiente"""
+    return paginar(_columnas(recordatorios_paciente(paciente_id), columnas),
+                   Recordatorio.fecha_recordatorio, Recordatorio.id, cursor)
+
+
+# ==================== VERIFICACIÓN DE ÍNDICES ====================
+
+@contextmanager
+def contador_sentencias(engine):
+    """
+    Cuenta las sentencias SQL ejecutadas dentro del bloque.
+
+        with contador_sentencias(db.engine) as sentencias:
+            client.get('/historial')
+        assert len(sentencias) == 3
+    """
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(engine, 'before_cursor_execute', registrar)
+
+
+def consultas_criticas(paciente_id, ahora):
+    """Consultas de las rutas principales, indexadas por nombre de ruta"""
+    consultas = {
+        'dashboard.proximas_citas': proximas_citas(paciente_id, ahora).limit(5),
+        'dashboard.recordatorios': recordatorios_activos(paciente_id, ahora).limit(5),
+        'dashboard.ultimas_consultas': historial_paciente(paciente_id).limit(3),
+        'mis_recordatorios': recordatorios_paciente(paciente_id),
+        'despacho_recordatorios': recordatorios_vencidos(ahora).limit(500),
+        'barrido_citas': citas_vencidas(ahora).limit(5000),
+        'historial_medico': historial_paciente(paciente_id),
+    }
+    for filtro in ('proximas', 'pasadas', 'todas'):
+        consultas[f'mis_citas.{filtro}'] = citas_paciente(paciente_id, filtro, ahora)
+    hoy = ahora.date()
+    consultas['horarios_disponibles'] = bloques_medico(1, hoy, hoy + timedelta(days=7))
+    consultas['nueva_cita.superpuestos'] = bloques_superpuestos(1, hoy, 600, 630)
+    consultas['agenda_medico'] = agenda_medico(1, hoy, hoy + timedelta(days=7))
+    return consultas
+
+
+def plan_de_consulta(session, query):
+    """Devuelve las líneas de EXPLAIN QUERY PLAN (solo SQLite)"""
+    compilada = query.statement.compile(
+        dialect=session.get_bind().dialect,
+        compile_kwargs={'literal_binds': True}
+    )
+    resultado = session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compilada}')
+    return [fila[-1] for fila in resultado]
+
+
+def recorridos_completos(plan):
+    """Líneas del plan que recorren una tabla completa en lugar de buscar por índice"""
+    return [linea for linea in plan if linea.startswith('SCAN ')]
@@ -0,0 +1,73 @@
+"""
+Hash de contraseñas
+
+El método de Werkzeug (con sus parámetros de costo) se configura con
+PASSWORD_HASH_METHOD, por ejemplo 'scrypt:32768:8:1' o
+'pbkdf2:sha256:600000'. Los cálculos se ejecutan en un pool acotado a
+PASSWORD_HASH_WORKERS hilos: hashlib libera el GIL, así que el pool limita
+cuántos núcleos puede ocupar un pico de inicios de sesión sin bloquear al
+resto de las peticiones.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import os
+import time
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+METODO_PREDETERMINADO = 'scrypt:32768:8:1'
+
+_executor = None
+_executor_lock = Lock()
+
+# Prefijo completo ('scrypt:32768:8:1') de cada método configurado
+_prefijos = {}
+
+
+def metodo():
+    return current_app.config.get('PASSWORD_HASH_METHOD', METODO_PREDETERMINADO)
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            hilos = current_app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+            _executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='hash')
+        return _executor
+
+
+def generar_hash(password):
+    return _pool().submit(generate_password_hash, password, metodo()).result()
+
+
+def generar_hashes(passwords):
+    """Hashea varias contraseñas en paralelo (importación masiva)"""
+    metodo_hash = metodo()
+    return list(_pool().map(lambda password: generate_password_hash(password, metodo_hash), passwords))
+
+
+def verificar(password_hash, password):
+    return _pool().submit(check_password_hash, password_hash, password).result()
+
+
+def _prefijo(metodo_hash):
+    # Werkzeug completa las formas cortas ('scrypt', 'pbkdf2:sha256') con sus
+    # parámetros por defecto: se toma el prefijo de un hash descartable
+    if metodo_hash not in _prefijos:
+        _prefijos[metodo_hash] = generate_password_hash('', metodo_hash).split('$', 1)[0]
+    return _prefijos[metodo_hash]
+
+
+def necesita_rehash(password_hash):
+    """True si el hash se generó con un método o parámetros distintos a los configurados"""
+    return password_hash.split('$', 1)[0] != _prefijo(metodo())
+
+
+def medir(metodo_hash, repeticiones=20):
+    """Milisegundos promedio que tarda un hash con el método dado (en un solo núcleo)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        generate_password_hash('contraseña-de-prueba', metodo_hash)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
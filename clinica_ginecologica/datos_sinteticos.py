@@ -0,0 +1,156 @@
+"""
+Generador determinista de datos sintéticos para pruebas de carga
+
+Con la misma semilla y fecha de referencia produce exactamente los mismos
+pacientes, médicos, citas, historiales y recordatorios. Las filas se
+insertan por bloques con INSERT de varias filas; todas las pacientes
+comparten una contraseña conocida (PASSWORD) para que el benchmark pueda
+iniciar sesión.
+"""
+from datetime import date, datetime, time, timedelta
+import random
+
+from sqlalchemy import insert
+
+from models import db, Paciente, Medico, Cita, HistorialMedico, Recordatorio
+import agenda
+import analitica
+import catalogos
+import contrasenas
+import disponibilidad
+import estadisticas
+
+PASSWORD = 'sintetica'
+TAMANO_LOTE = 1000
+
+NOMBRES = ('María', 'Ana', 'Lucía', 'Carmen', 'Sofía', 'Valeria', 'Camila', 'Isabel', 'Daniela', 'Paula')
+APELLIDOS = ('García', 'Rodríguez', 'López', 'Martínez', 'Sánchez', 'Pérez', 'Gómez', 'Díaz', 'Torres', 'Ruiz')
+TIPOS_SANGRE = ('O+', 'O-', 'A+', 'A-', 'B+', 'AB+')
+DIAGNOSTICOS = ('Sin hallazgos patológicos', 'Vaginosis bacteriana', 'Candidiasis vulvovaginal',
+                'Embarazo de curso normal', 'Displasia leve (NIC I)', 'Quiste ovárico funcional')
+SINTOMAS = ('Ninguno', 'Dolor pélvico', 'Flujo vaginal anormal', 'Sangrado intermenstrual', 'Prurito vulvar',
+            'Dismenorrea')
+ESTUDIOS = (None, None, 'Papanicolau negativo', 'Colposcopía sin lesiones', 'Ultrasonido pélvico normal')
+TIPOS_RECORDATORIO = ('cita', 'medicamento', 'estudio', 'control')
+
+
+class DatosExistentes(ValueError):
+    pass
+
+
+def email_paciente(semilla, indice):
+    return f'p{semilla}-{indice}@sintetico.test'
+
+
+def _insertar(modelo, filas, tamano):
+    for inicio in range(0, len(filas), tamano):
+        db.session.execute(insert(modelo), filas[inicio:inicio + tamano])
+
+
+def _ids_insertados(modelo, columna, valores):
+    ids = dict(db.session.query(columna, modelo.id).filter(columna.in_(valores)).all())
+    return [ids[valor] for valor in valores]
+
+
+def generar(pacientes=100, medicos=5, citas=20, historiales=10, recordatorios=5,
+            semilla=42, referencia=None, tamano=TAMANO_LOTE):
+    """
+    Inserta `pacientes` pacientes y `medicos` médicos, y por cada paciente
+    `citas` citas, `historiales` historiales y `recordatorios` recordatorios,
+    repartidos alrededor de `referencia` (por defecto, hoy). Devuelve un
+    diccionario con las filas insertadas por tabla.
+    """
+    rng = random.Random(semilla)
+    referencia = referencia or date.today()
+    if Paciente.query.filter_by(email=email_paciente(semilla, 0)).first() is not None:
+        raise DatosExistentes(f'Ya existen datos sintéticos con la semilla {semilla}.')
+
+    tipos = catalogos.tipos_consulta()
+    if not tipos:
+        raise DatosExistentes('No hay tipos de consulta; inicializa la base de datos primero.')
+
+    # Médicos
+    cedulas_medicos = [f'SIN{semilla}-M{i}' for i in range(medicos)]
+    _insertar(Medico, [
+        {'nombres': rng.choice(NOMBRES), 'apellidos': f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}',
+         'especialidad': 'Ginecología', 'cedula_profesional': cedula, 'activo': True}
+        for cedula in cedulas_medicos
+    ], tamano)
+    medico_ids = _ids_insertados(Medico, Medico.cedula_profesional, cedulas_medicos)
+
+    # Pacientes (un único hash para todas: el costo del hash no es lo que se mide)
+    password_hash = contrasenas.generar_hash(PASSWORD)
+    emails = [email_paciente(semilla, i) for i in range(pacientes)]
+    _insertar(Paciente, [
+        {'email': email, 'password_hash': password_hash, 'nombres': rng.choice(NOMBRES),
+         'apellidos': f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}', 'cedula': f'SIN{semilla}-{i}',
+         'fecha_nacimiento': referencia - timedelta(days=rng.randint(18 * 365, 60 * 365)),
+         'tipo_sangre': rng.choice(TIPOS_SANGRE), 'fecha_registro': datetime.combine(referencia, time()),
+         'activo': True}
+        for i, email in enumerate(emails)
+    ], tamano)
+    paciente_ids = _ids_insertados(Paciente, Paciente.email, emails)
+
+    # Citas: ±180 días alrededor de la referencia, sin dos activas en el mismo horario del médico
+    filas_citas = []
+    ocupados = set()
+    grilla = disponibilidad.grilla_horarios(disponibilidad.DURACION_PREDETERMINADA)
+    for paciente_id in paciente_ids:
+        for _ in range(citas):
+            medico_id = rng.choice(medico_ids)
+            dia = referencia + timedelta(days=rng.randint(-180, 180))
+            minutos = rng.choice(grilla)
+            fecha_hora = datetime.combine(dia, time(minutos // 60, minutos % 60))
+            if dia < referencia:
+                estado = rng.choice(('completada', 'completada', 'cancelada'))
+            elif (medico_id, fecha_hora) in ocupados:
+                estado = 'cancelada'
+            else:
+                estado = rng.choice(('pendiente', 'confirmada'))
+                ocupados.add((medico_id, fecha_hora))
+            filas_citas.append({
+                'paciente_id': paciente_id, 'medico_id': medico_id, 'fecha_hora': fecha_hora,
+                'tipo_consulta': rng.choice(tipos).nombre, 'motivo': 'Control de rutina', 'estado': estado,
+                'fecha_creacion': fecha_hora - timedelta(days=7),
+            })
+    _insertar(Cita, filas_citas, tamano)
+
+    # Historiales: consultas pasadas
+    _insertar(HistorialMedico, [
+        {'paciente_id': paciente_id, 'medico_id': rng.choice(medico_ids),
+         'fecha_consulta': datetime.combine(referencia - timedelta(days=rng.randint(1, 1095)),
+                                            time(rng.randint(8, 17))),
+         'tipo_consulta': rng.choice(tipos).nombre, 'motivo_consulta': 'Control de rutina',
+         'sintomas': rng.choice(SINTOMAS), 'diagnostico': rng.choice(DIAGNOSTICOS),
+         'tratamiento': 'Seguimiento habitual', 'resultados_estudios': rng.choice(ESTUDIOS),
+         'peso': round(rng.uniform(48, 90), 1), 'talla': round(rng.uniform(150, 180), 1),
+         'presion_arterial': f'{rng.randint(100, 135)}/{rng.randint(60, 85)}',
+         'temperatura': round(rng.uniform(36.0, 37.4), 1)}
+        for paciente_id in paciente_ids for _ in range(historiales)
+    ], tamano)
+
+    # Recordatorios: la mitad vencidos, la mitad próximos
+    _insertar(Recordatorio, [
+        {'paciente_id': paciente_id, 'tipo': rng.choice(TIPOS_RECORDATORIO), 'titulo': 'Recordatorio sintético',
+         'fecha_recordatorio': datetime.combine(referencia + timedelta(days=rng.randint(-30, 30)),
+                                                time(rng.randint(8, 20))),
+         'estado': rng.choice(('activo', 'activo', 'completado')),
+         'fecha_creacion': datetime.combine(referencia, time())}
+        for paciente_id in paciente_ids for _ in range(recordatorios)
+    ], tamano)
+
+    db.session.commit()
+    # Los INSERT masivos no pasan por la unidad de trabajo: agenda, resúmenes y cachés se rehacen a mano
+    agenda.reconstruir()
+    analitica.reconstruir()
+    disponibilidad.invalidar_todo()
+    estadisticas.invalidar_todo()
+    catalogos.invalidar()
+
+    return {
+        'medicos': len(medico_ids),
+        'pacientes': len(paciente_ids),
+        'citas': len(filas_citas),
+        'historiales': len(paciente_ids) * historiales,
+        'recordatorios': len(paciente_ids) * recordatorios,
+    }
@@ -0,0 +1,279 @@
+"""
+Despacho de recordatorios vencidos
+
+El worker (`flask despachar-recordatorios`) recorre la cola de recordatorios
+activos cuya fecha ya llegó usando el índice (estado, fecha_recordatorio),
+los reclama en lote pasándolos a 'enviando', los envía en paralelo con el
+emisor configurado y marca los enviados con un único UPDATE por lote.
+
+- Un envío fallido vuelve a la cola con espera exponencial; tras
+  MAX_INTENTOS queda 'fallido' y deja de reintentarse.
+- Los recordatorios con más de MAX_ANTIGUEDAD_HORAS de atraso ya no se
+  envían: pasan a 'caducado'.
+- Los recordatorios de una cita que se cancela o completa pasan a
+  'retirado' en la misma transacción que el cambio de la cita.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import chain
+import json
+import logging
+import sys
+import threading
+import time
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from models import db, Cita, Paciente, Recordatorio
+import consultas
+
+TAMANO_LOTE = 500
+HILOS = 8
+MAX_INTENTOS = 5
+# Espera antes del primer reintento; se duplica en cada fallo
+REINTENTO_MINUTOS = 5
+MAX_ANTIGUEDAD_HORAS = 24
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== EMISORES ====================
+
+class EmisorConsola:
+    """Escribe cada recordatorio en la salida estándar"""
+
+    def __init__(self, salida=None):
+        self.salida = salida or sys.stdout
+        self._lock = threading.Lock()
+
+    def enviar(self, mensaje):
+        linea = f"[{mensaje['fecha_recordatorio']}] {mensaje['email']}: {mensaje['titulo']}"
+        with self._lock:
+            print(linea, file=self.salida)
+
+
+class EmisorArchivo:
+    """Agrega cada recordatorio como una línea JSON a un archivo"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+    def enviar(self, mensaje):
+        linea = json.dumps(mensaje, ensure_ascii=False)
+        with self._lock, open(self.ruta, 'a', encoding='utf-8') as archivo:
+            archivo.write(linea + '\n')
+
+
+EMISORES = {
+    'consola': EmisorConsola,
+    'archivo': EmisorArchivo,
+}
+
+
+def crear_emisor(nombre, destino=None):
+    """Crea un emisor registrado en EMISORES; `destino` es su argumento opcional"""
+    if nombre not in EMISORES:
+        raise ValueError(f"Emisor desconocido: {nombre}. Opciones: {', '.join(EMISORES)}")
+    return EMISORES[nombre](destino) if destino else EMISORES[nombre]()
+
+
+# ==================== MÉTRICAS ====================
+
+class MetricasDespacho:
+    """Totales acumulados del worker: enviados, fallidos, retraso y rendimiento"""
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.enviados = 0
+        self.fallidos = 0
+        self.lotes = 0
+        self.retraso_maximo = 0.0
+        self._retraso_total = 0.0
+
+    def registrar_lote(self, retrasos, enviados, fallidos):
+        self.lotes += 1
+        self.enviados += enviados
+        self.fallidos += fallidos
+        self._retraso_total += sum(retrasos)
+        self.retraso_maximo = max([self.retraso_maximo, *retrasos])
+
+    @property
+    def retraso_promedio(self):
+        procesados = self.enviados + self.fallidos
+        return self._retraso_total / procesados if procesados else 0.0
+
+    @property
+    def por_segundo(self):
+        return self.enviados / max(time.monotonic() - self.inicio, 1e-9)
+
+    def resumen(self):
+        return (f'lotes={self.lotes} enviados={self.enviados} fallidos={self.fallidos} '
+                f'retraso_prom={self.retraso_promedio:.1f}s retraso_max={self.retraso_maximo:.1f}s '
+                f'rendimiento={self.por_segundo:.0f}/s')
+
+
+# ==================== COLA ====================
+
+def caducar(ahora, max_antiguedad_horas=MAX_ANTIGUEDAD_HORAS):
+    """Pasa a 'caducado' los recordatorios activos demasiado viejos para enviarlos"""
+    caducados = db.session.execute(
+        update(Recordatorio)
+        .where(Recordatorio.estado == 'activo',
+               Recordatorio.fecha_recordatorio <= ahora - timedelta(hours=max_antiguedad_horas))
+        .values(estado='caducado')
+    ).rowcount
+    db.session.commit()
+    return caducados
+
+
+def reclamar_lote(ahora, tamano=TAMANO_LOTE, max_antiguedad_horas=MAX_ANTIGUEDAD_HORAS):
+    """
+    Pasa a 'enviando' hasta `tamano` recordatorios vencidos y devuelve sus ids.
+    La condición estado='activo' en el UPDATE impide que dos workers
+    reclamen el mismo recordatorio.
+    """
+    desde = ahora - timedelta(hours=max_antiguedad_horas)
+    candidatos = consultas.recordatorios_vencidos(ahora, desde).with_entities(
+        Recordatorio.id
+    ).limit(tamano).scalar_subquery()
+
+    reclamados = db.session.execute(
+        update(Recordatorio)
+        .where(Recordatorio.id.in_(candidatos), Recordatorio.estado == 'activo')
+        .values(estado='enviando')
+        .returning(Recordatorio.id)
+    ).scalars().all()
+    db.session.commit()
+    return reclamados
+
+
+def mensajes_de(ids):
+    filas = db.session.query(
+        Recordatorio.id, Recordatorio.tipo, Recordatorio.titulo, Recordatorio.descripcion,
+        Recordatorio.fecha_recordatorio, Recordatorio.intentos, Paciente.email, Paciente.nombres
+    ).join(Paciente, Paciente.id == Recordatorio.paciente_id).filter(Recordatorio.id.in_(ids))
+
+    return [{
+        'id': fila.id,
+        'tipo': fila.tipo,
+        'titulo': fila.titulo,
+        'descripcion': fila.descripcion,
+        'fecha_recordatorio': fila.fecha_recordatorio.isoformat(),
+        'email': fila.email,
+        'nombres': fila.nombres,
+        'intentos': fila.intentos,
+    } for fila in filas]
+
+
+def _marcar(ids, estado):
+    if ids:
+        db.session.execute(
+            update(Recordatorio).where(Recordatorio.id.in_(ids)).values(estado=estado)
+        )
+
+
+def _reprogramar(mensajes, ahora):
+    """Devuelve los envíos fallidos a la cola con espera exponencial, o los da por fallidos"""
+    por_intentos = defaultdict(list)
+    for mensaje in mensajes:
+        por_intentos[mensaje['intentos'] + 1].append(mensaje['id'])
+    for intentos, ids in por_intentos.items():
+        if intentos >= MAX_INTENTOS:
+            valores = {'estado': 'fallido'}
+        else:
+            espera = timedelta(minutes=REINTENTO_MINUTOS * 2 ** (intentos - 1))
+            valores = {'estado': 'activo', 'proximo_intento': ahora + espera}
+        db.session.execute(
+            update(Recordatorio).where(Recordatorio.id.in_(ids)).values(intentos=intentos, **valores)
+        )
+
+
+def retirar_de_citas(conexion, cita_ids):
+    """Retira los recordatorios pendientes de citas que dejaron de estar activas"""
+    cita_ids = list(cita_ids)
+    for inicio in range(0, len(cita_ids), TAMANO_LOTE):
+        conexion.execute(
+            update(Recordatorio)
+            .where(Recordatorio.cita_id.in_(cita_ids[inicio:inicio + TAMANO_LOTE]),
+                   Recordatorio.estado == 'activo')
+            .values(estado='retirado')
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def _retirar_flush(session, flush_context):
+    eliminadas = session.deleted
+    cita_ids = [
+        obj.id for obj in chain(session.dirty, eliminadas)
+        if isinstance(obj, Cita) and (obj in eliminadas or obj.estado not in consultas.ESTADOS_ACTIVOS)
+    ]
+    if cita_ids:
+        retirar_de_citas(session.connection(), cita_ids)
+
+
+def liberar_reclamados():
+    """Devuelve a 'activo' los recordatorios que quedaron en 'enviando' tras una caída"""
+    liberados = db.session.execute(
+        update(Recordatorio).where(Recordatorio.estado == 'enviando').values(estado='activo')
+    ).rowcount
+    db.session.commit()
+    return liberados
+
+
+# ==================== WORKER ====================
+
+def _enviar(emisor, mensaje):
+    try:
+        emisor.enviar(mensaje)
+        return True
+    except Exception:
+        logger.exception('No se pudo enviar el recordatorio %s', mensaje['id'])
+        return False
+
+
+def despachar_lote(emisor, executor, metricas, tamano=TAMANO_LOTE,
+                   max_antiguedad_horas=MAX_ANTIGUEDAD_HORAS):
+    """Reclama, envía y marca un lote. Devuelve la cantidad de recordatorios reclamados."""
+    ahora = datetime.now()
+    ids = reclamar_lote(ahora, tamano, max_antiguedad_horas)
+    if not ids:
+        return 0
+
+    mensajes = mensajes_de(ids)
+    resultados = list(executor.map(lambda mensaje: _enviar(emisor, mensaje), mensajes))
+
+    enviados = [m['id'] for m, ok in zip(mensajes, resultados) if ok]
+    fallidos = [m for m, ok in zip(mensajes, resultados) if not ok]
+    _marcar(enviados, 'enviado')
+    _reprogramar(fallidos, ahora)
+    # Sin paciente no hay a quién enviarlo: no debe quedar en 'enviando'
+    _marcar(list(set(ids) - {m['id'] for m in mensajes}), 'fallido')
+    db.session.commit()
+
+    retrasos = [(ahora - datetime.fromisoformat(m['fecha_recordatorio'])).total_seconds() for m in mensajes]
+    metricas.registrar_lote(retrasos, len(enviados), len(fallidos))
+    return len(ids)
+
+
+def ejecutar(emisor, tamano=TAMANO_LOTE, hilos=HILOS, intervalo=30, una_vez=False, al_terminar_lote=None,
+             max_antiguedad_horas=MAX_ANTIGUEDAD_HORAS):
+    """
+    Procesa la cola hasta vaciarla; los fallidos que esperan un reintento
+    no la retienen. Con `una_vez` termina ahí; si no, espera `intervalo`
+    segundos y vuelve a revisar.
+    """
+    metricas = MetricasDespacho()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        while True:
+            caducar(datetime.now(), max_antiguedad_horas)
+            procesados = despachar_lote(emisor, executor, metricas, tamano, max_antiguedad_horas)
+            if procesados:
+                if al_terminar_lote:
+                    al_terminar_lote(metricas)
+                continue
+            if una_vez:
+                return metricas
+            time.sleep(intervalo)
@@ -0,0 +1,97 @@
+"""
+Cálculo de horarios disponibles por médico
+
+Los intervalos ocupados salen de la agenda materializada (agenda_bloques)
+y los de cada (médico, día) se guardan además en una caché en memoria del
+proceso. `nueva_cita()` y `cancelar_cita()` la invalidan
+después de confirmar sus cambios; los cambios hechos en otros procesos
+(otros workers, el barrido de la CLI) se ven cuando vence el TTL.
+"""
+from datetime import timedelta
+from functools import lru_cache
+from threading import Lock
+
+from cache import CacheTTL
+import catalogos
+import consultas
+
+# Horario de atención (8:00 - 18:00)
+HORA_APERTURA = 8
+HORA_CIERRE = 18
+DURACION_PREDETERMINADA = 30
+MAX_ENTRADAS_CACHE = 1024
+TTL_SEGUNDOS = 30
+
+_cache = CacheTTL(ttl=TTL_SEGUNDOS, max_entradas=MAX_ENTRADAS_CACHE)
+_version_lock = Lock()
+_version = 0
+
+
+@lru_cache(maxsize=32)
+def grilla_horarios(duracion):
+    """Minutos desde medianoche en los que puede comenzar una consulta"""
+    return tuple(range(HORA_APERTURA * 60, HORA_CIERRE * 60 - duracion + 1, duracion))
+
+
+def invalidar(medico_id, fecha):
+    """Descarta los horarios en caché de un médico para un día"""
+    global _version
+    with _version_lock:
+        _version += 1
+        _cache.invalidar((medico_id, fecha))
+
+
+def invalidar_todo():
+    """Descarta toda la caché (tras cargas masivas que no pasan por las rutas)"""
+    global _version
+    with _version_lock:
+        _version += 1
+        _cache.limpiar()
+
+
+def _ocupados_desde_bd(medico_id, fechas):
+    """Intervalos (inicio, fin) ocupados por día, leídos de la agenda materializada"""
+    ocupados = {fecha: [] for fecha in fechas}
+    filas = consultas.bloques_medico(medico_id, min(fechas), max(fechas) + timedelta(days=1))
+    for fecha, inicio, fin in filas:
+        if fecha in ocupados:
+            ocupados[fecha].append((inicio, fin))
+    return {fecha: tuple(intervalos) for fecha, intervalos in ocupados.items()}
+
+
+def intervalos_ocupados(medico_id, fechas):
+    """Intervalos ocupados por día, usando la caché cuando es posible"""
+    resultado = {}
+    with _version_lock:
+        version = _version
+    for fecha in fechas:
+        intervalos = _cache.obtener((medico_id, fecha))
+        if intervalos is not None:
+            resultado[fecha] = intervalos
+
+    faltantes = [fecha for fecha in fechas if fecha not in resultado]
+    if faltantes:
+        nuevos = _ocupados_desde_bd(medico_id, faltantes)
+        resultado.update(nuevos)
+        with _version_lock:
+            # Si hubo una invalidación mientras se consultaba, no se guarda
+            if version == _version:
+                for fecha, intervalos in nuevos.items():
+                    _cache.guardar((medico_id, fecha), intervalos)
+    return resultado
+
+
+def horarios_libres(duracion, ocupados):
+    """Horarios 'HH:MM' de la grilla que no se superponen con ningún intervalo ocupado"""
+    return [
+        f"{inicio // 60:02d}:{inicio % 60:02d}"
+        for inicio in grilla_horarios(duracion)
+        if not any(inicio < fin and desde < inicio + duracion for desde, fin in ocupados)
+    ]
+
+
+def horarios_disponibles(medico_id, fechas, tipo_consulta=None):
+    """Horarios disponibles del médico para cada fecha según la duración de la consulta"""
+    duracion = catalogos.duraciones_por_tipo().get(tipo_consulta) or DURACION_PREDETERMINADA
+    ocupados = intervalos_ocupados(medico_id, fechas)
+    return duracion, {fecha: horarios_libres(duracion, ocupados[fecha]) for fecha in fechas}
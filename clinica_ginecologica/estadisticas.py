@@ -0,0 +1,96 @@
+"""
+Estadísticas de citas e historial por paciente (página de reportes)
+
+Los resultados se guardan por paciente durante un minuto y se descartan en
+cuanto se confirma una escritura sobre sus citas o su historial médico.
+"""
+from itertools import chain
+
+from sqlalchemy import case, event, func
+from sqlalchemy.orm import Session
+
+from cache import CacheTTL
+from models import db, Cita, HistorialMedico
+
+TTL_SEGUNDOS = 60
+
+_cache = CacheTTL(ttl=TTL_SEGUNDOS)
+
+
+def _contar_estado(estado):
+    return func.coalesce(func.sum(case((Cita.estado == estado, 1), else_=0)), 0)
+
+
+def calcular_estadisticas(paciente_id):
+    """Calcula las estadísticas del paciente sin pasar por la caché"""
+    # Totales por estado en una sola pasada
+    total, pendientes, completadas, canceladas = db.session.query(
+        func.count(Cita.id),
+        _contar_estado('pendiente'),
+        _contar_estado('completada'),
+        _contar_estado('cancelada')
+    ).filter(Cita.paciente_id == paciente_id).one()
+
+    # Citas por tipo de consulta
+    citas_por_tipo = db.session.query(
+        Cita.tipo_consulta,
+        func.count(Cita.id)
+    ).filter(
+        Cita.paciente_id == paciente_id
+    ).group_by(Cita.tipo_consulta).all()
+
+    # Historial por año (EXTRACT es portable entre SQLite y PostgreSQL)
+    año = func.extract('year', HistorialMedico.fecha_consulta)
+    consultas_por_año = db.session.query(
+        año,
+        func.count(HistorialMedico.id)
+    ).filter(
+        HistorialMedico.paciente_id == paciente_id
+    ).group_by(año).order_by(año).all()
+
+    return {
+        'total_citas': total,
+        'citas_pendientes': pendientes,
+        'citas_completadas': completadas,
+        'citas_canceladas': canceladas,
+        'citas_por_tipo': [tuple(fila) for fila in citas_por_tipo],
+        'consultas_por_año': [(int(a), cantidad) for a, cantidad in consultas_por_año if a is not None],
+    }
+
+
+def estadisticas_paciente(paciente_id):
+    """Estadísticas del paciente, desde la caché si están vigentes"""
+    estadisticas = _cache.obtener(paciente_id)
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas(paciente_id)
+        _cache.guardar(paciente_id, estadisticas)
+    return estadisticas
+
+
+def invalidar(paciente_id):
+    _cache.invalidar(paciente_id)
+
+
+def invalidar_todo():
+    _cache.limpiar()
+
+
+# ==================== INVALIDACIÓN POR ESCRITURAS ====================
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_pacientes_modificados(session, flush_context):
+    pacientes = session.info.setdefault('estadisticas_pendientes', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Cita, HistorialMedico)):
+            pacientes.add(obj.paciente_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_pacientes_modificados(session):
+    for paciente_id in session.info.pop('estadisticas_pendientes', ()):
+        invalidar(paciente_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_pacientes_modificados(session):
+    session.info.pop('estadisticas_pendientes', None)
@@ -0,0 +1,95 @@
+"""
+Exportación del historial médico completo de un paciente
+
+Las filas se leen con yield_per (cursor del lado del servidor en los
+motores que lo soportan) y se entregan como generadores, de modo que la
+memoria usada no depende de la cantidad de consultas del paciente.
+"""
+import csv
+import hashlib
+import io
+import json
+
+from sqlalchemy import func, select
+
+from models import db, HistorialMedico, Medico
+
+FILAS_POR_BLOQUE = 500
+
+COLUMNAS = (
+    HistorialMedico.id,
+    HistorialMedico.fecha_consulta,
+    HistorialMedico.tipo_consulta,
+    HistorialMedico.motivo_consulta,
+    HistorialMedico.sintomas,
+    HistorialMedico.exploracion_fisica,
+    HistorialMedico.diagnostico,
+    HistorialMedico.tratamiento,
+    HistorialMedico.peso,
+    HistorialMedico.talla,
+    HistorialMedico.presion_arterial,
+    HistorialMedico.temperatura,
+    HistorialMedico.estudios_solicitados,
+    HistorialMedico.resultados_estudios,
+    HistorialMedico.observaciones,
+    HistorialMedico.proxima_cita,
+)
+CAMPOS = [columna.key for columna in COLUMNAS] + ['medico']
+
+FORMATOS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'html': ('text/html', None),
+}
+
+
+def firma(paciente_id, formato):
+    """
+    ETag del historial: cambia cuando se agrega una consulta o cambia la
+    más reciente (fecha, cantidad e id máximo).
+    """
+    ultima, cantidad, id_maximo = db.session.query(
+        func.max(HistorialMedico.fecha_consulta),
+        func.count(HistorialMedico.id),
+        func.max(HistorialMedico.id)
+    ).filter(HistorialMedico.paciente_id == paciente_id).one()
+    base = f'{paciente_id}:{ultima}:{cantidad}:{id_maximo}:{formato}'
+    return hashlib.sha1(base.encode()).hexdigest()
+
+
+def filas(paciente_id):
+    """Consultas del paciente en orden cronológico, como diccionarios"""
+    resultado = db.session.execute(
+        select(*COLUMNAS, Medico.nombres, Medico.apellidos)
+        .join(Medico, Medico.id == HistorialMedico.medico_id)
+        .where(HistorialMedico.paciente_id == paciente_id)
+        .order_by(HistorialMedico.fecha_consulta, HistorialMedico.id)
+        .execution_options(yield_per=FILAS_POR_BLOQUE)
+    )
+    for fila in resultado:
+        registro = dict(zip(CAMPOS, fila[:len(COLUMNAS)]))
+        registro['medico'] = f'Dr(a). {fila.nombres} {fila.apellidos}'
+        yield registro
+
+
+def _texto(valor):
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+
+def como_ndjson(registros):
+    for registro in registros:
+        yield json.dumps({campo: _texto(valor) for campo, valor in registro.items()},
+                         ensure_ascii=False) + '\n'
+
+
+def como_csv(registros):
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=CAMPOS)
+    escritor.writeheader()
+    for i, registro in enumerate(registros, start=1):
+        escritor.writerow({campo: _texto(valor) for campo, valor in registro.items()})
+        if i % FILAS_POR_BLOQUE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,179 @@
+"""
+Cola de generación de imágenes del simulador de patologías
+
+POST /api/generar-imagen-patologia encola un trabajo identificado por el
+hash del prompt normalizado y responde de inmediato. Un pool de hilos
+ejecuta el generador configurado (GENERADOR_IMAGENES) y guarda el PNG en
+una caché en disco direccionada por contenido: la misma combinación nunca
+se genera dos veces, aunque la pida otro proceso. El cliente consulta el
+estado (opcionalmente con long-polling) hasta que la imagen está lista.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+
+from flask import current_app
+
+from cache import CacheTTL
+
+logger = logging.getLogger(__name__)
+
+PENDIENTE = 'pendiente'
+LISTO = 'listo'
+ERROR = 'error'
+
+ESPERA_MAXIMA = 30
+
+_PATRON_CLAVE = re.compile(r'[0-9a-f]{64}')
+
+
+# ==================== GENERADORES ====================
+
+class GeneradorStub:
+    """
+    Generador local determinista para desarrollo y pruebas: un PNG cuyo
+    degradado depende solo del prompt.
+    """
+    nombre = 'stub'
+    tamano = 64
+
+    def generar(self, prompt):
+        semilla = hashlib.sha256(prompt.encode()).digest()
+        r, g, b = semilla[0], semilla[1], semilla[2]
+        # Cada fila PNG empieza con el byte de filtro 0
+        filas = b''.join(
+            b'\x00' + bytes(
+                canal for x in range(self.tamano)
+                for canal in (r, (g + y * 2) % 256, (b + x * 2) % 256)
+            )
+            for y in range(self.tamano)
+        )
+        return _png(self.tamano, self.tamano, filas)
+
+
+def _bloque_png(tipo, datos):
+    return (struct.pack('>I', len(datos)) + tipo + datos
+            + struct.pack('>I', zlib.crc32(tipo + datos) & 0xffffffff))
+
+
+def _png(ancho, alto, filas_rgb):
+    cabecera = struct.pack('>IIBBBBB', ancho, alto, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _bloque_png(b'IHDR', cabecera)
+            + _bloque_png(b'IDAT', zlib.compress(filas_rgb)) + _bloque_png(b'IEND', b''))
+
+
+GENERADORES = {
+    'stub': GeneradorStub,
+}
+
+
+def registrar_generador(nombre, clase):
+    """Permite conectar otro backend (por ejemplo, un modelo de difusión)"""
+    GENERADORES[nombre] = clase
+
+
+# ==================== CACHÉ EN DISCO ====================
+
+def clave_de(generador, prompt):
+    """Dirección de contenido: el mismo generador y prompt producen la misma clave"""
+    return hashlib.sha256(f'{generador}\n{prompt}'.encode()).hexdigest()
+
+
+def clave_valida(clave):
+    return bool(_PATRON_CLAVE.fullmatch(clave))
+
+
+class AlmacenImagenes:
+    def __init__(self, directorio):
+        self.directorio = directorio
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, clave[:2], f'{clave}.png')
+
+    def existe(self, clave):
+        return os.path.exists(self.ruta(clave))
+
+    def guardar(self, clave, contenido):
+        ruta = self.ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f'{ruta}.{threading.get_ident()}.tmp'
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        # Reemplazo atómico: nunca se sirve un archivo a medio escribir
+        os.replace(temporal, ruta)
+
+
+# ==================== COLA ====================
+
+class ColaGeneracion:
+    def __init__(self, generador, almacen, hilos=2):
+        self.generador = generador
+        self.almacen = almacen
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='imagenes')
+        self._pendientes = {}
+        self._errores = CacheTTL(ttl=300)
+        self._condicion = threading.Condition()
+
+    def clave(self, prompt):
+        return clave_de(self.generador.nombre, prompt)
+
+    def encolar(self, prompt):
+        """Encola la generación si hace falta y devuelve (clave, estado)"""
+        clave = self.clave(prompt)
+        with self._condicion:
+            if self.almacen.existe(clave):
+                return clave, LISTO
+            if clave not in self._pendientes:
+                self._errores.invalidar(clave)
+                self._pendientes[clave] = self._executor.submit(self._generar, clave, prompt)
+        return clave, PENDIENTE
+
+    def estado(self, clave):
+        with self._condicion:
+            if self.almacen.existe(clave):
+                return LISTO
+            if clave in self._pendientes:
+                return PENDIENTE
+            if self._errores.obtener(clave):
+                return ERROR
+            return None
+
+    def esperar(self, clave, segundos):
+        """Long-polling: espera hasta `segundos` a que el trabajo termine"""
+        with self._condicion:
+            self._condicion.wait_for(lambda: clave not in self._pendientes, timeout=segundos)
+        return self.estado(clave)
+
+    def _generar(self, clave, prompt):
+        try:
+            self.almacen.guardar(clave, self.generador.generar(prompt))
+        except Exception:
+            logger.exception('Falló la generación de la imagen %s', clave)
+            self._errores.guardar(clave, True)
+        finally:
+            with self._condicion:
+                self._pendientes.pop(clave, None)
+                self._condicion.notify_all()
+
+
+_cola_lock = threading.Lock()
+
+
+def cola():
+    """Cola de la aplicación actual, creada con su configuración la primera vez"""
+    with _cola_lock:
+        if 'cola_imagenes' not in current_app.extensions:
+            config = current_app.config
+            generador = GENERADORES[config.get('GENERADOR_IMAGENES', 'stub')]()
+            directorio = config.get('IMAGENES_CACHE_DIR') or os.path.join(
+                current_app.instance_path, 'imagenes_patologias'
+            )
+            current_app.extensions['cola_imagenes'] = ColaGeneracion(
+                generador, AlmacenImagenes(directorio), hilos=config.get('GENERADOR_IMAGENES_HILOS', 2)
+            )
+        return current_app.extensions['cola_imagenes']
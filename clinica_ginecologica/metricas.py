@@ -0,0 +1,206 @@
+"""
+Instrumentación por ruta
+
+Para cada petición se mide la latencia total, el número de sentencias SQL,
+el tiempo pasado en la base de datos y el tiempo de renderizado de Jinja.
+Los acumulados por endpoint se exponen en formato Prometheus en /metrics, y
+las sentencias más lentas que SQL_LENTA_MS se registran junto con su ruta.
+
+/metrics revela el tráfico por ruta: con METRICAS_TOKEN exige ese token en
+la cabecera Authorization: Bearer y sin él solo responde a localhost.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+import hmac
+import logging
+import threading
+import time
+
+from flask import (Response, before_render_template, current_app, g, has_request_context, jsonify, request,
+                   template_rendered)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SQL_LENTA_MS = 100
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CUBETAS_SENTENCIAS = (1, 2, 5, 10, 20, 50, 100)
+ENDPOINTS_EXCLUIDOS = {'static', 'metricas'}
+DIRECCIONES_LOCALES = {'127.0.0.1', '::1'}
+
+
+class Histograma:
+    def __init__(self, cubetas):
+        self.cubetas = cubetas
+        self.conteos = [0] * (len(cubetas) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.cubetas, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        """Conteos acumulados por límite superior, incluido +Inf"""
+        acumulado = 0
+        for limite, conteo in zip(self.cubetas + ('+Inf',), self.conteos):
+            acumulado += conteo
+            yield limite, acumulado
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencia = defaultdict(lambda: Histograma(CUBETAS_SEGUNDOS))
+        self.sentencias = defaultdict(lambda: Histograma(CUBETAS_SENTENCIAS))
+        self.segundos_bd = defaultdict(float)
+        self.segundos_render = defaultdict(float)
+        self.peticiones = defaultdict(int)
+        self.sentencias_lentas = defaultdict(int)
+
+    def registrar(self, endpoint, metodo, estado, duracion, medicion):
+        with self._lock:
+            self.latencia[endpoint].observar(duracion)
+            self.sentencias[endpoint].observar(medicion['sentencias'])
+            self.segundos_bd[endpoint] += medicion['bd']
+            self.segundos_render[endpoint] += medicion['render']
+            self.peticiones[(endpoint, metodo, estado)] += 1
+            self.sentencias_lentas[endpoint] += medicion['lentas']
+
+    def exportar(self, umbral_ms=SQL_LENTA_MS):
+        """Texto en formato de exposición de Prometheus"""
+        lineas = []
+
+        def histograma(nombre, ayuda, datos):
+            lineas.extend([f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} histogram'])
+            for endpoint, hist in sorted(datos.items()):
+                for limite, acumulado in hist.acumulados():
+                    lineas.append(f'{nombre}_bucket{{endpoint="{endpoint}",le="{limite}"}} {acumulado}')
+                lineas.append(f'{nombre}_sum{{endpoint="{endpoint}"}} {hist.suma}')
+                lineas.append(f'{nombre}_count{{endpoint="{endpoint}"}} {hist.total}')
+
+        def contador(nombre, ayuda, datos):
+            lineas.extend([f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter'])
+            for endpoint, valor in sorted(datos.items()):
+                lineas.append(f'{nombre}{{endpoint="{endpoint}"}} {valor}')
+
+        with self._lock:
+            histograma('clinica_peticion_segundos', 'Latencia de las peticiones por endpoint.', self.latencia)
+            histograma('clinica_sql_sentencias_por_peticion', 'Sentencias SQL ejecutadas por petición.',
+                       self.sentencias)
+            contador('clinica_bd_segundos_total', 'Tiempo acumulado en la base de datos.', self.segundos_bd)
+            contador('clinica_render_segundos_total', 'Tiempo acumulado renderizando plantillas.',
+                     self.segundos_render)
+            contador('clinica_sql_lentas_total', f'Sentencias SQL de más de {umbral_ms:g} ms.',
+                     self.sentencias_lentas)
+            lineas.extend(['# HELP clinica_peticiones_total Peticiones atendidas.',
+                           '# TYPE clinica_peticiones_total counter'])
+            for (endpoint, metodo, estado), valor in sorted(self.peticiones.items()):
+                lineas.append(f'clinica_peticiones_total{{endpoint="{endpoint}",metodo="{metodo}",'
+                              f'estado="{estado}"}} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+
+registro = RegistroMetricas()
+
+
+def _medicion():
+    """Acumulador de la petición en curso, o None fuera de una petición"""
+    if has_request_context():
+        return g.get('_medicion')
+    return None
+
+
+# ==================== SQL ====================
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_inicios_sentencia', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    _terminar_sentencia(conn, statement)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _error_de_sentencia(contexto):
+    # Una sentencia que falla (p. ej. una IntegrityError) no llega a
+    # after_cursor_execute: se cierra aquí para no dejar su inicio en la pila
+    if contexto.connection is not None and contexto.statement is not None:
+        _terminar_sentencia(contexto.connection, contexto.statement)
+
+
+def _terminar_sentencia(conn, statement):
+    inicios = conn.info.get('_inicios_sentencia')
+    if not inicios:
+        return
+    duracion = time.perf_counter() - inicios.pop()
+    medicion = _medicion()
+    if medicion is None:
+        return
+    medicion['sentencias'] += 1
+    medicion['bd'] += duracion
+    if duracion * 1000 >= medicion['umbral_ms']:
+        medicion['lentas'] += 1
+        logger.warning('SQL lenta (%.1f ms) en %s %s: %s',
+                       duracion * 1000, request.method, request.endpoint, ' '.join(statement.split()))
+
+
+# ==================== PLANTILLAS ====================
+
+def _antes_de_renderizar(app, template, context, **extra):
+    medicion = _medicion()
+    if medicion is not None:
+        medicion['inicios_render'].append(time.perf_counter())
+
+
+def _despues_de_renderizar(app, template, context, **extra):
+    medicion = _medicion()
+    if medicion is not None and medicion['inicios_render']:
+        medicion['render'] += time.perf_counter() - medicion['inicios_render'].pop()
+
+
+# ==================== INTEGRACIÓN ====================
+
+def configurar(app):
+    """Instala los hooks de medición y la ruta /metrics"""
+    umbral_ms = app.config.get('SQL_LENTA_MS', SQL_LENTA_MS)
+
+    @app.before_request
+    def iniciar_medicion():
+        g._medicion = {'inicio': time.perf_counter(), 'sentencias': 0, 'bd': 0.0, 'render': 0.0,
+                       'lentas': 0, 'inicios_render': [], 'umbral_ms': umbral_ms}
+
+    @app.after_request
+    def anotar_estado(respuesta):
+        medicion = g.get('_medicion')
+        if medicion is not None:
+            medicion['estado'] = respuesta.status_code
+        return respuesta
+
+    # teardown_request corre también cuando la vista lanza una excepción que
+    # no llega a convertirse en respuesta: esas peticiones cuentan como 500
+    @app.teardown_request
+    def registrar_medicion(excepcion):
+        medicion = g.pop('_medicion', None)
+        endpoint = request.endpoint or 'sin_ruta'
+        if medicion is not None and endpoint not in ENDPOINTS_EXCLUIDOS:
+            registro.registrar(endpoint, request.method, medicion.get('estado', 500),
+                               time.perf_counter() - medicion['inicio'], medicion)
+
+    before_render_template.connect(_antes_de_renderizar, app)
+    template_rendered.connect(_despues_de_renderizar, app)
+
+    @app.route('/metrics', endpoint='metricas')
+    def metricas():
+        token = current_app.config.get('METRICAS_TOKEN')
+        if token:
+            recibido = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+            if not hmac.compare_digest(recibido.encode(), token.encode()):
+                return jsonify({'error': 'No autorizado'}), 401
+        elif request.remote_addr not in DIRECCIONES_LOCALES:
+            return jsonify({'error': 'Métricas no habilitadas'}), 404
+        return Response(registro.exportar(umbral_ms), mimetype='text/plain; version=0.0.4')
@@ -4,10 +4,19 @@ Modelos de la base de datos para el Sistema de Gestión de Pacientes Ginecológi
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.schema import CreateColumn
+import contrasenas
 
 db = SQLAlchemy()
 
+
+def calcular_edad(fecha_nacimiento):
+    today = datetime.today()
+    return today.year - fecha_nacimiento.year - (
+        (today.month, today.day) < (fecha_nacimiento.month, fecha_nacimiento.day)
+    )
+
+
 class Paciente(UserMixin, db.Model):
     """Modelo para pacientes"""
     __tablename__ = 'pacientes'
@@ -48,10 +57,14 @@ class Paciente(UserMixin, db.Model):
     recordatorios = db.relationship('Recordatorio', backref='paciente', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = contrasenas.generar_hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return contrasenas.verificar(self.password_hash, password)
+    
+    @property
+    def password_necesita_rehash(self):
+        return contrasenas.necesita_rehash(self.password_hash)
     
     @property
     def nombre_completo(self):
@@ -59,10 +72,34 @@ class Paciente(UserMixin, db.Model):
     
     @property
     def edad(self):
-        today = datetime.today()
-        return today.year - self.fecha_nacimiento.year - (
-            (today.month, today.day) < (self.fecha_nacimiento.month, self.fecha_nacimiento.day)
-        )
+        return calcular_edad(self.fecha_nacimiento)
+
+
+class PrincipalSesion(UserMixin):
+    """
+    Paciente autenticado tal como lo ve cada petición: solo los datos que
+    usan la barra de navegación y el dashboard. El perfil completo se carga
+    explícitamente con Paciente cuando hace falta.
+    """
+    __slots__ = ('id', 'email', 'nombres', 'apellidos', 'fecha_nacimiento')
+    
+    COLUMNAS = (Paciente.id, Paciente.email, Paciente.nombres,
+                Paciente.apellidos, Paciente.fecha_nacimiento)
+    
+    def __init__(self, id, email, nombres, apellidos, fecha_nacimiento):
+        self.id = id
+        self.email = email
+        self.nombres = nombres
+        self.apellidos = apellidos
+        self.fecha_nacimiento = fecha_nacimiento
+    
+    @property
+    def nombre_completo(self):
+        return f"{self.nombres} {self.apellidos}"
+    
+    @property
+    def edad(self):
+        return calcular_edad(self.fecha_nacimiento)
 
 
 class Medico(db.Model):
@@ -90,6 +127,18 @@ class Medico(db.Model):
 class Cita(db.Model):
     """Modelo para citas médicas"""
     __tablename__ = 'citas'
+    __table_args__ = (
+        # Listados del paciente (dashboard, mis citas, reportes)
+        db.Index('ix_citas_paciente_fecha', 'paciente_id', 'fecha_hora'),
+        # Agenda del médico y horarios disponibles
+        db.Index('ix_citas_medico_fecha_estado', 'medico_id', 'fecha_hora', 'estado'),
+        # Barrido de citas vencidas
+        db.Index('ix_citas_estado_fecha', 'estado', 'fecha_hora'),
+        # Un médico no puede tener dos citas activas a la misma hora
+        db.Index('ux_citas_medico_fecha_activa', 'medico_id', 'fecha_hora', unique=True,
+                 sqlite_where=db.text("estado IN ('pendiente', 'confirmada')"),
+                 postgresql_where=db.text("estado IN ('pendiente', 'confirmada')")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
@@ -113,11 +162,24 @@ class Cita(db.Model):
     @property
     def hora_formateada(self):
         return self.fecha_hora.strftime('%H:%M')
+    
+    def a_dict(self):
+        return {
+            'id': self.id,
+            'fecha_hora': self.fecha_hora.isoformat(),
+            'tipo_consulta': self.tipo_consulta,
+            'motivo': self.motivo,
+            'estado': self.estado,
+            'medico': self.medico.nombre_completo,
+        }
 
 
 class HistorialMedico(db.Model):
     """Modelo para historial médico"""
     __tablename__ = 'historiales_medicos'
+    __table_args__ = (
+        db.Index('ix_historiales_paciente_fecha', 'paciente_id', 'fecha_consulta'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
@@ -149,24 +211,63 @@ class HistorialMedico(db.Model):
     proxima_cita = db.Column(db.Date)
     
     cita = db.relationship('Cita', backref='historial')
+    
+    def a_dict(self):
+        return {
+            'id': self.id,
+            'fecha_consulta': self.fecha_consulta.isoformat() if self.fecha_consulta else None,
+            'tipo_consulta': self.tipo_consulta,
+            'diagnostico': self.diagnostico,
+            'medico': self.medico.nombre_completo,
+        }
 
 
 class Recordatorio(db.Model):
     """Modelo para recordatorios y notificaciones"""
     __tablename__ = 'recordatorios'
+    __table_args__ = (
+        # Recordatorios activos del dashboard
+        db.Index('ix_recordatorios_paciente_estado_fecha', 'paciente_id', 'estado', 'fecha_recordatorio'),
+        # Listado completo de recordatorios
+        db.Index('ix_recordatorios_paciente_fecha', 'paciente_id', 'fecha_recordatorio'),
+        # Cola de despacho de recordatorios vencidos
+        db.Index('ix_recordatorios_estado_fecha', 'estado', 'fecha_recordatorio'),
+        # Retiro de los recordatorios de una cita cancelada o completada
+        db.Index('ix_recordatorios_cita', 'cita_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    # Cita a la que se refiere el recordatorio, si la hay
+    cita_id = db.Column(db.Integer, db.ForeignKey('citas.id'))
     
     tipo = db.Column(db.String(50), nullable=False)  # cita, medicamento, estudio, control
     titulo = db.Column(db.String(200), nullable=False)
     descripcion = db.Column(db.Text)
     fecha_recordatorio = db.Column(db.DateTime, nullable=False)
     
-    # Estados: activo, enviado, completado
+    # Estados: activo, enviando, enviado, completado, fallido (agotó los
+    # intentos), caducado (demasiado viejo para enviarlo) y retirado (su cita
+    # se canceló o completó)
     estado = db.Column(db.String(20), default='activo')
     
+    # Envíos fallidos y momento a partir del cual se puede reintentar
+    intentos = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
+    proximo_intento = db.Column(db.DateTime)
+    
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    cita = db.relationship('Cita', backref='recordatorios')
+    
+    def a_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'titulo': self.titulo,
+            'descripcion': self.descripcion,
+            'fecha_recordatorio': self.fecha_recordatorio.isoformat(),
+            'estado': self.estado,
+        }
 
 
 class TipoConsulta(db.Model):
@@ -180,10 +281,83 @@ class TipoConsulta(db.Model):
     activo = db.Column(db.Boolean, default=True)
 
 
+class BloqueAgenda(db.Model):
+    """
+    Agenda materializada: un bloque por cita pendiente o confirmada, con el
+    intervalo que ocupa en el día del médico (minutos desde medianoche).
+    Se mantiene desde agenda.py al agendar, cancelar o modificar citas.
+    """
+    __tablename__ = 'agenda_bloques'
+    __table_args__ = (
+        # Agenda del médico y horarios disponibles
+        db.Index('ux_agenda_medico_fecha_inicio', 'medico_id', 'fecha', 'inicio', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    medico_id = db.Column(db.Integer, db.ForeignKey('medicos.id'), nullable=False)
+    fecha = db.Column(db.Date, nullable=False)
+    inicio = db.Column(db.Integer, nullable=False)
+    fin = db.Column(db.Integer, nullable=False)
+    cita_id = db.Column(db.Integer, db.ForeignKey('citas.id', ondelete='CASCADE'),
+                        nullable=False, unique=True)
+
+
+class ResumenCitasDia(db.Model):
+    """
+    Cantidad de citas por día, médico, tipo de consulta y estado.
+    Se mantiene desde analitica.py al agendar, cancelar o cambiar de estado citas.
+    """
+    __tablename__ = 'resumen_citas_diario'
+    # Sin rowid: las filas quedan ordenadas por fecha y los rangos se leen seguidos
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    fecha = db.Column(db.Date, primary_key=True)
+    medico_id = db.Column(db.Integer, db.ForeignKey('medicos.id'), primary_key=True)
+    tipo_consulta = db.Column(db.String(100), primary_key=True)
+    estado = db.Column(db.String(20), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ResumenConsultasDia(db.Model):
+    """
+    Cantidad de consultas registradas en el historial por día, médico y tipo.
+    Se mantiene desde analitica.py.
+    """
+    __tablename__ = 'resumen_consultas_diario'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    fecha = db.Column(db.Date, primary_key=True)
+    medico_id = db.Column(db.Integer, db.ForeignKey('medicos.id'), primary_key=True)
+    tipo_consulta = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+def actualizar_esquema():
+    """
+    Agrega a las tablas existentes las columnas e índices del modelo que la
+    base todavía no tiene: create_all solo crea las tablas que faltan.
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conexion:
+        for tabla in db.metadata.sorted_tables:
+            if not inspector.has_table(tabla.name):
+                continue
+            existentes = {columna['name'] for columna in inspector.get_columns(tabla.name)}
+            for columna in tabla.columns:
+                if columna.name not in existentes:
+                    definicion = CreateColumn(columna).compile(dialect=conexion.dialect)
+                    conexion.execute(db.text(f'ALTER TABLE {tabla.name} ADD COLUMN {definicion}'))
+            for indice in tabla.indexes:
+                indice.create(conexion, checkfirst=True)
+
+
 def init_db(app):
-    """Inicializa la base de datos con datos de prueba"""
+    """Inicializa la base de datos con datos de prueba y el índice de búsqueda"""
+    import busqueda  # busqueda importa este módulo
+
     with app.app_context():
         db.create_all()
+        actualizar_esquema()
         
         # Verificar si ya hay datos
         if Medico.query.first() is None:
@@ -223,3 +397,7 @@ def init_db(app):
             
             db.session.commit()
             print("Base de datos inicializada con datos de ejemplo.")
+        
+        # Los triggers del índice mantienen al día los historiales que se carguen después
+        if busqueda.instalar():
+            print("Índice de búsqueda del historial construido.")
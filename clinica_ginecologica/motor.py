@@ -0,0 +1,70 @@
+"""
+Configuración del motor de base de datos
+
+La URI y el pool se leen del entorno para que el mismo código funcione con
+SQLite en desarrollo y con PostgreSQL en producción:
+
+    DATABASE_URL              URI de SQLAlchemy (por defecto SQLite local)
+    DB_POOL_SIZE              conexiones permanentes del pool (5)
+    DB_MAX_OVERFLOW           conexiones extra en picos (10)
+    DB_POOL_RECYCLE           segundos antes de reciclar una conexión (1800)
+    DB_POOL_TIMEOUT           segundos de espera por una conexión libre (30)
+    SQLITE_BUSY_TIMEOUT_MS    espera ante bloqueos de escritura (5000)
+    SQLITE_CACHE_SIZE_KB      caché de páginas por conexión (20000)
+    SQLITE_MMAP_SIZE          bytes de E/S mapeada en memoria (268435456)
+"""
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+URI_PREDETERMINADA = 'sqlite:///clinica_ginecologica.db'
+
+
+def _entero(nombre, predeterminado):
+    return int(os.environ.get(nombre, predeterminado))
+
+
+def _es_sqlite_en_memoria(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def opciones_motor(uri):
+    """Opciones de create_engine (SQLALCHEMY_ENGINE_OPTIONS) según la URI"""
+    if _es_sqlite_en_memoria(uri):
+        # SQLite en memoria usa un pool de una conexión por hilo
+        return {}
+
+    opciones = {
+        'pool_size': _entero('DB_POOL_SIZE', 5),
+        'max_overflow': _entero('DB_MAX_OVERFLOW', 10),
+        'pool_recycle': _entero('DB_POOL_RECYCLE', 1800),
+        'pool_timeout': _entero('DB_POOL_TIMEOUT', 30),
+    }
+    if not uri.startswith('sqlite'):
+        opciones['pool_pre_ping'] = True
+    return opciones
+
+
+def pragmas_sqlite():
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': _entero('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        # Un valor negativo indica el tamaño en KiB en lugar de en páginas
+        'cache_size': -_entero('SQLITE_CACHE_SIZE_KB', 20000),
+        'mmap_size': _entero('SQLITE_MMAP_SIZE', 268435456),
+        'temp_store': 'MEMORY',
+    }
+
+
+@event.listens_for(Engine, 'connect')
+def _configurar_conexion_sqlite(dbapi_connection, connection_record):
+    """Aplica los pragmas a cada conexión nueva de SQLite"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma, valor in pragmas_sqlite().items():
+        cursor.execute(f'PRAGMA {pragma}={valor}')
+    cursor.close()
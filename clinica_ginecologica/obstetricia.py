@@ -0,0 +1,242 @@
+"""
+Edad gestacional, fecha probable de parto y controles prenatales
+
+Todo se deriva de la fecha de última menstruación (FUM) con la regla de
+Naegele: parto a los 280 días de la FUM. Como la FUM se registra en toda
+consulta ginecológica, una paciente se considera embarazada solo si además
+tiene un Control Prenatal (cita no cancelada o historial) desde esa FUM y
+la FUM no tiene más de 42 semanas.
+
+Para toda la clínica se hace una sola pasada: una consulta con las
+embarazadas y otra con sus controles, ambas ordenadas por paciente, que se
+recorren juntas. Así funcionan el reporte de controles vencidos y la
+generación de recordatorios en bloque.
+"""
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import and_, delete, exists, insert, or_, union_all
+
+from models import db, Cita, HistorialMedico, Paciente, Recordatorio
+
+TIPO_CONTROL = 'Control Prenatal'
+DIAS_GESTACION = 280
+SEMANAS_MAXIMAS = 42
+# Contactos prenatales recomendados por la OMS (2016), en semanas de gestación
+SEMANAS_CONTROL = (12, 20, 26, 30, 34, 36, 38, 40)
+# Un control cuenta para la semana recomendada si ocurre entre dos semanas
+# antes y dos semanas después; pasado ese plazo sin control, está vencido
+VENTANA_DIAS = 14
+ANTICIPACION_DIAS = 7
+HORA_RECORDATORIO = time(9)
+TITULO_RECORDATORIO = 'Control prenatal: semana {semana}'
+TAMANO_LOTE = 500
+
+
+class Embarazo:
+    """Datos obstétricos de una FUM a una fecha dada"""
+    __slots__ = ('fum', 'hoy', 'controles')
+
+    def __init__(self, fum, hoy, controles=()):
+        self.fum = fum
+        self.hoy = hoy
+        # Fechas de los controles prenatales realizados o agendados
+        self.controles = controles
+
+    @property
+    def dias(self):
+        return (self.hoy - self.fum).days
+
+    @property
+    def edad_gestacional(self):
+        """Semanas y días cumplidos, como '24+3'"""
+        semanas, dias = divmod(self.dias, 7)
+        return f'{semanas}+{dias}'
+
+    @property
+    def semanas(self):
+        return self.dias // 7
+
+    @property
+    def trimestre(self):
+        return 1 if self.semanas < 14 else 2 if self.semanas < 28 else 3
+
+    @property
+    def fecha_probable_parto(self):
+        return self.fum + timedelta(days=DIAS_GESTACION)
+
+    def fecha_control(self, semana):
+        return self.fum + timedelta(weeks=semana)
+
+    def cubierto(self, semana):
+        """Si hay un control dentro de la ventana de esa semana"""
+        fecha = self.fecha_control(semana)
+        return any(abs((control - fecha).days) <= VENTANA_DIAS for control in self.controles)
+
+    def calendario(self):
+        """[(semana, fecha, estado)] con estado 'cubierto', 'vencido' o 'pendiente'"""
+        calendario = []
+        for semana in SEMANAS_CONTROL:
+            fecha = self.fecha_control(semana)
+            if self.cubierto(semana):
+                estado = 'cubierto'
+            elif (self.hoy - fecha).days > VENTANA_DIAS:
+                estado = 'vencido'
+            else:
+                estado = 'pendiente'
+            calendario.append((semana, fecha, estado))
+        return calendario
+
+    def control_vencido(self):
+        """
+        (semana, fecha) si el último control cuyo plazo ya pasó no se hizo, o
+        None. Un control omitido antes de uno realizado ya no es un atraso.
+        """
+        plazo_cumplido = [(semana, fecha, estado) for semana, fecha, estado in self.calendario()
+                          if (self.hoy - fecha).days > VENTANA_DIAS]
+        if plazo_cumplido and plazo_cumplido[-1][2] == 'vencido':
+            return plazo_cumplido[-1][:2]
+        return None
+
+    def proximo_control(self):
+        """(semana, fecha) del siguiente control recomendado sin cubrir, o None"""
+        for semana, fecha, estado in self.calendario():
+            if estado == 'pendiente':
+                return semana, fecha
+        return None
+
+
+# ==================== CONSULTAS ====================
+
+def _fecha(valor):
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def _embarazadas(hoy):
+    """Pacientes con FUM de las últimas 42 semanas y un control prenatal desde entonces"""
+    fum = Paciente.fecha_ultima_menstruacion
+    con_control = or_(
+        exists().where(
+            Cita.paciente_id == Paciente.id,
+            Cita.tipo_consulta == TIPO_CONTROL,
+            Cita.fecha_hora >= fum,
+            Cita.estado != 'cancelada',
+        ),
+        exists().where(
+            HistorialMedico.paciente_id == Paciente.id,
+            HistorialMedico.tipo_consulta == TIPO_CONTROL,
+            HistorialMedico.fecha_consulta >= fum,
+        ),
+    )
+    return db.session.query(
+        Paciente.id, Paciente.nombres, Paciente.apellidos, Paciente.email, Paciente.telefono, fum
+    ).filter(
+        fum > hoy - timedelta(weeks=SEMANAS_MAXIMAS),
+        fum <= hoy,
+        con_control,
+    ).order_by(Paciente.id)
+
+
+def _controles(embarazadas):
+    """(paciente_id, fecha) de los controles prenatales de esas pacientes, por paciente"""
+    sub = embarazadas.subquery()
+    citas = db.session.query(Cita.paciente_id, Cita.fecha_hora).join(sub, and_(
+        sub.c.id == Cita.paciente_id, Cita.fecha_hora >= sub.c.fecha_ultima_menstruacion
+    )).filter(Cita.tipo_consulta == TIPO_CONTROL, Cita.estado != 'cancelada')
+    historiales = db.session.query(HistorialMedico.paciente_id, HistorialMedico.fecha_consulta).join(
+        sub, and_(sub.c.id == HistorialMedico.paciente_id,
+                  HistorialMedico.fecha_consulta >= sub.c.fecha_ultima_menstruacion)
+    ).filter(HistorialMedico.tipo_consulta == TIPO_CONTROL)
+    union = union_all(citas.statement, historiales.statement).subquery()
+    return db.session.execute(
+        db.select(union.c[0], union.c[1]).order_by(union.c[0], union.c[1])
+    ).yield_per(TAMANO_LOTE)
+
+
+def embarazos(hoy, paciente_id=None):
+    """
+    Recorre las embarazadas (o solo `paciente_id`) en orden de id.
+    Devuelve pares (fila de la paciente, Embarazo).
+    """
+    embarazadas = _embarazadas(hoy)
+    if paciente_id is not None:
+        embarazadas = embarazadas.filter(Paciente.id == paciente_id)
+
+    controles = iter(_controles(embarazadas))
+    siguiente = next(controles, None)
+    for paciente in embarazadas.execution_options(yield_per=TAMANO_LOTE):
+        # Ambas consultas vienen ordenadas por paciente: se avanzan juntas
+        fechas = []
+        while siguiente is not None and siguiente[0] <= paciente.id:
+            if siguiente[0] == paciente.id:
+                fechas.append(_fecha(siguiente[1]))
+            siguiente = next(controles, None)
+        yield paciente, Embarazo(_fecha(paciente.fecha_ultima_menstruacion), hoy, fechas)
+
+
+def embarazo_en_curso(paciente_id, hoy):
+    """El Embarazo de la paciente, o None si no está en seguimiento prenatal"""
+    return next((embarazo for _, embarazo in embarazos(hoy, paciente_id)), None)
+
+
+# ==================== REPORTE Y RECORDATORIOS ====================
+
+def controles_vencidos(hoy):
+    """Embarazadas cuyo último control recomendado ya venció sin realizarse"""
+    for paciente, embarazo in embarazos(hoy):
+        vencido = embarazo.control_vencido()
+        if vencido is None:
+            continue
+        semana, fecha = vencido
+        ultimo = max((control for control in embarazo.controles if control <= hoy), default=None)
+        yield {
+            'paciente_id': paciente.id,
+            'nombre': f'{paciente.nombres} {paciente.apellidos}',
+            'email': paciente.email,
+            'telefono': paciente.telefono,
+            'edad_gestacional': embarazo.edad_gestacional,
+            'fecha_probable_parto': embarazo.fecha_probable_parto.isoformat(),
+            'semana_control': semana,
+            'fecha_control': fecha.isoformat(),
+            'dias_atraso': (hoy - fecha).days - VENTANA_DIAS,
+            'ultimo_control': ultimo.isoformat() if ultimo else None,
+        }
+
+
+def programar_recordatorios(ahora=None):
+    """
+    Crea, para cada embarazada, un recordatorio una semana antes de cada
+    control recomendado que todavía no tiene cita. Los recordatorios de la
+    serie aún no enviados se rehacen (la FUM pudo cambiar o el embarazo
+    terminar). Devuelve (pacientes, recordatorios).
+    """
+    ahora = ahora or datetime.now()
+    # Primero se lee todo y después se escribe: la escritura no debe
+    # intercalarse con las consultas que se están recorriendo
+    plan = []
+    for paciente, embarazo in embarazos(ahora.date()):
+        filas = []
+        for semana, fecha, estado in embarazo.calendario():
+            cuando = datetime.combine(fecha - timedelta(days=ANTICIPACION_DIAS), HORA_RECORDATORIO)
+            if estado == 'pendiente' and cuando >= ahora:
+                filas.append({
+                    'paciente_id': paciente.id,
+                    'tipo': 'control',
+                    'titulo': TITULO_RECORDATORIO.format(semana=semana),
+                    'descripcion': f'Agenda tu control prenatal para la semana del {fecha.strftime("%d/%m/%Y")}.',
+                    'fecha_recordatorio': cuando,
+                    'estado': 'activo',
+                    'fecha_creacion': ahora,
+                })
+        plan.append(filas)
+
+    db.session.execute(delete(Recordatorio).where(
+        Recordatorio.estado == 'activo',
+        Recordatorio.fecha_recordatorio >= ahora,
+        Recordatorio.tipo == 'control',
+        Recordatorio.titulo.like(TITULO_RECORDATORIO.format(semana='%')),
+    ))
+    filas = [fila for filas_paciente in plan for fila in filas_paciente]
+    for inicio in range(0, len(filas), TAMANO_LOTE):
+        db.session.execute(insert(Recordatorio), filas[inicio:inicio + TAMANO_LOTE])
+    db.session.commit()
+    return len(plan), len(filas)
@@ -0,0 +1,80 @@
+"""
+Catálogo de patologías del simulador y armado de sus descripciones
+
+El catálogo es inmutable y se construye una sola vez al importar el
+módulo. Las descripciones se memorizan por combinación canónica de
+(condición, grado), en el orden del catálogo, con un límite LRU.
+"""
+from functools import lru_cache
+from types import MappingProxyType
+
+# Descripción por grado (el índice de la tupla es el grado)
+DESCRIPCIONES_PATOLOGIAS = MappingProxyType({
+    'vph': (
+        'Tejido cervical sin alteraciones visibles.',
+        'Displasia leve (NIC I): células anormales en el tercio inferior del epitelio.',
+        'Displasia moderada (NIC II): células anormales en dos tercios del epitelio.',
+        'Displasia severa (NIC III): células anormales en todo el espesor.',
+        'Carcinoma in situ: células cancerosas sin invasión profunda.',
+    ),
+    'infeccion': (
+        'Sin signos de infección bacteriana.',
+        'Vaginosis bacteriana leve: flujo ligeramente alterado.',
+        'Vaginosis moderada: flujo grisáceo con olor característico.',
+        'Vaginosis severa: flujo abundante, inflamación marcada.',
+    ),
+    'candidiasis': (
+        'Sin signos de candidiasis.',
+        'Candidiasis leve: flujo blanquecino, prurito moderado.',
+        'Candidiasis moderada: placas blancas visibles, eritema.',
+        'Candidiasis severa: placas extensas, fisuras, edema marcado.',
+    ),
+    'herpes': (
+        'Herpes latente: virus presente sin lesiones visibles.',
+        'Fase inicial: eritema, hormigueo reportado.',
+        'Vesículas activas: agrupadas con contenido claro.',
+        'Úlceras herpéticas: lesiones dolorosas por ruptura de vesículas.',
+    ),
+    'tricomoniasis': (
+        'Sin signos de tricomoniasis.',
+        'Tricomoniasis leve: flujo ligeramente espumoso.',
+        'Tricomoniasis moderada: flujo amarillo-verdoso, cérvix en fresa.',
+        'Tricomoniasis severa: inflamación severa, petequias extensas.',
+    ),
+})
+
+ORDEN_CONDICIONES = {condicion: i for i, condicion in enumerate(DESCRIPCIONES_PATOLOGIAS)}
+
+
+class CondicionesInvalidas(ValueError):
+    pass
+
+
+def normalizar(condiciones):
+    """
+    Convierte el JSON del simulador en una tupla canónica ((condición, grado), ...)
+    con solo las condiciones activas y conocidas. Rechaza grados fuera de rango.
+    """
+    if not isinstance(condiciones, dict):
+        raise CondicionesInvalidas('Se esperaba un objeto JSON con las condiciones.')
+
+    combinacion = []
+    for condicion, data in condiciones.items():
+        if condicion not in DESCRIPCIONES_PATOLOGIAS or not isinstance(data, dict) or not data.get('activo'):
+            continue
+        grado = data.get('grado', 0)
+        grados = DESCRIPCIONES_PATOLOGIAS[condicion]
+        if isinstance(grado, bool) or not isinstance(grado, int) or not 0 <= grado < len(grados):
+            raise CondicionesInvalidas(
+                f'Grado inválido para {condicion}: debe ser un entero entre 0 y {len(grados) - 1}.'
+            )
+        combinacion.append((condicion, grado))
+    return tuple(sorted(combinacion, key=lambda par: ORDEN_CONDICIONES[par[0]]))
+
+
+@lru_cache(maxsize=512)
+def describir(combinacion):
+    """Descripción HTML y prompt para una combinación canónica"""
+    descripcion = '<br>'.join(DESCRIPCIONES_PATOLOGIAS[condicion][grado] for condicion, grado in combinacion)
+    prompt = ', '.join(f'{condicion}_grado_{grado}' for condicion, grado in combinacion)
+    return descripcion, prompt
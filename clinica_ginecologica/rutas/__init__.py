@@ -0,0 +1,22 @@
+"""
+Blueprints de la aplicación, uno por área
+"""
+from rutas import api, api_v1, auth, citas, historial, pacientes, personal, recordatorios, reportes, simulador
+
+BLUEPRINTS = (
+    auth.bp,
+    pacientes.bp,
+    citas.bp,
+    historial.bp,
+    recordatorios.bp,
+    reportes.bp,
+    api.bp,
+    api_v1.bp,
+    personal.bp,
+    simulador.bp,
+)
+
+
+def registrar(app):
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
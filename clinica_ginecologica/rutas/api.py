@@ -0,0 +1,108 @@
+"""
+API JSON: horarios disponibles y listados paginados
+"""
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+
+import busqueda
+import consultas
+import disponibilidad
+
+bp = Blueprint('api', __name__)
+
+
+@bp.route('/api/horarios-disponibles')
+@login_required
+def horarios_disponibles():
+    """Obtener horarios disponibles para una fecha y médico"""
+    fecha = request.args.get('fecha')
+    medico_id = request.args.get('medico_id', type=int)
+    
+    if not fecha or not medico_id:
+        return jsonify({'error': 'Parámetros faltantes'}), 400
+    
+    try:
+        fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Fecha inválida'}), 400
+    duracion, horarios = disponibilidad.horarios_disponibles(
+        medico_id, [fecha_obj], request.args.get('tipo_consulta')
+    )
+    
+    return jsonify({'horarios': horarios[fecha_obj], 'duracion_minutos': duracion})
+
+
+@bp.route('/api/horarios-disponibles/semana')
+@login_required
+def horarios_disponibles_semana():
+    """Obtener los horarios disponibles de varios días consecutivos en una sola llamada"""
+    medico_id = request.args.get('medico_id', type=int)
+    desde = request.args.get('desde', datetime.now().strftime('%Y-%m-%d'))
+    dias = min(max(request.args.get('dias', 7, type=int), 1), 31)
+    
+    if not medico_id:
+        return jsonify({'error': 'Parámetros faltantes'}), 400
+    
+    try:
+        desde_obj = datetime.strptime(desde, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Fecha inválida'}), 400
+    fechas = [desde_obj + timedelta(days=i) for i in range(dias)]
+    duracion, horarios = disponibilidad.horarios_disponibles(
+        medico_id, fechas, request.args.get('tipo_consulta')
+    )
+    
+    return jsonify({
+        'duracion_minutos': duracion,
+        'dias': {fecha.isoformat(): libres for fecha, libres in horarios.items()}
+    })
+
+
+@bp.route('/api/citas')
+@login_required
+def api_citas():
+    """Listado paginado de citas en JSON"""
+    citas, siguiente_cursor = consultas.pagina_citas(
+        current_user.id, request.args.get('filtro', 'proximas'), datetime.now(),
+        request.args.get('cursor')
+    )
+    return jsonify({'citas': [cita.a_dict() for cita in citas],
+                    'siguiente_cursor': siguiente_cursor})
+
+
+@bp.route('/api/historial')
+@login_required
+def api_historial():
+    """Listado paginado del historial médico en JSON"""
+    historiales, siguiente_cursor = consultas.pagina_historial(
+        current_user.id, request.args.get('cursor')
+    )
+    return jsonify({'historial': [historial.a_dict() for historial in historiales],
+                    'siguiente_cursor': siguiente_cursor})
+
+
+@bp.route('/api/historial/buscar')
+@login_required
+def api_buscar_historial():
+    """Búsqueda en el historial médico, por relevancia y paginada"""
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
+    resultados, hay_mas = busqueda.buscar(current_user.id, request.args.get('q', ''), pagina)
+    return jsonify({
+        'resultados': [dict(resultado, fecha_consulta=resultado['fecha_consulta'].isoformat()
+                            if resultado['fecha_consulta'] else None)
+                       for resultado in resultados],
+        'siguiente_pagina': pagina + 1 if hay_mas else None,
+    })
+
+
+@bp.route('/api/recordatorios')
+@login_required
+def api_recordatorios():
+    """Listado paginado de recordatorios en JSON"""
+    recordatorios, siguiente_cursor = consultas.pagina_recordatorios(
+        current_user.id, request.args.get('cursor')
+    )
+    return jsonify({'recordatorios': [recordatorio.a_dict() for recordatorio in recordatorios],
+                    'siguiente_cursor': siguiente_cursor})
@@ -0,0 +1,184 @@
+"""
+API JSON versionada para la aplicación móvil (/api/v1)
+
+- Sesión por cookie: POST /api/v1/sesion con {"email", "password"}; sin
+  sesión, todas las demás rutas responden 401 en JSON (nunca redirigen).
+- Cargas compactas: solo las columnas que se envían, médicos por id (el
+  nombre está en /api/v1/catalogos) y el diagnóstico del historial resumido.
+- `?campos=a,b` limita los campos de cada elemento (el id siempre va).
+- Respuestas comprimidas con gzip si el cliente lo acepta.
+"""
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_user, logout_user, current_user
+from sqlalchemy import func
+
+from models import Cita, HistorialMedico, Recordatorio
+from rutas import auth
+import catalogos
+import compresion
+import consultas
+import disponibilidad
+# `sesion` es también el nombre de la vista de inicio y cierre de sesión
+import sesion as sesiones
+
+bp = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+MAX_DIAS = 31
+LARGO_RESUMEN = 120
+
+COLUMNAS_CITA = (Cita.id, Cita.fecha_hora, Cita.tipo_consulta, Cita.motivo, Cita.estado, Cita.medico_id)
+COLUMNAS_RECORDATORIO = (Recordatorio.id, Recordatorio.tipo, Recordatorio.titulo, Recordatorio.descripcion,
+                         Recordatorio.fecha_recordatorio, Recordatorio.estado)
+COLUMNAS_HISTORIAL = (HistorialMedico.id, HistorialMedico.fecha_consulta, HistorialMedico.tipo_consulta,
+                      HistorialMedico.medico_id,
+                      func.substr(HistorialMedico.diagnostico, 1, LARGO_RESUMEN).label('diagnostico'))
+
+
+def _iso(valor):
+    return valor.isoformat() if valor else None
+
+
+def _cita(fila):
+    return {'id': fila.id, 'fecha_hora': _iso(fila.fecha_hora), 'tipo_consulta': fila.tipo_consulta,
+            'motivo': fila.motivo, 'estado': fila.estado, 'medico_id': fila.medico_id}
+
+
+def _recordatorio(fila):
+    return {'id': fila.id, 'tipo': fila.tipo, 'titulo': fila.titulo, 'descripcion': fila.descripcion,
+            'fecha_recordatorio': _iso(fila.fecha_recordatorio), 'estado': fila.estado}
+
+
+def _historial(fila):
+    return {'id': fila.id, 'fecha_consulta': _iso(fila.fecha_consulta), 'tipo_consulta': fila.tipo_consulta,
+            'medico_id': fila.medico_id, 'diagnostico': fila.diagnostico}
+
+
+def _lista(filas, serializar):
+    """Serializa las filas y aplica la selección de campos de `?campos=`"""
+    elementos = [serializar(fila) for fila in filas]
+    campos = request.args.get('campos')
+    if not campos:
+        return elementos
+    campos = {campo.strip() for campo in campos.split(',')} | {'id'}
+    return [{clave: valor for clave, valor in elemento.items() if clave in campos}
+            for elemento in elementos]
+
+
+def _error(mensaje, estado):
+    return jsonify({'error': mensaje}), estado
+
+
+@bp.before_request
+def exigir_sesion():
+    if request.endpoint != 'api_v1.sesion' and not current_user.is_authenticated:
+        return _error('Sesión requerida', 401)
+
+
+@bp.after_request
+def comprimir(respuesta):
+    return compresion.comprimir(respuesta)
+
+
+# ==================== SESIÓN ====================
+
+@bp.route('/sesion', methods=['POST', 'DELETE'])
+def sesion():
+    """Inicia (POST) o cierra (DELETE) la sesión de la paciente"""
+    if request.method == 'DELETE':
+        if current_user.is_authenticated:
+            sesiones.invalidar(current_user.id)
+        logout_user()
+        return '', 204
+
+    datos = request.get_json(silent=True) or {}
+    paciente = auth.autenticar(datos.get('email'), datos.get('password') or '')
+    if paciente is None:
+        return _error('Email o contraseña incorrectos', 401)
+    login_user(paciente, remember=True)
+    return jsonify({'id': paciente.id, 'nombre': paciente.nombre_completo})
+
+
+# ==================== PANEL ====================
+
+@bp.route('/dashboard')
+def dashboard():
+    """Lo que muestra el panel principal en una sola llamada"""
+    ahora = datetime.now()
+    citas = consultas.proximas_citas(current_user.id, ahora).with_entities(*COLUMNAS_CITA).limit(5)
+    recordatorios = consultas.recordatorios_activos(current_user.id, ahora).with_entities(
+        *COLUMNAS_RECORDATORIO).limit(5)
+    historial = consultas.historial_paciente(current_user.id).with_entities(*COLUMNAS_HISTORIAL).limit(3)
+    return jsonify({
+        'proximas_citas': _lista(citas, _cita),
+        'recordatorios': _lista(recordatorios, _recordatorio),
+        'ultimas_consultas': _lista(historial, _historial),
+    })
+
+
+@bp.route('/catalogos')
+def catalogos_activos():
+    """Médicos y tipos de consulta activos, para resolver los ids de las demás respuestas"""
+    respuesta = jsonify({
+        'medicos': [{'id': m.id, 'nombre': m.nombre_completo, 'especialidad': m.especialidad}
+                    for m in catalogos.medicos_activos()],
+        'tipos_consulta': [{'id': t.id, 'nombre': t.nombre, 'duracion_minutos': t.duracion_minutos}
+                           for t in catalogos.tipos_consulta_activos()],
+    })
+    respuesta.cache_control.private = True
+    respuesta.cache_control.max_age = catalogos.TTL_SEGUNDOS
+    return respuesta
+
+
+# ==================== LISTADOS ====================
+
+@bp.route('/citas')
+def citas():
+    """Citas de la paciente (filtro: proximas, pasadas o todas), paginadas por cursor"""
+    filas, siguiente_cursor = consultas.pagina_citas(
+        current_user.id, request.args.get('filtro', 'proximas'), datetime.now(),
+        request.args.get('cursor'), COLUMNAS_CITA
+    )
+    return jsonify({'citas': _lista(filas, _cita), 'siguiente_cursor': siguiente_cursor})
+
+
+@bp.route('/recordatorios')
+def recordatorios():
+    """Recordatorios de la paciente, del más reciente al más antiguo, paginados por cursor"""
+    filas, siguiente_cursor = consultas.pagina_recordatorios(
+        current_user.id, request.args.get('cursor'), COLUMNAS_RECORDATORIO
+    )
+    return jsonify({'recordatorios': _lista(filas, _recordatorio), 'siguiente_cursor': siguiente_cursor})
+
+
+@bp.route('/historial')
+def historial():
+    """Resumen del historial médico; el detalle completo está en la versión web"""
+    filas, siguiente_cursor = consultas.pagina_historial(
+        current_user.id, request.args.get('cursor'), COLUMNAS_HISTORIAL
+    )
+    return jsonify({'historial': _lista(filas, _historial), 'siguiente_cursor': siguiente_cursor})
+
+
+@bp.route('/horarios-disponibles')
+def horarios_disponibles():
+    """Horarios libres de un médico desde `desde` durante `dias` días (1 a 31)"""
+    medico_id = request.args.get('medico_id', type=int)
+    if not medico_id:
+        return _error('Parámetros faltantes', 400)
+    try:
+        desde = datetime.strptime(request.args.get('desde', datetime.now().strftime('%Y-%m-%d')),
+                                  '%Y-%m-%d').date()
+    except ValueError:
+        return _error('Fecha inválida', 400)
+    dias = min(max(request.args.get('dias', 1, type=int), 1), MAX_DIAS)
+
+    fechas = [desde + timedelta(days=i) for i in range(dias)]
+    duracion, horarios = disponibilidad.horarios_disponibles(
+        medico_id, fechas, request.args.get('tipo_consulta')
+    )
+    return jsonify({
+        'duracion_minutos': duracion,
+        'dias': {fecha.isoformat(): libres for fecha, libres in horarios.items()}
+    })
@@ -0,0 +1,104 @@
+"""
+Autenticación: inicio, acceso, registro y cierre de sesión
+"""
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_user, logout_user, login_required, current_user
+
+from models import db, Paciente
+import cache_http
+import sesion
+
+bp = Blueprint('auth', __name__)
+
+
+def autenticar(email, password):
+    """La paciente con esas credenciales, o None; regenera el hash si usa un método antiguo"""
+    paciente = Paciente.query.filter_by(email=email).first()
+    if paciente is None or not paciente.check_password(password):
+        return None
+    if paciente.password_necesita_rehash:
+        paciente.set_password(password)
+        db.session.commit()
+    return paciente
+
+
+@bp.route('/')
+@cache_http.pagina_publica()
+def index():
+    """Página de inicio"""
+    if current_user.is_authenticated:
+        return redirect(url_for('pacientes.dashboard'))
+    return render_template('index.html')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Inicio de sesión"""
+    if current_user.is_authenticated:
+        return redirect(url_for('pacientes.dashboard'))
+    
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+        
+        paciente = autenticar(email, password)
+        
+        if paciente:
+            login_user(paciente, remember=True)
+            flash('¡Bienvenida! Has iniciado sesión correctamente.', 'success')
+            next_page = request.args.get('next')
+            return redirect(next_page or url_for('pacientes.dashboard'))
+        else:
+            flash('Email o contraseña incorrectos.', 'danger')
+    
+    return render_template('login.html')
+
+
+@bp.route('/registro', methods=['GET', 'POST'])
+def registro():
+    """Registro de nuevo paciente"""
+    if current_user.is_authenticated:
+        return redirect(url_for('pacientes.dashboard'))
+    
+    if request.method == 'POST':
+        # Verificar si el email ya existe
+        if Paciente.query.filter_by(email=request.form.get('email')).first():
+            flash('Este email ya está registrado.', 'danger')
+            return redirect(url_for('auth.registro'))
+        
+        # Verificar si la cédula ya existe
+        if Paciente.query.filter_by(cedula=request.form.get('cedula')).first():
+            flash('Esta cédula ya está registrada.', 'danger')
+            return redirect(url_for('auth.registro'))
+        
+        # Crear nuevo paciente
+        paciente = Paciente(
+            email=request.form.get('email'),
+            nombres=request.form.get('nombres'),
+            apellidos=request.form.get('apellidos'),
+            cedula=request.form.get('cedula'),
+            fecha_nacimiento=datetime.strptime(request.form.get('fecha_nacimiento'), '%Y-%m-%d'),
+            telefono=request.form.get('telefono'),
+            direccion=request.form.get('direccion')
+        )
+        paciente.set_password(request.form.get('password'))
+        
+        db.session.add(paciente)
+        db.session.commit()
+        
+        flash('¡Registro exitoso! Ahora puedes iniciar sesión.', 'success')
+        return redirect(url_for('auth.login'))
+    
+    return render_template('registro.html')
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    """Cerrar sesión"""
+    sesion.invalidar(current_user.id)
+    logout_user()
+    flash('Has cerrado sesión correctamente.', 'info')
+    return redirect(url_for('auth.index'))
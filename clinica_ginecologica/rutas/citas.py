@@ -0,0 +1,158 @@
+"""
+Gestión de citas
+"""
+from datetime import datetime, timedelta
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
+
+from models import db, BloqueAgenda, Cita, Medico, Recordatorio
+import catalogos
+import consultas
+import disponibilidad
+import vistas
+
+bp = Blueprint('citas', __name__)
+
+
+@bp.route('/citas')
+@login_required
+def mis_citas():
+    """Ver todas las citas del paciente"""
+    filtro = request.args.get('filtro', 'proximas')
+    
+    filas, siguiente_cursor = consultas.pagina_citas(
+        current_user.id, filtro, datetime.now(), request.args.get('cursor'), vistas.CitaFila.columnas
+    )
+    citas = vistas.CitaFila.lista(filas)
+    
+    return render_template('citas.html', citas=citas, filtro=filtro,
+                         siguiente_cursor=siguiente_cursor)
+
+
+class HorarioOcupado(Exception):
+    pass
+
+
+def _horario_ocupado(medico_id, fecha_hora, tipo_consulta, hora):
+    """Avisa que el horario ya no está libre y ofrece los siguientes"""
+    disponibilidad.invalidar(medico_id, fecha_hora.date())
+    _, horarios = disponibilidad.horarios_disponibles(medico_id, [fecha_hora.date()], tipo_consulta)
+    siguientes = [h for h in horarios[fecha_hora.date()] if h > hora][:3]
+    if siguientes:
+        flash(f'Ese horario acaba de ser reservado. Próximos horarios libres: {", ".join(siguientes)}.', 'warning')
+    else:
+        flash('Ese horario acaba de ser reservado y no quedan horarios libres ese día.', 'warning')
+    return redirect(url_for('citas.nueva_cita'))
+
+
+@bp.route('/citas/nueva', methods=['GET', 'POST'])
+@login_required
+def nueva_cita():
+    """Agendar nueva cita"""
+    if request.method == 'POST':
+        fecha = request.form.get('fecha')
+        hora = request.form.get('hora')
+        try:
+            fecha_hora = datetime.strptime(f"{fecha} {hora}", '%Y-%m-%d %H:%M')
+        except ValueError:
+            flash('La fecha o la hora de la cita no son válidas.', 'danger')
+            return redirect(url_for('citas.nueva_cita'))
+        
+        # Verificar que la fecha sea futura
+        if fecha_hora <= datetime.now():
+            flash('La fecha de la cita debe ser futura.', 'danger')
+            return redirect(url_for('citas.nueva_cita'))
+        
+        cita = Cita(
+            paciente_id=current_user.id,
+            medico_id=request.form.get('medico_id', type=int),
+            fecha_hora=fecha_hora,
+            tipo_consulta=request.form.get('tipo_consulta'),
+            motivo=request.form.get('motivo'),
+            estado='pendiente'
+        )
+        
+        # Solo se agenda en los horarios de la grilla de atención para esa duración
+        duracion = catalogos.duraciones_por_tipo().get(cita.tipo_consulta) or disponibilidad.DURACION_PREDETERMINADA
+        inicio = fecha_hora.hour * 60 + fecha_hora.minute
+        if inicio not in disponibilidad.grilla_horarios(duracion):
+            flash('Elige uno de los horarios de atención disponibles.', 'danger')
+            return redirect(url_for('citas.nueva_cita'))
+        
+        # Bloquea al médico hasta el commit (en SQLite, la escritura ya serializa)
+        medico = db.session.query(Medico.id).filter(
+            Medico.id == cita.medico_id, Medico.activo.is_(True)
+        ).with_for_update().first()
+        if medico is None:
+            flash('Selecciona un médico válido.', 'danger')
+            return redirect(url_for('citas.nueva_cita'))
+        
+        db.session.add(cita)
+        
+        # Crear recordatorio automático (1 día antes)
+        recordatorio = Recordatorio(
+            paciente_id=current_user.id,
+            cita=cita,
+            tipo='cita',
+            titulo=f'Recordatorio: Cita de {cita.tipo_consulta}',
+            descripcion=f'Tienes una cita mañana a las {hora}',
+            fecha_recordatorio=fecha_hora - timedelta(days=1)
+        )
+        db.session.add(recordatorio)
+        
+        try:
+            # El flush escribe el bloque de la cita en la agenda; dentro de la
+            # misma transacción se busca cualquier otra cita que se superponga
+            db.session.flush()
+            if consultas.bloques_superpuestos(
+                cita.medico_id, fecha_hora.date(), inicio, inicio + duracion
+            ).filter(BloqueAgenda.cita_id != cita.id).first() is not None:
+                raise HorarioOcupado()
+            db.session.commit()
+        except (IntegrityError, HorarioOcupado):
+            # Otra paciente reservó ese horario (o uno que se superpone) mientras se llenaba el formulario
+            db.session.rollback()
+            return _horario_ocupado(cita.medico_id, fecha_hora, cita.tipo_consulta, hora)
+        
+        disponibilidad.invalidar(cita.medico_id, cita.fecha_hora.date())
+        flash('Cita agendada correctamente.', 'success')
+        return redirect(url_for('citas.mis_citas'))
+    
+    medicos = catalogos.medicos_activos()
+    tipos_consulta = catalogos.tipos_consulta_activos()
+    
+    return render_template('nueva_cita.html', medicos=medicos, tipos_consulta=tipos_consulta)
+
+
+@bp.route('/citas/<int:cita_id>')
+@login_required
+def ver_cita(cita_id):
+    """Ver detalle de una cita"""
+    cita = Cita.query.get_or_404(cita_id)
+    if cita.paciente_id != current_user.id:
+        flash('No tienes permiso para ver esta cita.', 'danger')
+        return redirect(url_for('citas.mis_citas'))
+    
+    return render_template('ver_cita.html', cita=cita)
+
+
+@bp.route('/citas/<int:cita_id>/cancelar', methods=['POST'])
+@login_required
+def cancelar_cita(cita_id):
+    """Cancelar una cita"""
+    cita = Cita.query.get_or_404(cita_id)
+    if cita.paciente_id != current_user.id:
+        flash('No tienes permiso para cancelar esta cita.', 'danger')
+        return redirect(url_for('citas.mis_citas'))
+    
+    if cita.estado not in consultas.ESTADOS_ACTIVOS:
+        flash('Esta cita no puede ser cancelada.', 'warning')
+        return redirect(url_for('citas.mis_citas'))
+    
+    cita.estado = 'cancelada'
+    db.session.commit()
+    disponibilidad.invalidar(cita.medico_id, cita.fecha_hora.date())
+    flash('Cita cancelada correctamente.', 'success')
+    return redirect(url_for('citas.mis_citas'))
@@ -0,0 +1,84 @@
+"""
+Historial médico y su exportación
+"""
+from flask import (Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify,
+                   stream_template, stream_with_context)
+from flask_login import login_required, current_user
+
+from models import HistorialMedico
+import busqueda
+import catalogos
+import consultas
+import expediente
+import vistas
+
+bp = Blueprint('historial', __name__)
+
+
+@bp.route('/historial')
+@login_required
+def historial_medico():
+    """Ver historial médico"""
+    filas, siguiente_cursor = consultas.pagina_historial(
+        current_user.id, request.args.get('cursor'), vistas.HistorialFila.columnas
+    )
+    historiales = vistas.HistorialFila.lista(filas)
+    
+    return render_template('historial.html', historiales=historiales,
+                         siguiente_cursor=siguiente_cursor)
+
+
+@bp.route('/historial/buscar')
+@login_required
+def buscar_historial():
+    """Buscar en el historial por diagnóstico, síntomas, tratamiento, estudios u observaciones"""
+    texto = request.args.get('q', '').strip()
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
+    resultados, hay_mas = busqueda.buscar(current_user.id, texto, pagina)
+    medicos = {medico.id: medico for medico in catalogos.medicos()}
+    
+    return render_template('historial_buscar.html', texto=texto, resultados=resultados,
+                         medicos=medicos, pagina=pagina, hay_mas=hay_mas)
+
+
+@bp.route('/historial/exportar')
+@login_required
+def exportar_historial():
+    """Descargar el historial completo (ndjson, csv) o verlo para imprimir (html)"""
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in expediente.FORMATOS:
+        return jsonify({'error': 'Formato no soportado'}), 400
+    
+    etag = expediente.firma(current_user.id, formato)
+    if etag in request.if_none_match:
+        respuesta = Response(status=304)
+        respuesta.set_etag(etag)
+        return respuesta
+    
+    mimetype, extension = expediente.FORMATOS[formato]
+    filas = expediente.filas(current_user.id)
+    if formato == 'html':
+        cuerpo = stream_template('historial_imprimir.html', historiales=filas, paciente=current_user)
+    elif formato == 'csv':
+        cuerpo = stream_with_context(expediente.como_csv(filas))
+    else:
+        cuerpo = stream_with_context(expediente.como_ndjson(filas))
+    
+    respuesta = Response(cuerpo, mimetype=mimetype)
+    respuesta.set_etag(etag)
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    if extension:
+        respuesta.headers['Content-Disposition'] = f'attachment; filename=historial_medico.{extension}'
+    return respuesta
+
+
+@bp.route('/historial/<int:historial_id>')
+@login_required
+def ver_historial(historial_id):
+    """Ver detalle de una consulta en el historial"""
+    historial = HistorialMedico.query.get_or_404(historial_id)
+    if historial.paciente_id != current_user.id:
+        flash('No tienes permiso para ver este registro.', 'danger')
+        return redirect(url_for('historial.historial_medico'))
+    
+    return render_template('ver_historial.html', historial=historial)
@@ -0,0 +1,82 @@
+"""
+Panel principal y perfil de la paciente
+"""
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from models import db, Paciente
+import consultas
+import obstetricia
+import vistas
+
+bp = Blueprint('pacientes', __name__)
+
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    """Panel principal del paciente"""
+    ahora = datetime.now()
+    
+    # Próximas citas
+    proximas_citas = vistas.CitaFila.lista(
+        consultas.proximas_citas(current_user.id, ahora).with_entities(*vistas.CitaFila.columnas).limit(5)
+    )
+    
+    # Recordatorios activos
+    recordatorios = vistas.RecordatorioFila.lista(
+        consultas.recordatorios_activos(current_user.id, ahora).with_entities(
+            *vistas.RecordatorioFila.columnas).limit(5)
+    )
+    
+    # Últimas consultas
+    ultimas_consultas = vistas.HistorialFila.lista(
+        consultas.historial_paciente(current_user.id).with_entities(*vistas.HistorialFila.columnas).limit(3)
+    )
+    
+    return render_template('dashboard.html',
+                         proximas_citas=proximas_citas,
+                         recordatorios=recordatorios,
+                         ultimas_consultas=ultimas_consultas)
+
+
+@bp.route('/mi-perfil')
+@login_required
+def mi_perfil():
+    """Ver perfil del paciente"""
+    paciente = db.session.get(Paciente, current_user.id)
+    embarazo = obstetricia.embarazo_en_curso(paciente.id, datetime.now().date())
+    return render_template('perfil.html', paciente=paciente, embarazo=embarazo)
+
+
+@bp.route('/mi-perfil/editar', methods=['GET', 'POST'])
+@login_required
+def editar_perfil():
+    """Editar perfil del paciente"""
+    paciente = db.session.get(Paciente, current_user.id)
+    
+    if request.method == 'POST':
+        paciente.telefono = request.form.get('telefono')
+        paciente.direccion = request.form.get('direccion')
+        paciente.tipo_sangre = request.form.get('tipo_sangre')
+        paciente.alergias = request.form.get('alergias')
+        paciente.antecedentes_familiares = request.form.get('antecedentes_familiares')
+        
+        # Datos ginecológicos
+        fum = request.form.get('fecha_ultima_menstruacion')
+        if fum:
+            paciente.fecha_ultima_menstruacion = datetime.strptime(fum, '%Y-%m-%d')
+        
+        paciente.embarazos_previos = request.form.get('embarazos_previos', 0, type=int)
+        paciente.partos = request.form.get('partos', 0, type=int)
+        paciente.cesareas = request.form.get('cesareas', 0, type=int)
+        paciente.abortos = request.form.get('abortos', 0, type=int)
+        paciente.metodo_anticonceptivo = request.form.get('metodo_anticonceptivo')
+        
+        db.session.commit()
+        flash('Perfil actualizado correctamente.', 'success')
+        return redirect(url_for('pacientes.mi_perfil'))
+    
+    return render_template('editar_perfil.html', paciente=paciente)
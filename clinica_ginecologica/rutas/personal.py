@@ -0,0 +1,104 @@
+"""
+API para el personal de la clínica: agenda de los médicos, cambios de
+estado de citas en bloque, controles prenatales vencidos e indicadores de
+toda la clínica
+
+El personal no tiene cuenta en el sistema y estas rutas ven citas de todas
+las pacientes, así que solo se sirven con el token de PERSONAL_API_TOKEN en
+la cabecera Authorization: Bearer.
+"""
+from datetime import datetime, timedelta
+import hmac
+
+from flask import Blueprint, current_app, request, jsonify
+
+import agenda
+import analitica
+import catalogos
+import obstetricia
+import transiciones
+
+bp = Blueprint('personal', __name__)
+
+
+@bp.before_request
+def verificar_token():
+    token = current_app.config.get('PERSONAL_API_TOKEN')
+    if not token:
+        return jsonify({'error': 'API del personal no habilitada'}), 404
+    recibido = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(recibido.encode(), token.encode()):
+        return jsonify({'error': 'No autorizado'}), 401
+
+
+@bp.route('/api/medicos/<int:medico_id>/agenda')
+def agenda_medico(medico_id):
+    """Citas de todas las pacientes y horarios libres de un médico, por día (hasta una semana)"""
+    if not any(medico.id == medico_id for medico in catalogos.medicos()):
+        return jsonify({'error': 'Médico no encontrado'}), 404
+
+    try:
+        desde = datetime.strptime(request.args.get('desde', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Fecha inválida'}), 400
+    dias = min(max(request.args.get('dias', 1, type=int), 1), agenda.MAX_DIAS)
+    try:
+        por_dia = agenda.agenda_medico(medico_id, desde, dias)
+    except OverflowError:
+        # Los días pedidos pasan del 31/12/9999
+        return jsonify({'error': 'Fecha fuera de rango'}), 400
+
+    return jsonify({'medico_id': medico_id, 'dias': por_dia})
+
+
+@bp.route('/api/citas/estado', methods=['POST'])
+def cambiar_estado_citas():
+    """
+    Confirma, cancela o marca como ausentes varias citas a la vez:
+    {"ids": [1, 2, 3], "estado": "confirmada" | "cancelada" | "ausente"}.
+    Las citas cuyo estado actual no permite el cambio se devuelven en `omitidas`.
+    """
+    datos = request.get_json(silent=True) or {}
+    ids = datos.get('ids')
+    destino = datos.get('estado')
+
+    if destino not in transiciones.TRANSICIONES:
+        return jsonify({'error': f"Estado inválido; use uno de: {', '.join(transiciones.TRANSICIONES)}"}), 400
+    if (not isinstance(ids, list) or not ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return jsonify({'error': 'Se esperaba una lista de ids de citas'}), 400
+    if len(ids) > transiciones.MAX_IDS:
+        return jsonify({'error': f'Máximo {transiciones.MAX_IDS} citas por petición'}), 400
+
+    actualizadas = transiciones.cambiar_estado(ids, destino)
+    omitidas = sorted(set(ids) - set(actualizadas))
+    return jsonify({'estado': destino, 'actualizadas': sorted(actualizadas), 'omitidas': omitidas})
+
+
+@bp.route('/api/controles-prenatales/vencidos')
+def controles_prenatales_vencidos():
+    """Embarazadas cuyo último control prenatal recomendado venció sin realizarse"""
+    pacientes = list(obstetricia.controles_vencidos(datetime.now().date()))
+    return jsonify({'total': len(pacientes), 'pacientes': pacientes})
+
+
+@bp.route('/api/analitica')
+def indicadores_clinica():
+    """
+    Volumen por tipo de consulta, utilización de los médicos, cancelaciones e
+    inasistencias entre `desde` y `hasta` (por defecto, los últimos 30 días).
+    Filtros: `medico_id` y `periodo` de la serie (dia, semana o mes).
+    """
+    try:
+        hasta = datetime.strptime(request.args.get('hasta', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d').date()
+        desde = (datetime.strptime(request.args['desde'], '%Y-%m-%d').date() if 'desde' in request.args
+                 else hasta - timedelta(days=analitica.DIAS_PREDETERMINADOS - 1))
+    except (ValueError, OverflowError):
+        return jsonify({'error': 'Fecha inválida'}), 400
+    if desde > hasta:
+        return jsonify({'error': 'El rango de fechas está invertido'}), 400
+    periodo = request.args.get('periodo', 'mes')
+    if periodo not in analitica.PERIODOS:
+        return jsonify({'error': f"Periodo inválido; use uno de: {', '.join(analitica.PERIODOS)}"}), 400
+
+    return jsonify(analitica.indicadores(desde, hasta, request.args.get('medico_id', type=int), periodo))
@@ -0,0 +1,66 @@
+"""
+Recordatorios de la paciente
+"""
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from models import db, Recordatorio
+import consultas
+import vistas
+
+bp = Blueprint('recordatorios', __name__)
+
+
+@bp.route('/recordatorios')
+@login_required
+def mis_recordatorios():
+    """Ver recordatorios"""
+    filas, siguiente_cursor = consultas.pagina_recordatorios(
+        current_user.id, request.args.get('cursor'), vistas.RecordatorioFila.columnas
+    )
+    recordatorios = vistas.RecordatorioFila.lista(filas)
+    
+    return render_template('recordatorios.html', recordatorios=recordatorios,
+                         siguiente_cursor=siguiente_cursor)
+
+
+@bp.route('/recordatorios/nuevo', methods=['GET', 'POST'])
+@login_required
+def nuevo_recordatorio():
+    """Crear nuevo recordatorio"""
+    if request.method == 'POST':
+        fecha = request.form.get('fecha')
+        hora = request.form.get('hora', '09:00')
+        fecha_recordatorio = datetime.strptime(f"{fecha} {hora}", '%Y-%m-%d %H:%M')
+        
+        recordatorio = Recordatorio(
+            paciente_id=current_user.id,
+            tipo=request.form.get('tipo'),
+            titulo=request.form.get('titulo'),
+            descripcion=request.form.get('descripcion'),
+            fecha_recordatorio=fecha_recordatorio
+        )
+        
+        db.session.add(recordatorio)
+        db.session.commit()
+        flash('Recordatorio creado correctamente.', 'success')
+        return redirect(url_for('recordatorios.mis_recordatorios'))
+    
+    return render_template('nuevo_recordatorio.html')
+
+
+@bp.route('/recordatorios/<int:recordatorio_id>/completar', methods=['POST'])
+@login_required
+def completar_recordatorio(recordatorio_id):
+    """Marcar recordatorio como completado"""
+    recordatorio = Recordatorio.query.get_or_404(recordatorio_id)
+    if recordatorio.paciente_id != current_user.id:
+        flash('No tienes permiso para modificar este recordatorio.', 'danger')
+        return redirect(url_for('recordatorios.mis_recordatorios'))
+    
+    recordatorio.estado = 'completado'
+    db.session.commit()
+    flash('Recordatorio marcado como completado.', 'success')
+    return redirect(url_for('recordatorios.mis_recordatorios'))
@@ -0,0 +1,16 @@
+"""
+Reportes y estadísticas
+"""
+from flask import Blueprint, render_template
+from flask_login import login_required, current_user
+
+import estadisticas
+
+bp = Blueprint('reportes', __name__)
+
+
+@bp.route('/reportes')
+@login_required
+def reportes():
+    """Ver reportes y estadísticas"""
+    return render_template('reportes.html', **estadisticas.estadisticas_paciente(current_user.id))
@@ -0,0 +1,76 @@
+"""
+Simulador de patologías y su cola de generación de imágenes
+"""
+from flask import Blueprint, render_template, request, url_for, jsonify, send_file
+
+import cache_http
+import generacion_imagenes
+import patologias
+
+bp = Blueprint('simulador', __name__)
+
+
+@bp.route('/simulador-patologias')
+@cache_http.pagina_publica()
+def simulador_patologias():
+    """Página del simulador de visualización de patologías combinadas"""
+    return render_template('simulador_patologias.html')
+
+
+@bp.route('/api/generar-imagen-patologia', methods=['POST'])
+def generar_imagen_patologia():
+    """
+    API para generar imagen de patologías combinadas con IA.
+    
+    La generación no bloquea la petición: se encola un trabajo identificado
+    por el prompt normalizado y el cliente consulta su estado en
+    `estado_url`. Las combinaciones ya generadas se responden al instante.
+    """
+    try:
+        combinacion = patologias.normalizar(request.get_json(silent=True))
+    except patologias.CondicionesInvalidas as e:
+        return jsonify({'error': str(e)}), 400
+    
+    descripcion, prompt_para_ia = patologias.describir(combinacion)
+    trabajo, estado = generacion_imagenes.cola().encolar(prompt_para_ia)
+    
+    respuesta = _estado_trabajo(trabajo, estado)
+    respuesta.update({
+        'descripcion': descripcion,
+        'prompt_utilizado': prompt_para_ia,
+    })
+    return jsonify(respuesta), 200 if estado == generacion_imagenes.LISTO else 202
+
+
+@bp.route('/api/generar-imagen-patologia/<trabajo>')
+def estado_imagen_patologia(trabajo):
+    """Estado de un trabajo de generación; con ?esperar=N hace long-polling hasta N segundos"""
+    if not generacion_imagenes.clave_valida(trabajo):
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    cola = generacion_imagenes.cola()
+    esperar = min(request.args.get('esperar', 0, type=float), generacion_imagenes.ESPERA_MAXIMA)
+    estado = cola.esperar(trabajo, esperar) if esperar > 0 else cola.estado(trabajo)
+    
+    if estado is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(_estado_trabajo(trabajo, estado))
+
+
+@bp.route('/api/imagenes-patologia/<trabajo>.png')
+def imagen_patologia(trabajo):
+    """Imagen generada; su nombre es el hash del contenido, así que nunca cambia"""
+    almacen = generacion_imagenes.cola().almacen
+    if not generacion_imagenes.clave_valida(trabajo) or not almacen.existe(trabajo):
+        return jsonify({'error': 'Imagen no encontrada'}), 404
+    return send_file(almacen.ruta(trabajo), mimetype='image/png', max_age=31536000)
+
+
+def _estado_trabajo(trabajo, estado):
+    listo = estado == generacion_imagenes.LISTO
+    return {
+        'trabajo': trabajo,
+        'estado': estado,
+        'estado_url': url_for('simulador.estado_imagen_patologia', trabajo=trabajo),
+        'imagen_url': url_for('simulador.imagen_patologia', trabajo=trabajo) if listo else None,
+    }
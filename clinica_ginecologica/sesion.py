@@ -0,0 +1,41 @@
+"""
+Carga del paciente autenticado para Flask-Login
+
+Cada petición autenticada solo lee las columnas de PrincipalSesion. Si
+PRINCIPAL_CACHE_SEGUNDOS es mayor que cero, el principal se guarda en
+memoria durante ese tiempo y la petición no consulta la tabla pacientes.
+"""
+from flask import current_app
+
+from cache import CacheTTL
+from models import db, Paciente, PrincipalSesion
+
+_cache = CacheTTL(ttl=0, max_entradas=4096)
+
+
+def cargar_principal(paciente_id):
+    """Devuelve el PrincipalSesion del paciente o None si no existe"""
+    ttl = current_app.config.get('PRINCIPAL_CACHE_SEGUNDOS', 0)
+    if ttl:
+        principal = _cache.obtener(paciente_id)
+        if principal is not None:
+            return principal
+
+    fila = db.session.query(*PrincipalSesion.COLUMNAS).filter(
+        Paciente.id == paciente_id
+    ).first()
+    if fila is None:
+        return None
+
+    principal = PrincipalSesion(*fila)
+    if ttl:
+        _cache.guardar(paciente_id, principal, ttl=ttl)
+    return principal
+
+
+def invalidar(paciente_id):
+    _cache.invalidar(paciente_id)
+
+
+def invalidar_todo():
+    _cache.limpiar()
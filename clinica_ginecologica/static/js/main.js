@@ -79,6 +79,39 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
+    // ===== Cargar más (paginación por cursor) =====
+    // Trae la siguiente página y agrega sus elementos a la lista actual.
+    // Sin JavaScript, el enlace simplemente abre la siguiente página.
+    document.addEventListener('click', async function(e) {
+        const boton = e.target.closest('[data-cargar-mas]');
+        const lista = document.querySelector('[data-lista]');
+        if (!boton || !lista) {
+            return;
+        }
+        e.preventDefault();
+        boton.classList.add('disabled');
+        
+        try {
+            const response = await fetch(boton.href);
+            const pagina = new DOMParser().parseFromString(await response.text(), 'text/html');
+            const nuevos = pagina.querySelector('[data-lista]');
+            if (nuevos) {
+                lista.append(...nuevos.children);
+            }
+            
+            const siguiente = pagina.querySelector('[data-cargar-mas]');
+            if (siguiente) {
+                boton.href = siguiente.href;
+                boton.classList.remove('disabled');
+            } else {
+                boton.parentElement.remove();
+            }
+        } catch (error) {
+            boton.classList.remove('disabled');
+            console.error('Error:', error);
+        }
+    });
+    
     // ===== Refresh page notification for recordatorios =====
     function checkRecordatorios() {
         // Esta función podría implementarse con WebSockets o polling
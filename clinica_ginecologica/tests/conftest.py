@@ -0,0 +1,55 @@
+"""
+Fixtures de las pruebas
+
+`app` es una aplicación con config.PRUEBAS (SQLite en memoria) y los
+catálogos iniciales de init_db; `sembrada` le agrega datos sintéticos.
+Las peticiones del cliente de pruebas se hacen fuera de `contexto`: dentro
+de un contexto ya activo comparten `g` y Flask-Login no recarga al usuario.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db, init_db  # noqa: E402
+import config  # noqa: E402
+import datos_sinteticos  # noqa: E402
+
+
+def crear_app(**configuracion):
+    app = create_app({**config.PRUEBAS, **configuracion})
+    init_db(app)
+    return app
+
+
+@pytest.fixture
+def app():
+    return crear_app()
+
+
+@pytest.fixture
+def contexto(app):
+    """La aplicación con un contexto activo, para usar la sesión del ORM en la prueba"""
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def sembrada(app):
+    with app.app_context():
+        datos_sinteticos.generar(pacientes=50, medicos=3, citas=10, historiales=5, recordatorios=3)
+    return app
+
+
+def iniciar_sesion(cliente, indice=0, semilla=42):
+    """Inicia sesión con la paciente sintética `indice`"""
+    respuesta = cliente.post('/login', data={
+        'email': datos_sinteticos.email_paciente(semilla, indice),
+        'password': datos_sinteticos.PASSWORD,
+    })
+    assert respuesta.status_code == 302, respuesta.status_code
+    return respuesta
@@ -0,0 +1,124 @@
+"""Los resúmenes diarios coinciden con un GROUP BY sobre citas e historiales"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from models import db, Cita, HistorialMedico, Paciente, ResumenCitasDia, ResumenConsultasDia
+import transiciones
+
+from conftest import iniciar_sesion
+
+TOKEN = 'token-de-prueba'
+
+
+def resumenes():
+    """Contadores no nulos de ambos resúmenes"""
+    citas = {(str(fecha), medico, tipo, estado): total for fecha, medico, tipo, estado, total in
+             db.session.query(ResumenCitasDia.fecha, ResumenCitasDia.medico_id, ResumenCitasDia.tipo_consulta,
+                              ResumenCitasDia.estado, ResumenCitasDia.total).filter(ResumenCitasDia.total != 0)}
+    consultas = {(str(fecha), medico, tipo): total for fecha, medico, tipo, total in
+                 db.session.query(ResumenConsultasDia.fecha, ResumenConsultasDia.medico_id,
+                                  ResumenConsultasDia.tipo_consulta, ResumenConsultasDia.total)
+                 .filter(ResumenConsultasDia.total != 0)}
+    return citas, consultas
+
+
+def recontar():
+    """Los mismos contadores calculados desde las tablas de origen"""
+    columnas = (func.date(Cita.fecha_hora), Cita.medico_id, Cita.tipo_consulta, func.coalesce(Cita.estado, ''))
+    citas = {tuple(fila[:-1]): fila[-1] for fila in
+             db.session.query(*columnas, func.count()).group_by(*columnas)}
+    columnas = (func.date(HistorialMedico.fecha_consulta), HistorialMedico.medico_id,
+                func.coalesce(HistorialMedico.tipo_consulta, ''))
+    consultas = {tuple(fila[:-1]): fila[-1] for fila in
+                 db.session.query(*columnas, func.count()).filter(HistorialMedico.fecha_consulta.is_not(None))
+                 .group_by(*columnas)}
+    return citas, consultas
+
+
+def assert_consistentes():
+    db.session.expire_all()
+    assert resumenes() == recontar()
+
+
+@pytest.fixture
+def personal(sembrada):
+    sembrada.config['PERSONAL_API_TOKEN'] = TOKEN
+    cliente = sembrada.test_client()
+    cliente.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {TOKEN}'
+    return cliente
+
+
+def test_resumenes_siguen_todas_las_escrituras(sembrada, personal):
+    paciente = sembrada.test_client()
+    iniciar_sesion(paciente)
+    manana = (date.today() + timedelta(days=1)).isoformat()
+
+    # Reserva y cancelación desde las rutas de la paciente
+    for hora in ('08:00', '09:00'):
+        respuesta = paciente.post('/citas/nueva', data={'fecha': manana, 'hora': hora, 'medico_id': 1,
+                                                         'tipo_consulta': 'Consulta General'})
+        assert respuesta.headers['Location'] == '/citas'
+    with sembrada.app_context():
+        reservada = Cita.query.filter_by(medico_id=1).order_by(Cita.id).first().id
+        assert_consistentes()
+    assert paciente.post(f'/citas/{reservada}/cancelar').status_code == 302
+
+    with sembrada.app_context():
+        assert_consistentes()
+        pendientes = [c.id for c in Cita.query.filter(Cita.estado == 'pendiente').limit(6)]
+        completadas = [c.id for c in Cita.query.filter(Cita.estado == 'completada').limit(3)]
+        # Citas activas de hace días para el barrido
+        paciente_id = Paciente.query.first().id
+        hace_dias = datetime.combine(date.today() - timedelta(days=3), datetime.min.time())
+        db.session.add_all([
+            Cita(paciente_id=paciente_id, medico_id=2, fecha_hora=hace_dias.replace(hour=8 + i),
+                 tipo_consulta='Papanicolau', estado=('pendiente', 'confirmada')[i % 2])
+            for i in range(4)
+        ])
+        db.session.commit()
+        assert_consistentes()
+
+    # Cambios de estado en bloque desde la API del personal
+    for ids, estado in ((pendientes[:3], 'confirmada'), (pendientes[2:], 'cancelada'), (completadas, 'ausente')):
+        assert personal.post('/api/citas/estado', json={'ids': ids, 'estado': estado}).status_code == 200
+        with sembrada.app_context():
+            assert_consistentes()
+
+    with sembrada.app_context():
+        assert transiciones.barrer_vencidas().actualizadas == 4
+        assert_consistentes()
+
+
+def test_actualizaciones_del_orm(sembrada, contexto):
+    cita = Cita.query.filter(Cita.estado == 'pendiente').first()
+    antes = resumenes()
+
+    # Un cambio que no toca la clave resta y suma en la misma fila
+    cita.motivo = 'Otro motivo'
+    db.session.commit()
+    assert resumenes() == antes
+
+    cita.tipo_consulta = 'Urgencia'
+    cita.estado = 'confirmada'
+    db.session.commit()
+    assert_consistentes()
+
+    historial = HistorialMedico.query.first()
+    historial.medico_id = 1
+    db.session.commit()
+    assert_consistentes()
+
+    # Sin fecha la consulta sale del resumen y vuelve a entrar al recuperarla
+    historial.fecha_consulta = None
+    db.session.commit()
+    assert_consistentes()
+    historial.fecha_consulta = datetime(2024, 5, 1, 10)
+    db.session.commit()
+    assert_consistentes()
+
+    db.session.add(HistorialMedico(paciente_id=historial.paciente_id, medico_id=1, fecha_consulta=None))
+    db.session.delete(cita)
+    db.session.commit()
+    assert_consistentes()
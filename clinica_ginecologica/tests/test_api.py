@@ -0,0 +1,17 @@
+"""Validación de parámetros de la API JSON"""
+import pytest
+
+from conftest import iniciar_sesion
+
+
+@pytest.mark.parametrize('ruta', [
+    '/api/horarios-disponibles?medico_id=1&fecha=2024-13-45',
+    '/api/horarios-disponibles?medico_id=1&fecha=mañana',
+    '/api/horarios-disponibles/semana?medico_id=1&desde=2024-02-30',
+])
+def test_fecha_invalida_responde_400(sembrada, ruta):
+    cliente = sembrada.test_client()
+    iniciar_sesion(cliente)
+    respuesta = cliente.get(ruta)
+    assert respuesta.status_code == 400
+    assert respuesta.get_json() == {'error': 'Fecha inválida'}
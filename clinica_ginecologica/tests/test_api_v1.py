@@ -0,0 +1,22 @@
+"""Sesión de la API v1"""
+from models import Paciente
+import datos_sinteticos
+import sesion
+
+
+def test_cerrar_sesion_invalida_el_principal_en_cache(sembrada):
+    sembrada.config['PRINCIPAL_CACHE_SEGUNDOS'] = 60
+    email = datos_sinteticos.email_paciente(42, 0)
+    with sembrada.app_context():
+        paciente_id = Paciente.query.filter_by(email=email).one().id
+    cliente = sembrada.test_client()
+
+    respuesta = cliente.post('/api/v1/sesion', json={'email': email, 'password': datos_sinteticos.PASSWORD})
+    assert respuesta.status_code == 200
+    assert cliente.get('/api/v1/dashboard').status_code == 200
+    assert sesion._cache.obtener(paciente_id) is not None
+
+    assert cliente.delete('/api/v1/sesion').status_code == 204
+    assert sesion._cache.obtener(paciente_id) is None
+    assert cliente.get('/api/v1/dashboard').status_code == 401
+    assert cliente.delete('/api/v1/sesion').status_code == 204
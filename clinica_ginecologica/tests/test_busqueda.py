@@ -0,0 +1,52 @@
+"""Búsqueda en el historial: las coincidencias no se truncan antes de ordenar"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, HistorialMedico, Medico, Paciente
+import busqueda
+
+
+@pytest.fixture
+def paciente(contexto):
+    busqueda.instalar()
+    paciente = Paciente(email='busqueda@prueba.test', password_hash='-', nombres='Ana', apellidos='Pérez',
+                        cedula='B-1', fecha_nacimiento=datetime(1990, 1, 1).date())
+    db.session.add(paciente)
+    db.session.commit()
+    return paciente
+
+
+@pytest.mark.parametrize('fts', [True, False])
+def test_relevancia_sobre_todas_las_coincidencias(paciente, monkeypatch, fts):
+    monkeypatch.setattr(busqueda, 'BLOQUE_COINCIDENCIAS', 3)
+    monkeypatch.setattr(busqueda, '_usa_fts', lambda: fts)
+    medico_id = Medico.query.first().id
+    inicio = datetime(2020, 1, 1)
+    # El historial más relevante es el más antiguo: un LIMIT sin orden lo perdería
+    historiales = [HistorialMedico(paciente_id=paciente.id, medico_id=medico_id,
+                                   fecha_consulta=inicio, diagnostico='Quiste ovárico')]
+    historiales += [HistorialMedico(paciente_id=paciente.id, medico_id=medico_id,
+                                    fecha_consulta=inicio + timedelta(days=dias), observaciones='Control de quiste')
+                    for dias in range(1, 11)]
+    db.session.add_all(historiales)
+    db.session.commit()
+
+    resultados, hay_mas = busqueda.buscar(paciente.id, 'quiste', por_pagina=20)
+
+    assert len(resultados) == 11 and not hay_mas
+    assert resultados[0]['id'] == historiales[0].id
+    assert [r['fecha_consulta'] for r in resultados[1:]] == sorted(
+        (h.fecha_consulta for h in historiales[1:]), reverse=True)
+
+
+def test_init_db_instala_el_indice(sembrada):
+    # Sin llamar a instalar(): init_db crea el índice y los triggers indexan los datos sintéticos
+    with sembrada.app_context():
+        assert db.session.execute(db.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"), {'nombre': busqueda.TABLA}
+        ).first() is not None
+        historial = HistorialMedico.query.filter(HistorialMedico.diagnostico.isnot(None)).first()
+        palabra = busqueda.terminos(historial.diagnostico)[0]
+        resultados, _ = busqueda.buscar(historial.paciente_id, palabra, por_pagina=100)
+        assert historial.id in {r['id'] for r in resultados}
@@ -0,0 +1,70 @@
+"""Validación del horario al agendar una cita"""
+from datetime import date, timedelta
+
+import pytest
+
+from models import BloqueAgenda
+import catalogos
+import datos_sinteticos
+
+from conftest import iniciar_sesion
+
+MANANA = (date.today() + timedelta(days=1)).isoformat()
+
+
+@pytest.fixture
+def medico_id(app):
+    # Una paciente y ninguna cita: todos los horarios de mañana están libres
+    with app.app_context():
+        datos_sinteticos.generar(pacientes=1, medicos=1, citas=0, historiales=0, recordatorios=0)
+        return catalogos.medicos_activos()[0].id
+
+
+@pytest.fixture
+def cliente(app, medico_id):
+    cliente = app.test_client()
+    iniciar_sesion(cliente)
+    return cliente
+
+
+def agendar(cliente, medico_id, hora, tipo_consulta, fecha=MANANA):
+    respuesta = cliente.post('/citas/nueva', data={
+        'fecha': fecha, 'hora': hora, 'medico_id': medico_id, 'tipo_consulta': tipo_consulta, 'motivo': 'Control',
+    })
+    assert respuesta.status_code == 302
+    return respuesta
+
+
+def mensajes(cliente):
+    with cliente.session_transaction() as sesion:
+        return [mensaje for _, mensaje in sesion.pop('_flashes', [])]
+
+
+def citas_del_dia(app, medico_id):
+    with app.app_context():
+        return BloqueAgenda.query.filter_by(medico_id=medico_id, fecha=date.fromisoformat(MANANA)).count()
+
+
+def test_rechaza_una_cita_que_se_superpone_con_otra_mas_larga(app, medico_id, cliente):
+    assert agendar(cliente, medico_id, '10:00', 'Urgencia').headers['Location'] == '/citas'
+    mensajes(cliente)
+
+    # Consulta General (30 min) a las 10:30: otro inicio, pero dentro de la Urgencia de 60 min
+    respuesta = agendar(cliente, medico_id, '10:30', 'Consulta General')
+    assert respuesta.headers['Location'] == '/citas/nueva'
+    avisos = mensajes(cliente)
+    assert any(aviso.startswith('Ese horario acaba de ser reservado') for aviso in avisos), avisos
+    assert '10:30' not in avisos[0] and '11:00' in avisos[0]
+    assert citas_del_dia(app, medico_id) == 1
+
+
+@pytest.mark.parametrize('hora, tipo_consulta', [
+    ('10:10', 'Consulta General'),   # fuera de la grilla de 30 minutos
+    ('10:30', 'Urgencia'),           # fuera de la grilla de 60 minutos
+    ('18:00', 'Consulta General'),   # después del cierre
+    ('07:30', 'Consulta General'),   # antes de la apertura
+    ('25:00', 'Consulta General'),   # hora inválida
+])
+def test_rechaza_horarios_fuera_de_la_grilla(app, medico_id, cliente, hora, tipo_consulta):
+    assert agendar(cliente, medico_id, hora, tipo_consulta).headers['Location'] == '/citas/nueva'
+    assert citas_del_dia(app, medico_id) == 0
@@ -0,0 +1,17 @@
+"""Detección de hashes que deben regenerarse al iniciar sesión"""
+import pytest
+from werkzeug.security import generate_password_hash
+
+import contrasenas
+
+
+@pytest.mark.parametrize('metodo', ['pbkdf2:sha256', 'pbkdf2:sha256:1000', 'scrypt', 'scrypt:16384:8:1'])
+def test_formas_cortas_no_fuerzan_rehash(contexto, metodo):
+    contexto.config['PASSWORD_HASH_METHOD'] = metodo
+    assert not contrasenas.necesita_rehash(contrasenas.generar_hash('secreta'))
+
+
+def test_parametros_distintos_fuerzan_rehash(contexto):
+    contexto.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256'
+    assert contrasenas.necesita_rehash(generate_password_hash('secreta', 'pbkdf2:sha256:1000'))
+    assert contrasenas.necesita_rehash(generate_password_hash('secreta', 'scrypt'))
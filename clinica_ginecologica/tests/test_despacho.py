@@ -0,0 +1,146 @@
+"""Cola de recordatorios: reclamo, reintentos, caducidad y retiro"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import threading
+
+import pytest
+
+from models import db, Cita, Paciente, Recordatorio
+import datos_sinteticos
+import despacho
+import transiciones
+
+from conftest import crear_app
+
+AHORA = datetime(2030, 3, 4, 12, 0)
+
+
+class EmisorCaido:
+    def enviar(self, mensaje):
+        raise ConnectionError('servidor de correo caído')
+
+
+class Reloj(datetime):
+    """datetime cuyo now() devuelve `Reloj.actual`"""
+    actual = AHORA
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.actual
+
+
+def recordatorio(paciente_id, fecha, estado='activo', cita=None):
+    return Recordatorio(paciente_id=paciente_id, tipo='cita', titulo='Recordatorio', fecha_recordatorio=fecha,
+                        estado=estado, cita=cita)
+
+
+@pytest.fixture
+def paciente_id(app):
+    with app.app_context():
+        datos_sinteticos.generar(pacientes=1, medicos=1, citas=0, historiales=0, recordatorios=0)
+        return Paciente.query.one().id
+
+
+def test_dos_workers_no_reclaman_el_mismo_recordatorio(tmp_path):
+    app = crear_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "clinica.db"}')
+    with app.app_context():
+        datos_sinteticos.generar(pacientes=1, medicos=1, citas=0, historiales=0, recordatorios=0)
+        paciente_id = Paciente.query.one().id
+        db.session.add_all(recordatorio(paciente_id, AHORA - timedelta(minutes=i)) for i in range(200))
+        db.session.commit()
+
+    workers = 8
+    barrera = threading.Barrier(workers)
+
+    def worker(_):
+        reclamados = []
+        with app.app_context():
+            barrera.wait()
+            while True:
+                lote = despacho.reclamar_lote(AHORA, tamano=7)
+                if not lote:
+                    db.session.remove()
+                    return reclamados
+                reclamados.extend(lote)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        por_worker = list(executor.map(worker, range(workers)))
+
+    todos = [cita_id for reclamados in por_worker for cita_id in reclamados]
+    assert len(todos) == len(set(todos)) == 200
+    with app.app_context():
+        assert Recordatorio.query.filter_by(estado='enviando').count() == 200
+        db.engine.dispose()
+
+
+def test_reintentos_con_espera_exponencial(app, paciente_id, monkeypatch):
+    monkeypatch.setattr(despacho, 'datetime', Reloj)
+    with app.app_context():
+        db.session.add(recordatorio(paciente_id, AHORA - timedelta(hours=1)))
+        db.session.commit()
+
+        def despachar(minutos):
+            Reloj.actual = AHORA + timedelta(minutes=minutos)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                procesados = despacho.despachar_lote(EmisorCaido(), executor, despacho.MetricasDespacho())
+            db.session.expire_all()
+            return procesados, Recordatorio.query.one()
+
+        transcurrido = 0
+        for intento in range(1, despacho.MAX_INTENTOS):
+            procesados, pendiente = despachar(transcurrido)
+            espera = despacho.REINTENTO_MINUTOS * 2 ** (intento - 1)
+            assert procesados == 1
+            assert (pendiente.estado, pendiente.intentos) == ('activo', intento)
+            assert pendiente.proximo_intento == Reloj.actual + timedelta(minutes=espera)
+
+            # Antes de la espera no se vuelve a reclamar
+            assert despachar(transcurrido + espera - 1)[0] == 0
+            transcurrido += espera
+
+        procesados, agotado = despachar(transcurrido)
+        assert procesados == 1
+        assert (agotado.estado, agotado.intentos) == ('fallido', despacho.MAX_INTENTOS)
+        assert despachar(transcurrido + 24 * 60)[0] == 0
+
+
+def test_caducar_solo_los_vencidos(app, paciente_id):
+    limite = timedelta(hours=despacho.MAX_ANTIGUEDAD_HORAS)
+    with app.app_context():
+        filas = {
+            'viejo': recordatorio(paciente_id, AHORA - limite - timedelta(minutes=1)),
+            'justo': recordatorio(paciente_id, AHORA - limite),
+            'reciente': recordatorio(paciente_id, AHORA - limite + timedelta(minutes=1)),
+            'futuro': recordatorio(paciente_id, AHORA + timedelta(days=1)),
+            'enviado_viejo': recordatorio(paciente_id, AHORA - 2 * limite, estado='enviado'),
+        }
+        db.session.add_all(filas.values())
+        db.session.commit()
+
+        assert despacho.caducar(AHORA) == 2
+        db.session.expire_all()
+        assert {nombre: fila.estado for nombre, fila in filas.items()} == {
+            'viejo': 'caducado', 'justo': 'caducado', 'reciente': 'activo', 'futuro': 'activo',
+            'enviado_viejo': 'enviado',
+        }
+
+
+def test_cancelar_cita_retira_sus_recordatorios(app, paciente_id):
+    with app.app_context():
+        citas = [Cita(paciente_id=paciente_id, medico_id=1, fecha_hora=AHORA + timedelta(hours=hora),
+                      tipo_consulta='Consulta General', estado='pendiente') for hora in (1, 2, 3)]
+        pendientes = [recordatorio(paciente_id, AHORA, cita=cita) for cita in citas]
+        enviado = recordatorio(paciente_id, AHORA, estado='enviado', cita=citas[0])
+        sin_cita = recordatorio(paciente_id, AHORA)
+        db.session.add_all([*pendientes, enviado, sin_cita])
+        db.session.commit()
+
+        # Con el ORM (listener de after_flush) y en bloque (API del personal)
+        citas[0].estado = 'cancelada'
+        db.session.commit()
+        transiciones.cambiar_estado([citas[1].id], 'cancelada')
+        db.session.expire_all()
+
+        assert [r.estado for r in pendientes] == ['retirado', 'retirado', 'activo']
+        assert enviado.estado == 'enviado'
+        assert sin_cita.estado == 'activo'
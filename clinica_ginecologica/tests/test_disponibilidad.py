@@ -0,0 +1,37 @@
+"""Caché de intervalos ocupados por (médico, día)"""
+from datetime import date, datetime, timedelta
+import time
+
+from sqlalchemy import insert
+
+from models import db, BloqueAgenda, Cita, Paciente
+import cache
+import disponibilidad
+
+MANANA = date.today() + timedelta(days=1)
+
+
+def ocupar_sin_invalidar(medico_id, inicio, fin):
+    """Escribe un bloque como lo haría otro proceso: esta caché no se entera"""
+    paciente = Paciente.query.first()
+    cita = Cita(paciente_id=paciente.id, medico_id=medico_id, tipo_consulta='Consulta General',
+                fecha_hora=datetime.combine(MANANA, datetime.min.time()).replace(hour=10), estado='cancelada')
+    db.session.add(cita)
+    db.session.flush()
+    db.session.execute(insert(BloqueAgenda), {'cita_id': cita.id, 'medico_id': medico_id, 'fecha': MANANA,
+                                              'inicio': inicio, 'fin': fin})
+    db.session.commit()
+
+
+def test_los_intervalos_en_cache_vencen(sembrada, contexto, monkeypatch):
+    disponibilidad.invalidar_todo()
+    ahora = time.monotonic()
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: ahora)
+    medico_id = 1
+    assert disponibilidad.intervalos_ocupados(medico_id, [MANANA])[MANANA] == ()
+
+    ocupar_sin_invalidar(medico_id, 600, 630)
+    assert disponibilidad.intervalos_ocupados(medico_id, [MANANA])[MANANA] == ()
+
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: ahora + disponibilidad.TTL_SEGUNDOS + 1)
+    assert disponibilidad.intervalos_ocupados(medico_id, [MANANA])[MANANA] == ((600, 630),)
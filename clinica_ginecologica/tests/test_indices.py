@@ -0,0 +1,25 @@
+"""Las consultas de las rutas principales deben resolverse por índice"""
+from datetime import datetime
+
+import pytest
+
+from models import db, Paciente
+import consultas
+import datos_sinteticos
+
+
+@pytest.fixture
+def consultas_sembradas(sembrada, contexto):
+    paciente = Paciente.query.filter_by(email=datos_sinteticos.email_paciente(42, 0)).one()
+    return consultas.consultas_criticas(paciente.id, datetime.now())
+
+
+def test_ninguna_consulta_critica_recorre_tablas(consultas_sembradas):
+    recorridos = {}
+    for nombre, query in consultas_sembradas.items():
+        plan = consultas.plan_de_consulta(db.session, query)
+        assert plan, nombre
+        assert any(linea.startswith('SEARCH ') for linea in plan), (nombre, plan)
+        if consultas.recorridos_completos(plan):
+            recorridos[nombre] = plan
+    assert recorridos == {}
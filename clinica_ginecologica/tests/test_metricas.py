@@ -0,0 +1,59 @@
+"""Acceso a /metrics y umbral de sentencias lentas"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models import db
+
+from conftest import crear_app
+
+REMOTA = {'REMOTE_ADDR': '10.0.0.7'}
+
+
+def test_sin_token_solo_localhost():
+    cliente = crear_app().test_client()
+    assert cliente.get('/metrics').status_code == 200
+    assert cliente.get('/metrics', environ_base=REMOTA).status_code == 404
+
+
+def test_con_token():
+    cliente = crear_app(METRICAS_TOKEN='secreto').test_client()
+    assert cliente.get('/metrics').status_code == 401
+    assert cliente.get('/metrics', environ_base=REMOTA,
+                       headers={'Authorization': 'Bearer otro'}).status_code == 401
+    respuesta = cliente.get('/metrics', environ_base=REMOTA, headers={'Authorization': 'Bearer secreto'})
+    assert respuesta.status_code == 200
+
+
+def test_ayuda_usa_el_umbral_configurado():
+    cliente = crear_app(SQL_LENTA_MS=250.0).test_client()
+    cliente.get('/login')
+    assert 'Sentencias SQL de más de 250 ms.' in cliente.get('/metrics').get_data(as_text=True)
+
+
+def test_cuenta_las_peticiones_que_fallan():
+    app = crear_app()
+
+    def falla():
+        raise RuntimeError('falla de prueba')
+    app.add_url_rule('/falla', 'falla_de_prueba', falla)
+    cliente = app.test_client()
+
+    # En pruebas la excepción se propaga sin pasar por after_request
+    with pytest.raises(RuntimeError):
+        cliente.get('/falla')
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    assert cliente.get('/falla').status_code == 500
+
+    texto = cliente.get('/metrics').get_data(as_text=True)
+    assert 'clinica_peticiones_total{endpoint="falla_de_prueba",metodo="GET",estado="500"} 2' in texto
+    assert 'clinica_peticion_segundos_count{endpoint="falla_de_prueba"} 2' in texto
+
+
+def test_sentencia_fallida_no_deja_inicios_pendientes():
+    app = crear_app()
+    with app.app_context():
+        conexion = db.session.connection()
+        with pytest.raises(OperationalError):
+            db.session.execute(text('SELECT * FROM tabla_inexistente'))
+        assert not conexion.info.get('_inicios_sentencia')
@@ -0,0 +1,30 @@
+"""Validación de fechas en la API del personal"""
+import pytest
+
+TOKEN = 'token-de-prueba'
+
+
+@pytest.fixture
+def cliente(app):
+    app.config['PERSONAL_API_TOKEN'] = TOKEN
+    cliente = app.test_client()
+    cliente.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {TOKEN}'
+    return cliente
+
+
+@pytest.mark.parametrize('ruta', [
+    '/api/medicos/1/agenda?desde=2024-13-01',
+    '/api/medicos/1/agenda?desde=9999-12-31&dias=7',
+    '/api/analitica?desde=ayer',
+    '/api/analitica?hasta=2024-02-30',
+    '/api/analitica?hasta=0001-01-02',
+])
+def test_fecha_invalida_responde_400(cliente, ruta):
+    respuesta = cliente.get(ruta)
+    assert respuesta.status_code == 400, respuesta.status_code
+    assert 'error' in respuesta.get_json()
+
+
+def test_fechas_validas(cliente):
+    assert cliente.get('/api/medicos/1/agenda?desde=2024-03-01&dias=7').status_code == 200
+    assert cliente.get('/api/analitica?desde=2024-01-01&hasta=2024-03-31').status_code == 200
@@ -0,0 +1,57 @@
+"""Reservas simultáneas de un mismo horario sobre SQLite en modo WAL"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import threading
+
+import pytest
+
+from models import db, Cita
+import catalogos
+import consultas
+import datos_sinteticos
+
+from conftest import crear_app, iniciar_sesion
+
+PACIENTES = 20
+
+
+@pytest.fixture
+def app_archivo(tmp_path):
+    # Los hilos necesitan conexiones propias, así que la base va en un archivo
+    app = crear_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "clinica.db"}')
+    with app.app_context():
+        datos_sinteticos.generar(pacientes=PACIENTES, medicos=1, citas=0, historiales=0, recordatorios=0)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_una_sola_reserva_gana_el_horario(app_archivo):
+    medico_id = catalogos.medicos_activos()[0].id
+    tipo_consulta = catalogos.tipos_consulta_activos()[0].nombre
+    fecha = date.today() + timedelta(days=1)
+    formulario = {'fecha': fecha.isoformat(), 'hora': '10:00', 'medico_id': medico_id,
+                  'tipo_consulta': tipo_consulta, 'motivo': 'Control'}
+    barrera = threading.Barrier(PACIENTES)
+
+    def paciente(indice):
+        cliente = app_archivo.test_client()
+        iniciar_sesion(cliente, indice)
+        estados = [cliente.get('/dashboard').status_code, cliente.get('/citas/nueva').status_code]
+        barrera.wait()
+        respuesta = cliente.post('/citas/nueva', data=formulario)
+        return estados, respuesta.status_code, respuesta.headers.get('Location')
+
+    with ThreadPoolExecutor(max_workers=PACIENTES) as executor:
+        resultados = list(executor.map(paciente, range(PACIENTES)))
+
+    assert all(estados == [200, 200] for estados, _, _ in resultados)
+    assert all(codigo == 302 for _, codigo, _ in resultados)
+    destinos = [destino for _, _, destino in resultados]
+    assert destinos.count('/citas') == 1
+    assert destinos.count('/citas/nueva') == PACIENTES - 1
+
+    activas = Cita.query.filter(
+        Cita.medico_id == medico_id, Cita.estado.in_(consultas.ESTADOS_ACTIVOS)
+    ).count()
+    assert activas == 1
@@ -0,0 +1,50 @@
+"""Cantidad de sentencias SQL por página, independiente de los datos de la paciente"""
+import pytest
+
+from models import db
+import consultas
+import datos_sinteticos
+
+from conftest import iniciar_sesion
+
+# Máximo de sentencias por página con los catálogos ya en caché: la carga de
+# la paciente autenticada y las consultas de la página
+MAX_SENTENCIAS = {
+    '/dashboard': 4,
+    '/citas?filtro=todas': 2,
+    '/historial': 2,
+}
+
+POCAS, MUCHAS = 1, 2
+
+
+@pytest.fixture
+def pacientes(app):
+    # Una paciente con una fila de cada tipo y otra con más de una página de citas e historial
+    with app.app_context():
+        datos_sinteticos.generar(pacientes=3, medicos=2, citas=1, historiales=1, recordatorios=1, semilla=POCAS)
+        datos_sinteticos.generar(pacientes=3, medicos=2, citas=3 * consultas.POR_PAGINA,
+                                 historiales=3 * consultas.POR_PAGINA, recordatorios=10, semilla=MUCHAS)
+        motor = db.engine
+    clientes = {}
+    for semilla in (POCAS, MUCHAS):
+        clientes[semilla] = app.test_client()
+        iniciar_sesion(clientes[semilla], semilla=semilla)
+    return motor, clientes
+
+
+def contar(motor, cliente, ruta):
+    cliente.get(ruta)  # Calienta las cachés de catálogos
+    with consultas.contador_sentencias(motor) as sentencias:
+        respuesta = cliente.get(ruta)
+    assert respuesta.status_code == 200, (ruta, respuesta.status_code)
+    return len(sentencias)
+
+
+@pytest.mark.parametrize('ruta', list(MAX_SENTENCIAS))
+def test_sentencias_acotadas_por_ruta(pacientes, ruta):
+    motor, clientes = pacientes
+    pocas = contar(motor, clientes[POCAS], ruta)
+    muchas = contar(motor, clientes[MUCHAS], ruta)
+    assert pocas == muchas, (ruta, pocas, muchas)
+    assert muchas <= MAX_SENTENCIAS[ruta], (ruta, muchas)
@@ -0,0 +1,119 @@
+"""Cambios de estado en bloque (API del personal) y barrido de citas vencidas"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from models import db, BloqueAgenda, Cita, Paciente
+import datos_sinteticos
+import disponibilidad
+import transiciones
+
+TOKEN = 'token-de-prueba'
+MEDICO = 1
+
+
+@pytest.fixture
+def crear_cita(app):
+    with app.app_context():
+        datos_sinteticos.generar(pacientes=1, medicos=1, citas=0, historiales=0, recordatorios=0)
+        paciente_id = Paciente.query.one().id
+
+    def crear_cita(fecha_hora, estado='pendiente'):
+        with app.app_context():
+            cita = Cita(paciente_id=paciente_id, medico_id=MEDICO, fecha_hora=fecha_hora.replace(microsecond=0),
+                        tipo_consulta='Consulta General', estado=estado)
+            db.session.add(cita)
+            db.session.commit()
+            return cita.id
+    return crear_cita
+
+
+@pytest.fixture
+def personal(app):
+    app.config['PERSONAL_API_TOKEN'] = TOKEN
+    cliente = app.test_client()
+    cliente.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {TOKEN}'
+    return cliente
+
+
+def manana(hora):
+    return (datetime.now() + timedelta(days=1)).replace(hour=hora, minute=0, second=0, microsecond=0)
+
+
+def estados(app, ids):
+    with app.app_context():
+        return [db.session.get(Cita, cita_id).estado for cita_id in ids]
+
+
+def bloques(app, ids):
+    with app.app_context():
+        return {cita_id for cita_id, in db.session.query(BloqueAgenda.cita_id).filter(BloqueAgenda.cita_id.in_(ids))}
+
+
+def ocupados(app, fecha):
+    with app.app_context():
+        return disponibilidad.intervalos_ocupados(MEDICO, [fecha])[fecha]
+
+
+def test_transiciones_permitidas(app, crear_cita, personal):
+    pendiente, confirmada, otra = (crear_cita(manana(hora)) for hora in (9, 10, 11))
+    pasada = crear_cita(datetime.now() - timedelta(hours=2), estado='confirmada')
+    fecha = manana(9).date()
+    assert len(ocupados(app, fecha)) == 3  # queda en la caché de disponibilidad
+
+    respuesta = personal.post('/api/citas/estado', json={'ids': [confirmada, otra], 'estado': 'confirmada'})
+    assert respuesta.get_json() == {'estado': 'confirmada', 'actualizadas': [confirmada, otra], 'omitidas': []}
+    # Confirmar no libera el horario
+    assert bloques(app, [confirmada, otra]) == {confirmada, otra}
+
+    respuesta = personal.post('/api/citas/estado', json={'ids': [pendiente, otra], 'estado': 'cancelada'})
+    assert respuesta.get_json()['actualizadas'] == [pendiente, otra]
+    assert bloques(app, [pendiente, confirmada, otra]) == {confirmada}
+    # La caché del día se invalidó: los horarios cancelados vuelven a estar libres
+    assert ocupados(app, fecha) == ((600, 630),)
+
+    respuesta = personal.post('/api/citas/estado', json={'ids': [pasada], 'estado': 'ausente'})
+    assert respuesta.get_json()['actualizadas'] == [pasada]
+    assert estados(app, [pendiente, confirmada, otra, pasada]) == ['cancelada', 'confirmada', 'cancelada', 'ausente']
+
+
+def test_transiciones_rechazadas(app, crear_cita, personal):
+    cancelada = crear_cita(manana(9), estado='cancelada')
+    futura = crear_cita(manana(10))
+    sin_estado = crear_cita(manana(11))
+    with app.app_context():
+        # El ORM aplicaría el valor por defecto a un estado None
+        db.session.execute(update(Cita).where(Cita.id == sin_estado).values(estado=None))
+        db.session.commit()
+
+    # Una cita cancelada no se confirma, una futura no puede quedar ausente y
+    # una sin estado (COALESCE) no sale de ningún estado de origen
+    respuesta = personal.post('/api/citas/estado', json={'ids': [cancelada, sin_estado], 'estado': 'confirmada'})
+    assert respuesta.get_json()['omitidas'] == [cancelada, sin_estado]
+    respuesta = personal.post('/api/citas/estado', json={'ids': [futura, sin_estado, 999], 'estado': 'ausente'})
+    assert respuesta.get_json() == {'estado': 'ausente', 'actualizadas': [], 'omitidas': [futura, sin_estado, 999]}
+    assert estados(app, [cancelada, futura, sin_estado]) == ['cancelada', 'pendiente', None]
+    assert bloques(app, [futura]) == {futura}
+
+    assert personal.post('/api/citas/estado', json={'ids': [futura], 'estado': 'completada'}).status_code == 400
+    assert personal.post('/api/citas/estado', json={'ids': 'todas', 'estado': 'cancelada'}).status_code == 400
+
+
+def test_barrido_respeta_el_margen(app, crear_cita):
+    ahora = datetime.now().replace(microsecond=0)
+    margen = timedelta(hours=transiciones.MARGEN_HORAS)
+    vencida = crear_cita(ahora - margen - timedelta(minutes=1))
+    confirmada = crear_cita(ahora - margen - timedelta(hours=2), estado='confirmada')
+    dentro_del_margen = crear_cita(ahora - margen + timedelta(minutes=1))
+    cancelada = crear_cita(ahora - margen - timedelta(hours=3), estado='cancelada')
+    ids = [vencida, confirmada, dentro_del_margen, cancelada]
+    fecha = (ahora - margen - timedelta(minutes=1)).date()
+    antes = ocupados(app, fecha)
+
+    with app.app_context():
+        resultado = transiciones.barrer_vencidas(ahora, tamano=1)
+    assert (resultado.actualizadas, resultado.lotes) == (2, 2)
+    assert estados(app, ids) == ['completada', 'completada', 'pendiente', 'cancelada']
+    assert bloques(app, ids) == {dentro_del_margen}
+    assert len(ocupados(app, fecha)) < len(antes)
@@ -0,0 +1,129 @@
+"""
+Cambios de estado de citas en bloque
+
+- `barrer_vencidas()` marca como completadas las citas pendientes o
+  confirmadas cuya hora ya pasó, con UPDATE ... RETURNING de a `tamano`
+  filas y un commit por lote, para no retener el bloqueo de escritura.
+- `cambiar_estado()` confirma, cancela o marca como ausentes un conjunto de
+  citas (API del personal de la clínica).
+
+Como estas escrituras no pasan por la unidad de trabajo del ORM, la agenda
+materializada, los resúmenes diarios, los recordatorios de las citas y las
+cachés derivadas se actualizan aquí mismo. Se ejecuta un UPDATE por estado
+de origen para saber de qué estado sale cada cita.
+"""
+from datetime import datetime, timedelta
+import time
+
+from sqlalchemy import func, update
+
+from models import db, Cita
+import agenda
+import analitica
+import consultas
+import despacho
+import disponibilidad
+import estadisticas
+
+TAMANO_LOTE = 2000
+MAX_IDS = 1000
+MARGEN_HORAS = 24
+
+# Estado destino -> estados desde los que se permite llegar
+TRANSICIONES = {
+    'confirmada': ('pendiente',),
+    'cancelada': ('pendiente', 'confirmada'),
+    # El barrido completa las citas pasadas, así que la inasistencia se
+    # puede registrar también después
+    'ausente': ('pendiente', 'confirmada', 'completada'),
+}
+
+
+class ResultadoBarrido:
+    def __init__(self):
+        self.actualizadas = 0
+        self.lotes = 0
+        self.lote_mas_lento = 0.0
+        self.inicio = time.perf_counter()
+
+    def resumen(self):
+        segundos = time.perf_counter() - self.inicio
+        return (f'{self.actualizadas} citas completadas en {self.lotes} lotes, {segundos:.1f} s '
+                f'({self.actualizadas / max(segundos, 1e-9):.0f} citas/s, '
+                f'lote más lento {self.lote_mas_lento * 1000:.0f} ms)')
+
+
+def _estado_en(estados):
+    # COALESCE impide que SQLite elija el índice (estado, fecha_hora) para el
+    # UPDATE y recorra todas las citas activas: así busca por clave primaria
+    return func.coalesce(Cita.estado, '').in_(estados)
+
+
+def _aplicar(ids, origenes, destino, *condiciones):
+    """Pasa las citas `ids` de `origenes` a `destino`, confirma y propaga el cambio; devuelve los ids"""
+    ahora = datetime.utcnow()
+    filas = []
+    for origen in origenes:
+        movidas = db.session.execute(
+            update(Cita)
+            .where(Cita.id.in_(ids), _estado_en((origen,)), *condiciones)
+            .values(estado=destino, fecha_modificacion=ahora)
+            .returning(Cita.id, Cita.paciente_id, Cita.medico_id, Cita.fecha_hora, Cita.tipo_consulta)
+        ).all()
+        analitica.mover_citas(movidas, origen, destino)
+        filas.extend(movidas)
+    ids = [fila.id for fila in filas]
+    # Confirmar no cambia el intervalo ocupado; los demás estados lo liberan
+    # y retiran los recordatorios de la cita
+    if ids and destino not in consultas.ESTADOS_ACTIVOS:
+        agenda.quitar_citas(ids)
+        despacho.retirar_de_citas(db.session.connection(), ids)
+    db.session.commit()
+
+    for fila in filas:
+        estadisticas.invalidar(fila.paciente_id)
+    for medico_id, fecha in {(fila.medico_id, fila.fecha_hora.date()) for fila in filas}:
+        disponibilidad.invalidar(medico_id, fecha)
+    return ids
+
+
+def completar_lote(corte, tamano=TAMANO_LOTE):
+    """Completa hasta `tamano` citas activas anteriores a `corte`"""
+    ids = [cita_id for cita_id, in consultas.citas_vencidas(corte).with_entities(Cita.id).limit(tamano)]
+    if not ids:
+        return []
+    return _aplicar(ids, consultas.ESTADOS_ACTIVOS, 'completada')
+
+
+def barrer_vencidas(ahora=None, margen_horas=MARGEN_HORAS, tamano=TAMANO_LOTE, pausa=0.0,
+                    al_terminar_lote=None):
+    """
+    Completa por lotes todas las citas activas de hace más de `margen_horas`.
+    `pausa` deja pasar a otros escritores entre lote y lote.
+    """
+    corte = (ahora or datetime.now()) - timedelta(hours=margen_horas)
+    resultado = ResultadoBarrido()
+    while True:
+        inicio = time.perf_counter()
+        ids = completar_lote(corte, tamano)
+        if not ids:
+            return resultado
+        resultado.lotes += 1
+        resultado.actualizadas += len(ids)
+        resultado.lote_mas_lento = max(resultado.lote_mas_lento, time.perf_counter() - inicio)
+        if al_terminar_lote:
+            al_terminar_lote(resultado)
+        if pausa:
+            time.sleep(pausa)
+
+
+def cambiar_estado(ids, destino):
+    """
+    Pasa las citas `ids` a `destino` ('confirmada', 'cancelada' o 'ausente')
+    si su estado actual lo permite; solo una cita ya pasada puede quedar
+    ausente. Devuelve los ids efectivamente actualizados.
+    """
+    if destino not in TRANSICIONES:
+        raise ValueError(f'Estado destino inválido: {destino}')
+    condiciones = (Cita.fecha_hora <= datetime.now(),) if destino == 'ausente' else ()
+    return _aplicar(ids, TRANSICIONES[destino], destino, *condiciones)
@@ -0,0 +1,72 @@
+"""
+Filas livianas para los listados (mis citas, recordatorios, historial y dashboard)
+
+Los listados muestran pocas columnas y recortan los textos largos, así que no
+cargan objetos completos del ORM: seleccionan solo `columnas` (los Text ya
+recortados en SQL) y envuelven cada fila en un objeto con __slots__ que
+expone lo mismo que usan las plantillas.
+"""
+from sqlalchemy import func
+
+from models import Cita, HistorialMedico, Recordatorio
+import catalogos
+
+LARGO_MOTIVO = 50
+LARGO_DIAGNOSTICO = 60
+
+
+def _recortado(columna, largo):
+    # Un carácter de más para que la plantilla sepa si debe agregar "..."
+    return func.substr(columna, 1, largo + 1).label(columna.key)
+
+
+def _medico(fila):
+    return catalogos.medico(fila.medico_id)
+
+
+class _Fila:
+    __slots__ = ()
+
+    @classmethod
+    def lista(cls, filas):
+        return [cls(fila) for fila in filas]
+
+
+class CitaFila(_Fila):
+    __slots__ = ('id', 'fecha_hora', 'tipo_consulta', 'estado', 'medico_id', 'motivo')
+    columnas = (Cita.id, Cita.fecha_hora, Cita.tipo_consulta, Cita.estado, Cita.medico_id,
+                _recortado(Cita.motivo, LARGO_MOTIVO))
+
+    def __init__(self, fila):
+        self.id, self.fecha_hora, self.tipo_consulta, self.estado, self.medico_id, self.motivo = fila
+
+    medico = property(_medico)
+
+    @property
+    def fecha_formateada(self):
+        return self.fecha_hora.strftime('%d/%m/%Y')
+
+    @property
+    def hora_formateada(self):
+        return self.fecha_hora.strftime('%H:%M')
+
+
+class RecordatorioFila(_Fila):
+    __slots__ = ('id', 'tipo', 'titulo', 'descripcion', 'fecha_recordatorio', 'estado')
+    columnas = (Recordatorio.id, Recordatorio.tipo, Recordatorio.titulo, Recordatorio.descripcion,
+                Recordatorio.fecha_recordatorio, Recordatorio.estado)
+
+    def __init__(self, fila):
+        (self.id, self.tipo, self.titulo, self.descripcion,
+         self.fecha_recordatorio, self.estado) = fila
+
+
+class HistorialFila(_Fila):
+    __slots__ = ('id', 'fecha_consulta', 'tipo_consulta', 'medico_id', 'diagnostico')
+    columnas = (HistorialMedico.id, HistorialMedico.fecha_consulta, HistorialMedico.tipo_consulta,
+                HistorialMedico.medico_id, _recortado(HistorialMedico.diagnostico, LARGO_DIAGNOSTICO))
+
+    def __init__(self, fila):
+        self.id, self.fecha_consulta, self.tipo_consulta, self.medico_id, self.diagnostico = fila
+
+    medico = property(_medico)
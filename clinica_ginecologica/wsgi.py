@@ -0,0 +1,8 @@
+"""
+Punto de entrada WSGI para producción
+
+    gunicorn -w 4 wsgi:app
+"""
+from app import create_app
+
+app = create_app()